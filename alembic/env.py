@@ -12,8 +12,11 @@ from src.config.settings import settings
 
 config = context.config
 
-if config.config_file_name is not None:
-    fileConfig(config.config_file_name)
+# When the application runs migrations in-process it passes its connection and
+# has set up logging already; fileConfig would replace its handlers and quiet
+# the root logger to WARN for the rest of the process.
+if config.config_file_name is not None and "connection" not in config.attributes:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
 
 config.set_main_option("sqlalchemy.url", settings.sqlalchemy_url)
 
@@ -0,0 +1,45 @@
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "a8e3d6f27c14"
+down_revision: Union[str, None] = "f4c1a7b93e20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Applies the migration.
+    Creates the conversation_archive table holding the final messages of idle threads.
+    """
+    op.execute(
+        """
+               create table if not exists conversation_archive
+               (
+                   thread_id     text primary key,
+                   username      text,
+                   title         text,
+                   checkpoint_id text        not null,
+                   message_count integer     not null,
+                   messages      bytea       not null,
+                   last_active   timestamptz not null,
+                   archived_at   timestamptz not null default now()
+               );
+               """
+    )
+    # Lets the conversation list include a user's archived threads.
+    op.execute(
+        """
+               create index if not exists conversation_archive_username_idx
+                   on conversation_archive (username);
+               """
+    )
+
+
+def downgrade() -> None:
+    """
+    Reverts the migration.
+    Drops the conversation_archive table and its index.
+    """
+    op.execute("drop table if exists conversation_archive;")
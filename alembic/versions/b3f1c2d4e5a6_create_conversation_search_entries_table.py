@@ -0,0 +1,79 @@
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "b3f1c2d4e5a6"
+down_revision: Union[str, None] = "70940d93491c"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Applies the migration.
+    Creates the conversation_search_entries table with a GIN-indexed tsvector,
+    holding one row per saved turn plus one title row per thread.
+    """
+    op.execute(
+        """
+               create table if not exists conversation_search_entries
+               (
+                   id         bigserial primary key,
+                   thread_id  text not null,
+                   username   text not null,
+                   kind       text not null default 'turn',
+                   content    text not null,
+                   document   tsvector generated always as (
+                       setweight(
+                           to_tsvector('simple', content),
+                           (case when kind = 'title' then 'A' else 'B' end)::"char"
+                       )
+                   ) stored,
+                   created_at timestamptz default current_timestamp
+               );
+               """
+    )
+    op.execute(
+        """
+               create index if not exists conversation_search_entries_document_idx
+                   on conversation_search_entries using gin (document);
+               """
+    )
+    op.execute(
+        """
+               create index if not exists conversation_search_entries_username_idx
+                   on conversation_search_entries (username);
+               """
+    )
+    op.execute(
+        """
+               create unique index if not exists conversation_search_entries_title_idx
+                   on conversation_search_entries (thread_id)
+                   where kind = 'title';
+               """
+    )
+    # Existing titles are searchable right away; message text is indexed as
+    # new turns are saved.
+    op.execute(
+        """
+               insert into conversation_search_entries (thread_id, username, kind, content)
+               select thread_id,
+                      regexp_replace(
+                              thread_id,
+                              '-[0-9a-fA-F]{8}-([0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}$',
+                              ''
+                      ),
+                      'title',
+                      title
+               from conversation_metadata
+               on conflict do nothing;
+               """
+    )
+
+
+def downgrade() -> None:
+    """
+    Reverts the migration.
+    Drops the conversation_search_entries table and its indexes.
+    """
+    op.execute("drop table if exists conversation_search_entries;")
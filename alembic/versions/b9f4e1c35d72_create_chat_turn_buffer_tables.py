@@ -0,0 +1,53 @@
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "b9f4e1c35d72"
+down_revision: Union[str, None] = "a8e3d6f27c14"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Applies the migration.
+    Creates the chat_turns and chat_turn_events tables buffering the events of
+    turns submitted with an idempotency key. They are unlogged: the buffers only
+    live for minutes, and losing them on a crash only makes reconnects fail.
+    """
+    op.execute(
+        """
+               create unlogged table if not exists chat_turns
+               (
+                   session_id       text        not null,
+                   idempotency_key  text        not null,
+                   message_hash     text        not null,
+                   done             boolean     not null default false,
+                   consumer_seen_at timestamptz not null default now(),
+                   updated_at       timestamptz not null default now(),
+                   primary key (session_id, idempotency_key)
+               );
+               """
+    )
+    op.execute(
+        """
+               create unlogged table if not exists chat_turn_events
+               (
+                   session_id      text    not null,
+                   idempotency_key text    not null,
+                   seq             integer not null,
+                   type            text    not null,
+                   data            text    not null,
+                   primary key (session_id, idempotency_key, seq)
+               );
+               """
+    )
+
+
+def downgrade() -> None:
+    """
+    Reverts the migration.
+    Drops the chat_turns and chat_turn_events tables.
+    """
+    op.execute("drop table if exists chat_turn_events;")
+    op.execute("drop table if exists chat_turns;")
@@ -0,0 +1,66 @@
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "c7d2e9a41b08"
+down_revision: Union[str, None] = "b3f1c2d4e5a6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Applies the migration.
+    Creates the job_queue table for durable background jobs.
+    """
+    op.execute(
+        """
+               create table if not exists job_queue
+               (
+                   id           bigserial primary key,
+                   kind         text        not null,
+                   payload      jsonb       not null default '{}'::jsonb,
+                   priority     integer     not null default 0,
+                   dedup_key    text,
+                   status       text        not null default 'queued',
+                   attempts     integer     not null default 0,
+                   max_attempts integer     not null default 5,
+                   run_at       timestamptz not null default now(),
+                   locked_at    timestamptz,
+                   locked_by    text,
+                   last_error   text,
+                   created_at   timestamptz not null default now()
+               );
+               """
+    )
+    # Workers claim from this index only, so finished and failed rows never
+    # slow down the hot path.
+    op.execute(
+        """
+               create index if not exists job_queue_ready_idx
+                   on job_queue (priority desc, run_at)
+                   where status = 'queued';
+               """
+    )
+    op.execute(
+        """
+               create unique index if not exists job_queue_dedup_idx
+                   on job_queue (kind, dedup_key)
+                   where dedup_key is not null and status in ('queued', 'running');
+               """
+    )
+    op.execute(
+        """
+               create index if not exists job_queue_running_idx
+                   on job_queue (locked_at)
+                   where status = 'running';
+               """
+    )
+
+
+def downgrade() -> None:
+    """
+    Reverts the migration.
+    Drops the job_queue table and its indexes.
+    """
+    op.execute("drop table if exists job_queue;")
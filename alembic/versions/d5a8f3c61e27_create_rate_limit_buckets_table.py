@@ -0,0 +1,36 @@
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "d5a8f3c61e27"
+down_revision: Union[str, None] = "c7d2e9a41b08"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Applies the migration.
+    Creates the rate_limit_buckets table. It is unlogged: bucket levels are
+    short-lived, and losing them on a crash only resets users to full buckets.
+    """
+    op.execute(
+        """
+               create unlogged table if not exists rate_limit_buckets
+               (
+                   username   text             not null,
+                   bucket     text             not null,
+                   level      double precision not null,
+                   updated_at double precision not null,
+                   primary key (username, bucket)
+               );
+               """
+    )
+
+
+def downgrade() -> None:
+    """
+    Reverts the migration.
+    Drops the rate_limit_buckets table.
+    """
+    op.execute("drop table if exists rate_limit_buckets;")
@@ -0,0 +1,58 @@
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "e2b7c4d9f150"
+down_revision: Union[str, None] = "d5a8f3c61e27"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Applies the migration.
+    Creates the turn_usage table with one accounting record per agent turn.
+    """
+    op.execute(
+        """
+               create table if not exists turn_usage
+               (
+                   id                bigserial primary key,
+                   thread_id         text        not null,
+                   username          text,
+                   status            text        not null,
+                   model             text,
+                   input_tokens      integer     not null default 0,
+                   output_tokens     integer     not null default 0,
+                   total_tokens      integer     not null default 0,
+                   model_calls       integer     not null default 0,
+                   tool_calls        text[]      not null default '{}',
+                   node_durations_ms jsonb       not null default '{}'::jsonb,
+                   ttft_ms           integer,
+                   duration_ms       integer     not null,
+                   created_at        timestamptz not null default now()
+               );
+               """
+    )
+    # Rows are appended in time order, which a BRIN index covers at a
+    # fraction of a btree's size.
+    op.execute(
+        """
+               create index if not exists turn_usage_created_at_idx
+                   on turn_usage using brin (created_at);
+               """
+    )
+    op.execute(
+        """
+               create index if not exists turn_usage_username_idx
+                   on turn_usage (username, created_at);
+               """
+    )
+
+
+def downgrade() -> None:
+    """
+    Reverts the migration.
+    Drops the turn_usage table and its indexes.
+    """
+    op.execute("drop table if exists turn_usage;")
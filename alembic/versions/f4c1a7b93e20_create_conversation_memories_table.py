@@ -0,0 +1,45 @@
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "f4c1a7b93e20"
+down_revision: Union[str, None] = "e2b7c4d9f150"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Applies the migration.
+    Creates the conversation_memories table holding embedded turns for recall.
+    """
+    op.execute(
+        """
+               create table if not exists conversation_memories
+               (
+                   id         bigserial primary key,
+                   username   text        not null,
+                   thread_id  text        not null,
+                   embedder   text        not null,
+                   content    text        not null,
+                   embedding  bytea       not null,
+                   created_at timestamptz not null default now()
+               );
+               """
+    )
+    # Serves both the initial load of a user's index and the catch-up
+    # reads of rows added since.
+    op.execute(
+        """
+               create index if not exists conversation_memories_username_idx
+                   on conversation_memories (username, embedder, id);
+               """
+    )
+
+
+def downgrade() -> None:
+    """
+    Reverts the migration.
+    Drops the conversation_memories table and its index.
+    """
+    op.execute("drop table if exists conversation_memories;")
@@ -0,0 +1,154 @@
+"""
+Benchmarks the bulk export and import of a user's conversations against the
+configured Postgres database, at growing history sizes.
+
+    python -m benchmarks.conversation_transfer --sizes 10000,50000
+    python -m benchmarks.conversation_transfer --sizes 50000 --messages-per-thread 500
+
+For each size, a synthetic export of a bench user is imported through the
+agent's checkpointer, exported again and checked against the input. Each
+direction is timed, then repeated under tracemalloc for its peak memory,
+which should stay flat as the history grows.
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+import uuid
+from typing import AsyncIterator, Awaitable, Callable, Tuple
+
+import orjson
+from langchain_core.messages import AIMessage, HumanMessage, message_to_dict
+from psycopg_pool import AsyncConnectionPool
+
+from src.ai.agents.chat_agent import ChatAgent
+from src.ai.checkpointer import TracedPostgresSaver
+from src.api.services.conversation_transfer_service import (
+    export_conversations,
+    import_conversations,
+)
+from src.config.settings import settings
+
+BENCH_USER = "bench-transfer"
+CHUNK_SIZE = 64 * 1024
+
+
+def _synthetic_export(messages: int, per_thread: int) -> bytes:
+    """An export of `messages` messages of a few hundred characters each."""
+    lines = []
+    for start in range(0, messages, per_thread):
+        thread_id = f"{BENCH_USER}-{uuid.uuid4()}"
+        count = min(per_thread, messages - start)
+        lines.append({"type": "thread", "thread_id": thread_id, "title": None})
+        for i in range(count):
+            message_class = HumanMessage if i % 2 == 0 else AIMessage
+            content = f"message {start + i}: " + "lorem ipsum dolor sit amet " * 12
+            lines.append(
+                {
+                    "type": "message",
+                    "thread_id": thread_id,
+                    "message": message_to_dict(message_class(content=content)),
+                }
+            )
+    return b"".join(orjson.dumps(line) + b"\n" for line in lines)
+
+
+async def _chunks(data: bytes) -> AsyncIterator[bytes]:
+    for start in range(0, len(data), CHUNK_SIZE):
+        yield data[start : start + CHUNK_SIZE]
+
+
+async def _delete_bench_threads(pool: AsyncConnectionPool):
+    async with pool.connection() as conn:
+        for table in ("checkpoint_writes", "checkpoint_blobs", "checkpoints"):
+            await conn.execute(
+                f"delete from {table} where thread_id like %s", (f"{BENCH_USER}-%",)
+            )
+
+
+async def _measure(run: Callable[[], Awaitable]) -> Tuple[float, int]:
+    """Runs twice: timed, then under tracemalloc for the peak traced memory."""
+    started = time.perf_counter()
+    await run()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    try:
+        await run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return elapsed, peak
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="10000,50000")
+    parser.add_argument("--messages-per-thread", type=int, default=100)
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.conversation_import_batch_size
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=settings.conversation_import_concurrency
+    )
+    args = parser.parse_args()
+
+    pool = AsyncConnectionPool(conninfo=settings.db_dsn, open=False)
+    await pool.open(wait=True)
+    checkpointer = TracedPostgresSaver(pool)
+    await checkpointer.setup()
+    agent = ChatAgent(tools=[])
+    await agent.build_with_checkpointer(checkpointer)
+
+    try:
+        for size in (int(s) for s in args.sizes.split(",")):
+            data = _synthetic_export(size, args.messages_per_thread)
+            await _delete_bench_threads(pool)
+
+            async def run_import():
+                await _delete_bench_threads(pool)
+                result = await import_conversations(
+                    BENCH_USER,
+                    _chunks(data),
+                    agent.runnable,
+                    args.batch_size,
+                    args.concurrency,
+                )
+                assert result["messages"] == size, result
+
+            exported = []
+
+            async def run_export():
+                exported.clear()
+                total = 0
+                async for chunk in export_conversations(
+                    BENCH_USER, pool, checkpointer.serde
+                ):
+                    total += len(chunk)
+                    exported.append(chunk[-200:])
+                end = orjson.loads(exported[-1].splitlines()[-1])
+                assert end["messages"] == size, end
+                exported[:] = [total]
+
+            import_seconds, import_peak = await _measure(run_import)
+            export_seconds, export_peak = await _measure(run_export)
+            print(
+                f"{size:>8,} messages in {-(-size // args.messages_per_thread):,} threads,"
+                f" {len(data) / 2**20:,.1f} MiB of NDJSON"
+            )
+            print(
+                f"  import: {import_seconds:8.2f} s, {size / import_seconds:10,.0f} msg/s,"
+                f" peak traced {import_peak / 2**20:8.1f} MiB"
+            )
+            print(
+                f"  export: {export_seconds:8.2f} s, {size / export_seconds:10,.0f} msg/s,"
+                f" peak traced {export_peak / 2**20:8.1f} MiB"
+            )
+            del data
+    finally:
+        await _delete_bench_threads(pool)
+        await pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
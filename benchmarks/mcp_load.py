@@ -0,0 +1,138 @@
+"""
+Load test for the MCP server's tool throughput.
+
+Sends raw JSON-RPC `tools/call` requests, which only works against a server
+running with MCP_STATELESS_HTTP=true. To see throughput scale with workers,
+point the server at the local weather stub and compare runs:
+
+    python -m benchmarks.weather_stub --port 8099
+    WEATHER_API_BASE_URL=http://127.0.0.1:8099 MCP_STATELESS_HTTP=true \\
+        MCP_WORKERS=1 python main.py mcp
+    python -m benchmarks.mcp_load --requests 2000 --concurrency 64
+
+Then restart the server with MCP_WORKERS=4 and run the load test again.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import statistics
+import time
+from typing import List, Tuple
+
+import httpx
+
+HEADERS = {"Accept": "application/json, text/event-stream"}
+
+
+def _parse_rpc_response(response: httpx.Response) -> dict:
+    """Parses a JSON-RPC reply sent either as plain JSON or as a single SSE event."""
+    if response.headers.get("content-type", "").startswith("application/json"):
+        return response.json()
+    for line in response.text.splitlines():
+        if line.startswith("data:"):
+            return json.loads(line[len("data:") :])
+    raise ValueError("No JSON-RPC payload in response")
+
+
+async def _run_worker(
+    client: httpx.AsyncClient,
+    url: str,
+    tool: str,
+    arguments: dict,
+    count: int,
+    latencies: List[float],
+) -> int:
+    errors = 0
+    for i in range(count):
+        body = {
+            "jsonrpc": "2.0",
+            "id": i,
+            "method": "tools/call",
+            "params": {"name": tool, "arguments": arguments},
+        }
+        started = time.perf_counter()
+        try:
+            response = await client.post(url, json=body, headers=HEADERS)
+            response.raise_for_status()
+            payload = _parse_rpc_response(response)
+            if "error" in payload or payload.get("result", {}).get("isError"):
+                errors += 1
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - started)
+    return errors
+
+
+async def _run_process(
+    url: str, tool: str, arguments: dict, requests: int, concurrency: int
+) -> Tuple[List[float], int]:
+    latencies: List[float] = []
+    per_worker, remainder = divmod(requests, concurrency)
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        errors = await asyncio.gather(
+            *(
+                _run_worker(
+                    client,
+                    url,
+                    tool,
+                    arguments,
+                    per_worker + (1 if i < remainder else 0),
+                    latencies,
+                )
+                for i in range(concurrency)
+            )
+        )
+    return latencies, sum(errors)
+
+
+def _process_entry(args: tuple) -> Tuple[List[float], int]:
+    return asyncio.run(_run_process(*args))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://127.0.0.1:8001/mcp")
+    parser.add_argument("--tool", default="get_current_weather")
+    parser.add_argument("--arguments", default='{"city": "London"}')
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="Client processes, so the load generator is not the bottleneck.",
+    )
+    args = parser.parse_args()
+
+    arguments = json.loads(args.arguments)
+    per_process = args.requests // args.processes
+    concurrency = max(1, args.concurrency // args.processes)
+    jobs = [
+        (args.url, args.tool, arguments, per_process, concurrency)
+        for _ in range(args.processes)
+    ]
+
+    started = time.perf_counter()
+    if args.processes == 1:
+        results = [_process_entry(jobs[0])]
+    else:
+        with multiprocessing.Pool(args.processes) as pool:
+            results = pool.map(_process_entry, jobs)
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for result in results for latency in result[0])
+    errors = sum(result[1] for result in results)
+    print(f"requests:    {len(latencies)} ({errors} errors)")
+    print(f"elapsed:     {elapsed:.2f}s")
+    print(f"throughput:  {len(latencies) / elapsed:.1f} calls/s")
+    print(f"latency p50: {statistics.median(latencies) * 1000:.1f} ms")
+    p95 = latencies[min(len(latencies) - 1, math.ceil(len(latencies) * 0.95) - 1)]
+    print(f"latency p95: {p95 * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmarks the conversation memory's vector index: rebuilding an index from
+stored embeddings and top-k query latency, at growing index sizes.
+
+    python -m benchmarks.memory_index --sizes 10000,100000,1000000
+    python -m benchmarks.memory_index --sizes 1000000,2000000 --dimensions 128
+    python -m benchmarks.memory_index --sizes 10000,100000 --postgres
+
+Vectors are random unit vectors of the configured embedding size. With
+--postgres the rows are also written for a bench user and the index is
+rebuilt from the database, as on a user's first recall.
+
+A rebuild briefly holds three copies of the vectors: the stored rows, their
+joined buffer and the index matrix, so about 12 bytes per dimension and
+entry. A million entries at 512 dimensions need about 6 GiB, at 128
+dimensions about 1.5 GiB. Query time grows with entries times dimensions.
+"""
+
+import argparse
+import asyncio
+import math
+import statistics
+import time
+from typing import List
+
+import numpy as np
+
+from src.ai.memory.embedders import HashingEmbedder, normalize
+from src.ai.memory.vector_index import VectorIndex, vectors_from_blobs
+from src.config.settings import settings
+
+BENCH_USER = "bench-memory"
+# Rows are generated in chunks, so the float64 draws stay small.
+GENERATE_CHUNK = 100_000
+
+
+def _percentile(values: List[float], quantile: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, math.ceil(len(values) * quantile) - 1)]
+
+
+def _random_blobs(rng: np.random.Generator, size: int, dimensions: int) -> List[bytes]:
+    """Stored rows of `size` random unit vectors."""
+    blobs = []
+    for start in range(0, size, GENERATE_CHUNK):
+        count = min(GENERATE_CHUNK, size - start)
+        vectors = normalize(rng.standard_normal((count, dimensions), dtype=np.float32))
+        blobs.extend(row.tobytes() for row in vectors)
+    return blobs
+
+
+def _query_latencies(index: VectorIndex, queries: np.ndarray, k: int) -> List[float]:
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query, k)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def _rebuild_from_postgres(blobs: List[bytes]) -> float:
+    """Writes the rows for the bench user and times loading them back."""
+    from psycopg_pool import AsyncConnectionPool
+
+    from src.ai.memory.conversation_memory import ConversationMemory
+
+    pool = AsyncConnectionPool(conninfo=settings.db_dsn, open=False)
+    await pool.open(wait=True)
+    embedder = HashingEmbedder(settings.memory_embedding_dimensions)
+    try:
+        async with pool.connection() as conn:
+            await conn.execute(
+                "delete from public.conversation_memories where username = %s",
+                (BENCH_USER,),
+            )
+            async with conn.cursor() as cur:
+                async with cur.copy(
+                    "copy public.conversation_memories "
+                    "(username, thread_id, embedder, content, embedding) from stdin"
+                ) as copy:
+                    for i, blob in enumerate(blobs):
+                        await copy.write_row(
+                            (BENCH_USER, f"{BENCH_USER}-{i}", embedder.name, "", blob)
+                        )
+
+        memory = ConversationMemory(pool, embedder)
+        started = time.perf_counter()
+        await memory._synced_index(BENCH_USER)
+        return time.perf_counter() - started
+    finally:
+        async with pool.connection() as conn:
+            await conn.execute(
+                "delete from public.conversation_memories where username = %s",
+                (BENCH_USER,),
+            )
+        await pool.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=settings.memory_top_k * 3)
+    parser.add_argument(
+        "--dimensions", type=int, default=settings.memory_embedding_dimensions
+    )
+    parser.add_argument("--postgres", action="store_true")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    embedder = HashingEmbedder(args.dimensions)
+    texts = [f"what was the weather in city {i} last week" for i in range(200)]
+    started = time.perf_counter()
+    await embedder.embed_documents(texts)
+    embed_us = (time.perf_counter() - started) / len(texts) * 1e6
+    print(f"hashing embedder: {embed_us:.1f} us per text ({args.dimensions} dims)")
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        blobs = _random_blobs(rng, size, args.dimensions)
+
+        started = time.perf_counter()
+        index = VectorIndex()
+        index.add(np.arange(1, size + 1), vectors_from_blobs(blobs))
+        rebuild = time.perf_counter() - started
+
+        queries = normalize(
+            rng.standard_normal((args.queries, args.dimensions), dtype=np.float32)
+        )
+        latencies = _query_latencies(index, queries, args.k)
+        print(f"{size:>10,} entries, {size * args.dimensions * 4 / 2**20:,.0f} MiB")
+        print(f"  rebuild:   {rebuild * 1000:10.1f} ms from stored rows")
+        if args.postgres:
+            print(
+                f"  rebuild:   {await _rebuild_from_postgres(blobs) * 1000:10.1f} ms"
+                " from postgres"
+            )
+        print(f"  query p50: {statistics.median(latencies) * 1000:10.3f} ms")
+        print(f"  query p95: {_percentile(latencies, 0.95) * 1000:10.3f} ms")
+        del index, blobs
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+"""
+Micro-benchmark for the per-user rate limiter's hot path.
+
+Measures the cost of admitting one request (and debiting a turn's tokens)
+with the in-memory backend and, if a database is reachable, the Postgres one:
+
+    python -m benchmarks.rate_limiter --backend memory --ops 200000
+    python -m benchmarks.rate_limiter --backend postgres --ops 5000 --concurrency 8
+
+Tiers are set generously so every request is admitted and only the
+bookkeeping is timed.
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import statistics
+import time
+from typing import List
+
+os.environ.setdefault(
+    "RATE_LIMIT_TIERS",
+    '{"default": {"requests_per_minute": 1e9, "request_burst": 1e9,'
+    ' "tokens_per_minute": 1e12, "token_burst": 1e12}}',
+)
+
+from src.api.rate_limit import (  # noqa: E402
+    InMemoryRateLimiter,
+    PostgresRateLimiter,
+)
+from src.config.settings import settings  # noqa: E402
+
+
+async def _run_ops(
+    limiter, users: List[str], ops: int, debit_every: int
+) -> List[float]:
+    timings = []
+    for i in range(ops):
+        subject = users[i % len(users)]
+        started = time.perf_counter()
+        await limiter.acquire(subject)
+        if debit_every and i % debit_every == 0:
+            await limiter.debit_tokens(subject, 1500)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def _report(label: str, timings: List[float], elapsed: float):
+    timings.sort()
+    p99 = timings[min(len(timings) - 1, math.ceil(len(timings) * 0.99) - 1)]
+    print(f"{label}")
+    print(
+        f"  ops:      {len(timings)} in {elapsed:.2f}s ({len(timings) / elapsed:,.0f}/s)"
+    )
+    print(f"  p50:      {statistics.median(timings) * 1e6:.2f} us")
+    print(f"  p99:      {p99 * 1e6:.2f} us")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--backend", choices=["memory", "postgres"], default="memory")
+    parser.add_argument("--ops", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument(
+        "--debit-every", type=int, default=1, help="Debit tokens every N requests."
+    )
+    args = parser.parse_args()
+
+    users = [f"bench-user-{i}" for i in range(args.users)]
+    pool = None
+    if args.backend == "postgres":
+        from psycopg_pool import AsyncConnectionPool
+
+        pool = AsyncConnectionPool(
+            conninfo=settings.db_dsn, open=False, max_size=max(args.concurrency, 4)
+        )
+        await pool.open(wait=True)
+        limiter = PostgresRateLimiter(pool)
+    else:
+        limiter = InMemoryRateLimiter()
+
+    try:
+        per_worker = args.ops // args.concurrency
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(
+                _run_ops(
+                    limiter, users[i :: args.concurrency], per_worker, args.debit_every
+                )
+                for i in range(args.concurrency)
+            )
+        )
+        elapsed = time.perf_counter() - started
+    finally:
+        if pool is not None:
+            async with pool.connection() as conn:
+                await conn.execute(
+                    "delete from public.rate_limit_buckets where username like 'bench-user-%'"
+                )
+            await pool.close()
+
+    _report(
+        f"{args.backend} backend, {args.users} users, concurrency {args.concurrency}",
+        [t for timings in results for t in timings],
+        elapsed,
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
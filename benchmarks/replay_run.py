@@ -0,0 +1,253 @@
+"""
+Replays recorded chat turns through the real ChatAgent graph and ChatService
+SSE path without any network access, so graph, serialization and checkpoint
+overheads can be measured and profiled offline.
+
+Record cassettes by running the API with REPLAY_MODE=record, then:
+
+    python -m benchmarks.replay_run --timing 0 --repeat 5
+    python -m benchmarks.replay_run --timing 0 --profile replay.prof
+    python -m benchmarks.replay_run --checkpointer postgres
+
+Soak mode replays many turns across many threads, cloned from the recorded
+turns, and samples RSS and traced memory as it goes, to spot memory that
+grows with traffic. With --tracemalloc it reports the allocation sites that
+grew most after the first (warm-up) sample:
+
+    python -m benchmarks.replay_run --timing 0 --soak 20000 --threads 500
+    python -m benchmarks.replay_run --timing 0 --soak 5000 --tracemalloc 5
+
+The in-memory checkpointer keeps every checkpoint by design, so it shows
+up as growth; --checkpointer postgres leaves it out.
+"""
+
+import argparse
+import asyncio
+import cProfile
+import gc
+import math
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List
+
+os.environ["REPLAY_MODE"] = "replay"
+for key in ("GOOGLE_API_KEY", "TAVILY_API_KEY", "WEATHER_API_KEY"):
+    os.environ.setdefault(key, "replay")
+
+from fastapi import BackgroundTasks  # noqa: E402
+from langgraph.checkpoint.memory import InMemorySaver  # noqa: E402
+
+from src.ai.agents.chat_agent import ChatAgent  # noqa: E402
+from src.ai.replay.cassette import Cassette, iter_cassettes  # noqa: E402
+from src.ai.replay.replay_tools import load_replay_tools  # noqa: E402
+from src.api.services.chat_service import ChatService  # noqa: E402
+from src.config.settings import settings  # noqa: E402
+from src.monitoring.alloc_profiler import rss_bytes, top_growth  # noqa: E402
+
+
+async def _build_service(checkpointer_kind: str, stack) -> ChatService:
+    if checkpointer_kind == "postgres":
+        from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+        from psycopg_pool import AsyncConnectionPool
+
+        pool = AsyncConnectionPool(conninfo=settings.db_dsn, open=False)
+        await pool.open(wait=True)
+        stack.append(pool)
+        checkpointer = AsyncPostgresSaver(pool)
+        await checkpointer.setup()
+    else:
+        checkpointer = InMemorySaver()
+
+    agent = ChatAgent(tools=load_replay_tools(settings.replay_cassette_dir))
+    await agent.build_with_checkpointer(checkpointer)
+    return ChatService(agent)
+
+
+async def _replay_once(service: ChatService, cassettes) -> List[Dict[str, float]]:
+    results = []
+    for cassette in cassettes:
+        started = time.perf_counter()
+        first_chunk = None
+        events = 0
+        sent_bytes = 0
+        async for event in service.stream_chat(
+            cassette.user_input, cassette.session_id, BackgroundTasks()
+        ):
+            if first_chunk is None and b'"chunk"' in event:
+                first_chunk = time.perf_counter() - started
+            events += 1
+            sent_bytes += len(event)
+        results.append(
+            {
+                "total": time.perf_counter() - started,
+                "ttft": first_chunk or 0.0,
+                "events": events,
+                "bytes": sent_bytes,
+            }
+        )
+    return results
+
+
+async def _replay_turn(service: ChatService, cassette: Cassette):
+    async for _ in service.stream_chat(
+        cassette.user_input, cassette.session_id, BackgroundTasks()
+    ):
+        pass
+
+
+def _clone_cassettes(
+    cassettes: List[Cassette], directory: str, threads: int
+) -> List[Cassette]:
+    """One cassette per soak thread, cycling through the recorded turns."""
+    clones = []
+    for i in range(threads):
+        source = cassettes[i % len(cassettes)]
+        session_id = f"soak-{i}"
+        clone = Cassette(
+            Cassette.path_for(directory, session_id, source.user_input),
+            session_id,
+            source.user_input,
+            source.interactions,
+        )
+        clone.save()
+        clones.append(clone)
+    return clones
+
+
+async def soak(args: argparse.Namespace, cassettes: List[Cassette]):
+    pools: list = []
+    with tempfile.TemporaryDirectory() as directory:
+        threads = _clone_cassettes(cassettes, directory, args.threads)
+        settings.replay_cassette_dir = directory
+        if args.tracemalloc:
+            tracemalloc.start(args.tracemalloc)
+        try:
+            service = await _build_service(args.checkpointer, pools)
+            semaphore = asyncio.Semaphore(args.concurrency)
+
+            async def turn(index: int):
+                async with semaphore:
+                    await _replay_turn(service, threads[index % len(threads)])
+
+            per_sample = max(args.soak // args.samples, 1)
+            baseline_rss = 0
+            baseline = None
+            started = time.perf_counter()
+            print(
+                f"{'turns':>8} {'elapsed':>9} {'turns/s':>8} {'rss MiB':>8} "
+                f"{'traced MiB':>11}"
+            )
+            for sample in range(args.samples):
+                sample_started = time.perf_counter()
+                await asyncio.gather(
+                    *(turn(sample * per_sample + i) for i in range(per_sample))
+                )
+                gc.collect()
+                rss = rss_bytes()
+                traced = tracemalloc.get_traced_memory()[0] if args.tracemalloc else 0
+                rate = per_sample / (time.perf_counter() - sample_started)
+                print(
+                    f"{(sample + 1) * per_sample:>8} "
+                    f"{time.perf_counter() - started:>8.1f}s {rate:>8.1f} "
+                    f"{rss / 2**20:>8.1f} {traced / 2**20:>11.1f}"
+                )
+                # The first sample warms up caches, clients and lazy imports.
+                if sample == 0:
+                    baseline_rss = rss
+                    if args.tracemalloc:
+                        baseline = tracemalloc.take_snapshot()
+        finally:
+            for pool in pools:
+                await pool.close()
+
+    measured = per_sample * (args.samples - 1)
+    if measured:
+        growth = rss - baseline_rss
+        print(
+            f"rss growth after warm-up: {growth / 2**20:.1f} MiB over {measured} "
+            f"turns ({growth / measured * 1000 / 2**10:.1f} KiB per 1000 turns)"
+        )
+    if baseline is not None:
+        print("top growing allocation sites:")
+        for site in top_growth(baseline, tracemalloc.take_snapshot(), args.top):
+            print(
+                f"  {site['size_diff'] / 2**10:>10.1f} KiB "
+                f"{site['count_diff']:>+8} blocks  {site['site']}"
+            )
+        tracemalloc.stop()
+
+
+async def run(args: argparse.Namespace):
+    settings.replay_timing = args.timing
+    cassettes = list(iter_cassettes(settings.replay_cassette_dir))
+    if not cassettes:
+        raise SystemExit(f"No cassettes found in '{settings.replay_cassette_dir}'.")
+    if args.soak:
+        await soak(args, cassettes)
+        return
+
+    results: List[Dict[str, float]] = []
+    profiler = cProfile.Profile() if args.profile else None
+    pools: list = []
+    started = time.perf_counter()
+    try:
+        for _ in range(args.repeat):
+            # A fresh checkpointer per repetition keeps every replayed thread
+            # identical to its recording.
+            service = await _build_service(args.checkpointer, pools)
+            if profiler:
+                profiler.enable()
+            results.extend(await _replay_once(service, cassettes))
+            if profiler:
+                profiler.disable()
+    finally:
+        for pool in pools:
+            await pool.close()
+    elapsed = time.perf_counter() - started
+
+    totals = sorted(r["total"] for r in results)
+    print(f"turns:      {len(results)} from {len(cassettes)} cassettes")
+    print(f"elapsed:    {elapsed:.2f}s (timing factor {args.timing})")
+    print(f"turn p50:   {statistics.median(totals) * 1000:.2f} ms")
+    p95_index = min(len(totals) - 1, math.ceil(len(totals) * 0.95) - 1)
+    print(f"turn p95:   {totals[p95_index] * 1000:.2f} ms")
+    print(f"ttft p50:   {statistics.median(r['ttft'] for r in results) * 1000:.2f} ms")
+    print(f"sse events: {sum(r['events'] for r in results)}")
+    print(f"sse bytes:  {sum(r['bytes'] for r in results)}")
+    if profiler:
+        profiler.dump_stats(args.profile)
+        print(f"profile:    written to {args.profile}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--timing",
+        type=float,
+        default=1.0,
+        help="Scale for recorded delays: 1.0 real time, 0 no delays.",
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument(
+        "--checkpointer", choices=["memory", "postgres"], default="memory"
+    )
+    parser.add_argument("--profile", help="Write cProfile stats to this file.")
+    parser.add_argument("--soak", type=int, help="Soak test with this many turns.")
+    parser.add_argument("--threads", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--samples", type=int, default=10)
+    parser.add_argument(
+        "--tracemalloc",
+        type=int,
+        default=0,
+        help="Trace allocations with this many frames (slow); 0 is off.",
+    )
+    parser.add_argument("--top", type=int, default=15)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
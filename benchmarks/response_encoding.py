@@ -0,0 +1,126 @@
+"""
+Measures the API's response encoding: CPU time of JSON encoding with the
+standard library and with orjson, and bytes on the wire with and without
+the compression middleware, for SSE streams and chat history bodies.
+
+Runs in process on synthetic turns, without a database or the model:
+
+    python -m benchmarks.response_encoding --messages 200 --events 400
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Callable, List
+
+import httpx
+import orjson
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.api.compression import CompressionMiddleware
+
+WORDS = (
+    "the weather in berlin is sunny with a light breeze and temperatures around "
+    "twenty degrees while later in the evening clouds may bring some rain showers "
+    "so an umbrella could be useful if you plan to stay outside for long"
+).split()
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _history(rng: random.Random, messages: int) -> List[dict]:
+    history = []
+    for i in range(messages):
+        if i % 2:
+            message = AIMessage(content=_text(rng, rng.randint(40, 160)))
+        else:
+            message = HumanMessage(content=_text(rng, rng.randint(5, 25)))
+        history.append(message.dict())
+    return history
+
+
+def _stdlib_sse(event_type: str, data: str) -> bytes:
+    return f"data: {json.dumps({'type': event_type, 'data': data})}\n\n".encode()
+
+
+def _orjson_sse(event_type: str, data: str) -> bytes:
+    return b"data: " + orjson.dumps({"type": event_type, "data": data}) + b"\n\n"
+
+
+def _cpu_per_call(fn: Callable[[], object], repeat: int) -> float:
+    started = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - started) / repeat
+
+
+def _build_app(history: List[dict], chunks: List[str], compress: bool) -> FastAPI:
+    app = FastAPI()
+    if compress:
+        app.add_middleware(CompressionMiddleware)
+
+    @app.get("/history")
+    async def get_history():
+        return ORJSONResponse(history)
+
+    @app.get("/stream")
+    async def stream():
+        async def events():
+            for chunk in chunks:
+                yield _orjson_sse("chunk", chunk)
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+async def _wire(app: FastAPI, path: str, repeat: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport,
+        base_url="http://bench",
+        headers={"Accept-Encoding": "gzip"},
+    ) as client:
+        started = time.process_time()
+        for _ in range(repeat):
+            response = await client.get(path)
+        cpu = (time.process_time() - started) / repeat
+    return response.num_bytes_downloaded, cpu
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=200, help="History length.")
+    parser.add_argument("--events", type=int, default=400, help="SSE chunk events.")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    history = _history(rng, args.messages)
+    chunks = [_text(rng, rng.randint(1, 6)) + " " for _ in range(args.events)]
+
+    print("json encoding, cpu")
+    for label, fn in (("stdlib", _stdlib_sse), ("orjson", _orjson_sse)):
+        cost = _cpu_per_call(lambda: [fn("chunk", c) for c in chunks], args.repeat)
+        print(f"  sse {label}:     {cost / len(chunks) * 1e6:8.2f} us per event")
+    for label, response_class in (("stdlib", JSONResponse), ("orjson", ORJSONResponse)):
+        cost = _cpu_per_call(lambda: response_class(history), args.repeat)
+        print(f"  history {label}: {cost * 1000:8.2f} ms per body")
+
+    print("bytes on the wire (cpu per response, including the ASGI round trip)")
+    for path in ("/history", "/stream"):
+        for compress in (False, True):
+            app = _build_app(history, chunks, compress)
+            size, cpu = await _wire(app, path, args.repeat)
+            label = f"{path} {'gzip' if compress else 'identity'}"
+            print(f"  {label:20} {size:10,} bytes {cpu * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
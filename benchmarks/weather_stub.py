@@ -0,0 +1,64 @@
+"""
+A canned stand-in for the upstream weather API, used by load tests so they
+measure the MCP server rather than the third-party service.
+
+Usage:
+    python -m benchmarks.weather_stub --port 8099 --latency-ms 20
+"""
+
+import argparse
+import asyncio
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+
+def build_payload(city: str) -> dict:
+    """Builds a response shaped like weatherapi.com's current.json."""
+    return {
+        "location": {
+            "name": city,
+            "region": "",
+            "country": "Stubland",
+            "lat": 0.0,
+            "lon": 0.0,
+            "tz_id": "UTC",
+            "localtime": "2025-01-01 12:00",
+        },
+        "current": {
+            "condition": {"text": "Sunny", "icon": "", "code": 1000},
+            "temp_c": 21.0,
+            "temp_f": 69.8,
+            "is_day": 1,
+            "wind_kph": 5.0,
+            "feelslike_c": 21.0,
+            "uv": 4.0,
+            "humidity": 40,
+            "cloud": 0,
+        },
+    }
+
+
+def create_app(latency_ms: float) -> Starlette:
+    async def current(request: Request) -> JSONResponse:
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        return JSONResponse(build_payload(request.query_params.get("q", "Unknown")))
+
+    return Starlette(routes=[Route("/current.json", current)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.latency_ms), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Compares the chat transports under concurrent turns: SSE over keep-alive
+connections, SSE with a new connection per turn, and one WebSocket that
+multiplexes every session.
+
+Start the API in replay mode without rate limits, then point the benchmark
+at the same cassette directory. It clones one recorded turn for each bench
+session and removes the clones afterwards:
+
+    REPLAY_MODE=replay REPLAY_TIMING=0 RATE_LIMIT_ENABLED=false \\
+        CHAT_WS_MAX_ACTIVE_TURNS=64 python main.py api
+    python -m benchmarks.ws_vs_sse --sessions 32 --turns 20
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import statistics
+import time
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+import websockets
+
+from src.ai.replay.cassette import Cassette, iter_cassettes
+from src.config.settings import settings
+
+
+def _clone_cassettes(directory: str, sessions: int) -> List[Cassette]:
+    template = next(iter_cassettes(directory), None)
+    if template is None:
+        raise SystemExit(f"No cassettes found in '{directory}'.")
+    clones = []
+    for i in range(sessions):
+        session_id = f"bench-{i}"
+        clone = Cassette(
+            Cassette.path_for(directory, session_id, template.user_input),
+            session_id,
+            template.user_input,
+            template.interactions,
+        )
+        clone.save()
+        clones.append(clone)
+    return clones
+
+
+async def _sse_turn(client: httpx.AsyncClient, url: str, cassette: Cassette) -> int:
+    received = 0
+    body = {"message": cassette.user_input, "session_id": cassette.session_id}
+    async with client.stream("POST", url, json=body) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_bytes():
+            received += len(chunk)
+    return received
+
+
+async def _run_sse(base_url: str, cassettes, turns: int, keep_alive: bool):
+    url = f"{base_url}/chat/stream"
+    limits = httpx.Limits(
+        max_connections=len(cassettes),
+        max_keepalive_connections=len(cassettes) if keep_alive else 0,
+    )
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+
+        async def turn(cassette: Cassette) -> int:
+            return await _sse_turn(client, url, cassette)
+
+        return await _drive(cassettes, turns, turn)
+
+
+async def _run_ws(base_url: str, cassettes, turns: int):
+    url = base_url.replace("http", "ws", 1) + "/chat/ws"
+    async with websockets.connect(url, max_size=None) as ws:
+        waiters: Dict[str, asyncio.Queue] = {
+            c.session_id: asyncio.Queue() for c in cassettes
+        }
+
+        async def read_frames():
+            async for frame in ws:
+                message = json.loads(frame)
+                waiters[message["s"]].put_nowait((message, len(frame)))
+
+        reader = asyncio.create_task(read_frames())
+
+        async def turn(cassette: Cassette) -> int:
+            frames = waiters[cassette.session_id]
+            await ws.send(
+                json.dumps(
+                    {"op": "send", "s": cassette.session_id, "m": cassette.user_input}
+                )
+            )
+            received = 0
+            while True:
+                message, size = await frames.get()
+                received += size
+                if message["t"] == "error":
+                    raise RuntimeError(
+                        f"Turn failed on {cassette.session_id}: {message['d']}"
+                    )
+                if message["t"] == "end":
+                    return received
+
+        try:
+            return await _drive(cassettes, turns, turn)
+        finally:
+            reader.cancel()
+
+
+async def _drive(
+    cassettes: List[Cassette],
+    turns: int,
+    turn: Callable[[Cassette], Awaitable[int]],
+):
+    """Runs `turns` sequential turns on every session, all sessions at once."""
+    latencies: List[float] = []
+    received: List[int] = []
+
+    async def session(cassette: Cassette):
+        for _ in range(turns):
+            started = time.perf_counter()
+            received.append(await turn(cassette))
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(session(cassette) for cassette in cassettes))
+    return latencies, received, time.perf_counter() - started
+
+
+def _report(label: str, latencies: List[float], received: List[int], elapsed: float):
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, math.ceil(len(latencies) * 0.95) - 1)]
+    print(label)
+    print(
+        f"  turns:     {len(latencies)} in {elapsed:.2f}s ({len(latencies) / elapsed:,.1f}/s)"
+    )
+    print(f"  turn p50:  {statistics.median(latencies) * 1000:.2f} ms")
+    print(f"  turn p95:  {p95 * 1000:.2f} ms")
+    print(f"  bytes:     {statistics.mean(received):,.0f} per turn")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--sessions", type=int, default=16)
+    parser.add_argument("--turns", type=int, default=10, help="Turns per session.")
+    parser.add_argument("--cassette-dir", default=settings.replay_cassette_dir)
+    args = parser.parse_args()
+
+    cassettes = _clone_cassettes(args.cassette_dir, args.sessions)
+    try:
+        _report(
+            "sse, keep-alive",
+            *await _run_sse(args.url, cassettes, args.turns, keep_alive=True),
+        )
+        _report(
+            "sse, connection per turn",
+            *await _run_sse(args.url, cassettes, args.turns, keep_alive=False),
+        )
+        _report(
+            "websocket, one connection",
+            *await _run_ws(args.url, cassettes, args.turns),
+        )
+    finally:
+        for cassette in cassettes:
+            cassette.path.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -23,6 +23,27 @@ def run_mcp_server():
     run_mcp_server()
 
 
+def run_migrations():
+    """Run database migrations once, e.g. from a deploy pipeline before rollout."""
+    from psycopg_pool import ConnectionPool
+
+    from src.api.migrations import run_migrations_sync
+    from src.config.logging_config import setup_logging
+
+    setup_logging()
+    with ConnectionPool(conninfo=settings.db_dsn, min_size=1, max_size=1) as pool:
+        run_migrations_sync(pool, wait=True)
+
+
+def run_job_worker():
+    """Run a standalone background job worker."""
+    import asyncio
+
+    from src.api.jobs.worker import run_worker
+
+    asyncio.run(run_worker())
+
+
 def run_streamlit_app():
     """Run the Streamlit UI application."""
     streamlit_path = Path(__file__).parent / "src" / "streamlit_app" / "app.py"
@@ -41,7 +62,7 @@ def run_streamlit_app():
 def main():
     """Main entry point with command selection."""
     if len(sys.argv) < 2:
-        print("Usage: python main.py [api|mcp|streamlit]")
+        print("Usage: python main.py [api|mcp|migrate|worker|streamlit]")
         sys.exit(1)
 
     command = sys.argv[1]
@@ -50,11 +71,15 @@ def main():
         run_api_server()
     elif command == "mcp":
         run_mcp_server()
+    elif command == "migrate":
+        run_migrations()
+    elif command == "worker":
+        run_job_worker()
     elif command == "streamlit":
         run_streamlit_app()
     else:
         print(f"Unknown command: {command}")
-        print("Usage: python main.py [api|mcp|streamlit]")
+        print("Usage: python main.py [api|mcp|migrate|worker|streamlit]")
         sys.exit(1)
 
 
@@ -1,13 +1,19 @@
+import asyncio
 import logging
 from typing import List, Optional
 
 from langchain_core.tools import BaseTool
-from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
 from psycopg_pool import AsyncConnectionPool
 
 from src.ai.agents.chat_agent import ChatAgent
+from src.ai.checkpointer import TracedPostgresSaver
+from src.ai.memory.conversation_memory import create_conversation_memory
+from src.ai.replay.replay_tools import load_replay_tools
+from src.ai.tools.base import catalog_key
+from src.ai.tools.circuit_breaker import CircuitOpenError
 from src.ai.tools.mcp_tools import MCPToolProvider
 from src.ai.tools.search_tools import SearchToolProvider
+from src.config.settings import settings
 
 logger = logging.getLogger(__name__)
 
@@ -19,9 +25,12 @@ class AgentManager:
 
     def __init__(self):
         self.db_pool: Optional[AsyncConnectionPool] = None
-        self.checkpointer: Optional[AsyncPostgresSaver] = None
+        self.checkpointer: Optional[TracedPostgresSaver] = None
         self.agent: Optional[ChatAgent] = None
         self._tools_cache: Optional[List[BaseTool]] = None
+        self._mcp_provider = MCPToolProvider()
+        self._mcp_tools: List[BaseTool] = []
+        self._refresh_task: Optional[asyncio.Task] = None
 
     async def start(self, db_pool: AsyncConnectionPool):
         """
@@ -32,26 +41,39 @@ class AgentManager:
             self.db_pool = db_pool
             logger.info("Agent Manager: Received shared connection pool.")
 
-            self.checkpointer = AsyncPostgresSaver(self.db_pool)
+            self.checkpointer = TracedPostgresSaver(self.db_pool)
             await self.checkpointer.setup()
             logger.info("Agent Manager: AsyncPostgresSaver setup complete.")
 
             tools = await self._get_tools()
 
-            self.agent = ChatAgent(tools=tools)
+            self.agent = ChatAgent(
+                tools=tools, memory=create_conversation_memory(self.db_pool)
+            )
             await self.agent.build_with_checkpointer(self.checkpointer)
             logger.info(
                 "Agent Manager: Persistent agent created and compiled successfully."
             )
 
+            if (
+                settings.enable_mcp_tools
+                and settings.replay_mode != "replay"
+                and settings.tool_catalog_refresh_seconds > 0
+            ):
+                self._refresh_task = asyncio.create_task(self._refresh_tools())
+
         except Exception as e:
-            logger.critical(f"Agent Manager failed to start: {e}")
+            logger.critical("Agent Manager failed to start: %s", e)
             raise
 
     async def stop(self):
         """
         Gracefully shuts down resources. The pool is closed by the lifespan manager.
         """
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+            self._refresh_task = None
         if self.db_pool:
             logger.info("Agent Manager: Releasing resources...")
             self.db_pool = None
@@ -59,21 +81,60 @@ class AgentManager:
 
     async def _get_tools(self) -> List[BaseTool]:
         """Loads and caches all available tools."""
+        if self._tools_cache is None and settings.replay_mode == "replay":
+            self._tools_cache = load_replay_tools(settings.replay_cassette_dir)
+            logger.info(
+                "Agent Manager: Loaded %s replay tools from '%s'.",
+                len(self._tools_cache),
+                settings.replay_cassette_dir,
+            )
         if self._tools_cache is None:
             tools = []
             logger.info("Agent Manager: Loading tools...")
             try:
-                mcp_provider = MCPToolProvider()
-                tools.extend(await mcp_provider.get_tools())
+                self._mcp_tools = await self._mcp_provider.get_tools()
+                tools.extend(self._mcp_tools)
                 search_provider = SearchToolProvider()
                 tools.extend(await search_provider.get_tools())
                 self._tools_cache = tools
-                logger.info(f"Agent Manager: Successfully loaded {len(tools)} tools.")
+                logger.info("Agent Manager: Successfully loaded %s tools.", len(tools))
             except Exception as e:
-                logger.error(f"Agent Manager: Error loading tools: {e}")
+                logger.error("Agent Manager: Error loading tools: %s", e)
                 self._tools_cache = []
         return self._tools_cache
 
+    async def _refresh_tools(self):
+        """
+        Reloads the MCP tool catalog periodically and swaps it into the agent
+        when it changed, so tools missing at startup appear once the server
+        is up. While the server is down the last catalog is kept; its tools
+        fail fast through the server's circuit breaker.
+        """
+        while True:
+            await asyncio.sleep(settings.tool_catalog_refresh_seconds)
+            try:
+                mcp_tools = await self._mcp_provider.load_tools()
+            except CircuitOpenError:
+                continue
+            except Exception as e:
+                logger.warning("Agent Manager: Could not refresh MCP tools: %r", e)
+                continue
+
+            if catalog_key(mcp_tools) == catalog_key(self._mcp_tools):
+                continue
+            previous = {id(tool) for tool in self._mcp_tools}
+            other_tools = [
+                tool for tool in self._tools_cache or [] if id(tool) not in previous
+            ]
+            self._mcp_tools = mcp_tools
+            self._tools_cache = mcp_tools + other_tools
+            if self.agent:
+                self.agent.set_tools(self._tools_cache)
+            logger.info(
+                "Agent Manager: Tool catalog changed, now serving %s tools.",
+                len(self._tools_cache),
+            )
+
     def get_agent(self) -> ChatAgent:
         """Returns the managed agent instance."""
         if not self.agent:
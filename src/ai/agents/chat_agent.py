@@ -1,33 +1,93 @@
+import asyncio
 import logging
 import operator
-from typing import TypedDict, Annotated, Sequence, List, Optional
+import time
+from typing import Any, Dict, TypedDict, Annotated, Sequence, List, Optional
 
-from langchain_core.messages import BaseMessage, ToolMessage, SystemMessage
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    ToolMessage,
+    SystemMessage,
+)
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import BaseTool
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import StateGraph, END
 
 from src.ai.agents.base import BaseAgent
+from src.ai.memory.conversation_memory import ConversationMemory
+from src.ai.model_registry import model_registry
+from src.ai.prefetch import DEFAULT_PREFETCH_RULES, ToolPrefetcher
 from src.ai.prompts import CHAT_AGENT_SYSTEM_PROMPT
 from src.config.settings import settings
+from src.monitoring.metrics import metrics
+from src.monitoring.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
+agent_limit_hits = metrics.counter(
+    "agent_limit_hits_total",
+    "Turns ended early by a per-turn limit, by limit "
+    "(deadline/tokens/model_calls/tool_calls).",
+)
+
+# Marks the closing AI message of a turn whose run was cancelled.
+INTERRUPTED = "interrupted"
+INTERRUPTED_PLACEHOLDER = "(The response was interrupted.)"
+TOOL_CALL_CANCELLED = "Tool call cancelled: the response was interrupted."
+
+# Marks the closing AI message of a turn that reached one of its limits.
+LIMIT_REACHED = "limit_reached"
+LIMIT_REACHED_NOTE = (
+    "This turn has reached its limit of steps. Do not call any more tools: "
+    "answer the user now from the information gathered so far, and say what "
+    "is still missing."
+)
+LIMIT_REACHED_PLACEHOLDER = (
+    "(The response was stopped because it took too many steps. "
+    "Please try again with a narrower question.)"
+)
+TOOL_CALL_SKIPPED = "Tool call skipped: the turn reached its limit of steps."
+TOOL_CALL_TIMED_OUT = "Tool call stopped: the turn reached its time limit."
+
+
+def is_interrupted(message: BaseMessage) -> bool:
+    """Whether the message closes a turn that was cancelled mid-run."""
+    return bool(message.response_metadata.get(INTERRUPTED))
+
 
 class AgentState(TypedDict):
     """State definition for the chat agent."""
 
     messages: Annotated[Sequence[BaseMessage], operator.add]
+    # Recalled excerpts of earlier conversations, for every model call of a turn.
+    memory_context: Optional[str]
+    # What the current turn has used so far, reset by its first model call.
+    turn_started_at: Optional[float]
+    model_calls: Optional[int]
+    tool_calls: Optional[int]
+    turn_tokens: Optional[int]
 
 
 class ChatAgent(BaseAgent):
     """Main conversational AI agent using LangGraph."""
 
-    def __init__(self, tools: Optional[List[BaseTool]] = None):
+    def __init__(
+        self,
+        tools: Optional[List[BaseTool]] = None,
+        memory: Optional[ConversationMemory] = None,
+    ):
         super().__init__(tools)
         self.model = None
         self.system_prompt = CHAT_AGENT_SYSTEM_PROMPT
+        self.memory = memory
+        self.prefetcher = (
+            ToolPrefetcher(DEFAULT_PREFETCH_RULES)
+            if settings.enable_tool_prefetch
+            else None
+        )
 
     async def build(self):
         """
@@ -41,25 +101,26 @@ class ChatAgent(BaseAgent):
         self, checkpointer: Optional[BaseCheckpointSaver] = None
     ):
         """Build the LangGraph agent with an optional checkpointer for persistence."""
-        self.model = ChatGoogleGenerativeAI(
-            model=settings.llm_model,
-            temperature=settings.llm_temperature,
-            google_api_key=settings.google_api_key,
+        self.model = model_registry.get_chat_model(
+            settings.llm_model, settings.llm_temperature, tools=self.tools
         )
 
-        if self.tools:
-            self.model = self.model.bind_tools(self.tools)
-
         graph = StateGraph(AgentState)
         graph.add_node("agent", self._call_model)
         graph.add_node("action", self._call_tool)
+        graph.add_node("finish", self._finish_turn)
         graph.set_entry_point("agent")
         graph.add_conditional_edges(
             "agent",
             self._should_continue,
-            {"continue": "action", "end": END},
+            {"continue": "action", "end": END, "limit": "finish"},
         )
-        graph.add_edge("action", "agent")
+        graph.add_conditional_edges(
+            "action",
+            self._after_action,
+            {"agent": "agent", "limit": "finish"},
+        )
+        graph.add_edge("finish", END)
 
         if checkpointer:
             self._runnable = graph.compile(checkpointer=checkpointer)
@@ -70,27 +131,243 @@ class ChatAgent(BaseAgent):
 
         return self._runnable
 
+    def set_tools(self, tools: List[BaseTool]):
+        """
+        Swaps the agent's tools without rebuilding the graph. The nodes read
+        the tools and the bound model on every call, so the next model call
+        sees the new catalog.
+        """
+        self.model = model_registry.get_chat_model(
+            settings.llm_model, settings.llm_temperature, tools=tools
+        )
+        self.tools = tools
+
+    async def commit_interrupted_turn(self, config: RunnableConfig, partial_text: str):
+        """
+        Closes a turn whose run was cancelled, so the thread stays valid for the
+        next turn: unanswered tool calls get a cancellation result and the
+        partial answer is saved as the turn's final, interrupted AI message.
+        """
+        snapshot = await self.runnable.aget_state(config)
+        if snapshot is None or not snapshot.next:
+            # The run either never reached the checkpointer or had finished.
+            return
+
+        messages = snapshot.values.get("messages", [])
+        updates: List[BaseMessage] = []
+        if messages and isinstance(messages[-1], AIMessage):
+            self._release_prefetches(messages[-1].tool_calls)
+            updates.extend(
+                ToolMessage(content=TOOL_CALL_CANCELLED, tool_call_id=call["id"])
+                for call in messages[-1].tool_calls
+            )
+        updates.append(
+            AIMessage(
+                content=partial_text or INTERRUPTED_PLACEHOLDER,
+                response_metadata={INTERRUPTED: True},
+            )
+        )
+        # Written as the agent's output, the turn ends without tool calls,
+        # so the graph routes to END and nothing is left pending.
+        await self.runnable.aupdate_state(
+            config, {"messages": updates}, as_node="agent"
+        )
+
+    @property
+    def recursion_limit(self) -> int:
+        """A graph step limit that lets a turn run up to its model call limit."""
+        return max(25, 2 * settings.agent_max_model_calls + 1)
+
     @staticmethod
-    def _should_continue(state: AgentState) -> str:
-        """Determine if the agent should continue or end."""
+    def _reached_limit(state: AgentState) -> Optional[str]:
+        """The first per-turn limit the turn has reached, if any."""
+        started_at = state.get("turn_started_at")
+        if (
+            settings.agent_max_turn_seconds
+            and started_at is not None
+            and time.time() - started_at >= settings.agent_max_turn_seconds
+        ):
+            return "deadline"
+        if (
+            settings.agent_max_turn_tokens
+            and (state.get("turn_tokens") or 0) >= settings.agent_max_turn_tokens
+        ):
+            return "tokens"
+        if (
+            settings.agent_max_model_calls
+            and (state.get("model_calls") or 0) >= settings.agent_max_model_calls
+        ):
+            return "model_calls"
+        if (
+            settings.agent_max_tool_calls
+            and (state.get("tool_calls") or 0) >= settings.agent_max_tool_calls
+        ):
+            return "tool_calls"
+        return None
+
+    def _should_continue(self, state: AgentState) -> str:
+        """Determine if the agent should continue, end, or stop at a limit."""
         last_message = state["messages"][-1]
         if not last_message.tool_calls:
             return "end"
+        if self._reached_limit(state):
+            return "limit"
         return "continue"
 
-    async def _call_model(self, state: AgentState):
+    def _after_action(self, state: AgentState) -> str:
+        """Stops before the next model call if a limit other than tool calls is hit."""
+        if self._reached_limit(state) not in (None, "tool_calls"):
+            return "limit"
+        return "agent"
+
+    def _prompt(
+        self,
+        messages: Sequence[BaseMessage],
+        memory_context: Optional[str],
+        note: Optional[str] = None,
+    ) -> List[BaseMessage]:
+        """Prepends the system prompt, with recalled memories and a note."""
+        if messages and isinstance(messages[0], SystemMessage):
+            return list(messages)
+        system_prompt = self.system_prompt
+        if memory_context:
+            system_prompt = f"{system_prompt}\n{memory_context}"
+        if note:
+            system_prompt = f"{system_prompt}\n{note}"
+        return [SystemMessage(content=system_prompt)] + list(messages)
+
+    async def _call_model(self, state: AgentState, config: RunnableConfig):
         """Prepares messages and calls the LLM model."""
         messages = state["messages"]
+        first_call = bool(messages) and isinstance(messages[-1], HumanMessage)
+        # Taken before recall and the model call, so the turn's deadline counts them.
+        turn_started_at = time.time() if first_call else state.get("turn_started_at")
 
-        if not messages or not isinstance(messages[0], SystemMessage):
-            messages_with_prompt = [
-                SystemMessage(content=self.system_prompt)
-            ] + messages
-        else:
-            messages_with_prompt = messages
+        # On the first model call of a turn, likely tool calls are started
+        # speculatively so their latency overlaps with the model's.
+        prefetches = []
+        if self.prefetcher and first_call:
+            prefetches = self.prefetcher.start(messages[-1].content, self.tools)
+
+        # Recall and the model call are cut off at the turn's deadline.
+        remaining = None
+        if settings.agent_max_turn_seconds:
+            remaining = max(
+                turn_started_at + settings.agent_max_turn_seconds - time.time(), 0
+            )
+        deadline = asyncio.timeout(remaining)
+
+        memory_context = state.get("memory_context")
+        response = None
+        usage = {}
+        try:
+            async with deadline:
+                if self.memory and first_call:
+                    with tracer.span("memory.recall"):
+                        memory_context = await self._recall(
+                            config, messages[-1].content
+                        )
+
+                messages_with_prompt = self._prompt(messages, memory_context)
 
-        response = await self.model.ainvoke(messages_with_prompt)
-        return {"messages": [response]}
+                with tracer.span(
+                    "llm.call", **{"llm.model": settings.llm_model}
+                ) as span:
+                    async with model_registry.limit(settings.llm_model):
+                        response = await self.model.ainvoke(messages_with_prompt)
+                    usage = response.usage_metadata or {}
+                    span.set_attribute("llm.input_tokens", usage.get("input_tokens"))
+                    span.set_attribute("llm.output_tokens", usage.get("output_tokens"))
+                    span.set_attribute("llm.tool_calls", len(response.tool_calls))
+        except TimeoutError:
+            if not deadline.expired():
+                raise
+            agent_limit_hits.inc(limit="deadline")
+            logger.warning(
+                "Model call of thread '%s' ran past the turn's deadline.",
+                config["configurable"]["thread_id"],
+            )
+            response = AIMessage(
+                content=LIMIT_REACHED_PLACEHOLDER,
+                response_metadata={LIMIT_REACHED: "deadline"},
+            )
+        finally:
+            if prefetches:
+                self.prefetcher.claim(prefetches, response)
+
+        update = {
+            "messages": [response],
+            "turn_started_at": turn_started_at,
+            "model_calls": (0 if first_call else state.get("model_calls") or 0) + 1,
+            "tool_calls": 0 if first_call else state.get("tool_calls") or 0,
+            "turn_tokens": (0 if first_call else state.get("turn_tokens") or 0)
+            + usage.get("total_tokens", 0),
+        }
+        if self.memory:
+            update["memory_context"] = memory_context
+        return update
+
+    async def _finish_turn(self, state: AgentState, config: RunnableConfig):
+        """
+        Ends a turn that reached one of its limits: tool calls the model still
+        asked for are answered as skipped, and the model, without tools, gives
+        the final answer from what the turn gathered.
+        """
+        limit = self._reached_limit(state) or "unknown"
+        agent_limit_hits.inc(limit=limit)
+        logger.warning(
+            "Turn of thread '%s' reached its %s limit after %s model and %s tool calls.",
+            config["configurable"]["thread_id"],
+            limit,
+            state.get("model_calls") or 0,
+            state.get("tool_calls") or 0,
+        )
+
+        messages = state["messages"]
+        skipped: List[BaseMessage] = []
+        if isinstance(messages[-1], AIMessage):
+            self._release_prefetches(messages[-1].tool_calls)
+            skipped = [
+                ToolMessage(content=TOOL_CALL_SKIPPED, tool_call_id=call["id"])
+                for call in messages[-1].tool_calls
+            ]
+        prompt = self._prompt(
+            list(messages) + skipped, state.get("memory_context"), LIMIT_REACHED_NOTE
+        )
+        model = model_registry.get_chat_model(
+            settings.llm_model, settings.llm_temperature
+        )
+        try:
+            with tracer.span(
+                "llm.call", **{"llm.model": settings.llm_model, "agent.limit": limit}
+            ):
+                async with model_registry.limit(settings.llm_model):
+                    response = await model.ainvoke(prompt)
+            response.response_metadata[LIMIT_REACHED] = limit
+        except Exception as e:
+            logger.error("Final answer after the %s limit failed: %s", limit, e)
+            response = AIMessage(
+                content=LIMIT_REACHED_PLACEHOLDER,
+                response_metadata={LIMIT_REACHED: limit},
+            )
+        return {"messages": skipped + [response]}
+
+    def _release_prefetches(self, tool_calls: Sequence[Dict[str, Any]]):
+        """Cancels prefetches claimed for tool calls that will not run."""
+        if self.prefetcher:
+            self.prefetcher.release(call["id"] for call in tool_calls)
+
+    async def _recall(self, config: RunnableConfig, text) -> Optional[str]:
+        """Recalls the user's relevant earlier conversations for the prompt."""
+        thread_id = config["configurable"]["thread_id"]
+        if not isinstance(text, str):
+            return None
+        try:
+            memories = await self.memory.recall(thread_id, text)
+        except Exception as e:
+            logger.error("Memory recall failed for thread %s: %s", thread_id, e)
+            return None
+        return self.memory.format_context(memories)
 
     async def _call_tool(self, state: AgentState):
         """Execute a tool call."""
@@ -101,10 +378,37 @@ class ChatAgent(BaseAgent):
             (tool for tool in self.tools if tool.name == tool_name), None
         )
 
-        if tool_to_use is None:
-            response = f"Tool '{tool_name}' not found"
-        else:
-            response = await tool_to_use.ainvoke(action["args"])
+        prefetched_tool = (
+            self.prefetcher.take(action["id"]) if self.prefetcher else None
+        )
+        # Only the first tool call runs; prefetches for the others are dropped.
+        self._release_prefetches(last_message.tool_calls[1:])
+
+        # Tool calls are cut off at the turn's deadline.
+        timeout = None
+        started_at = state.get("turn_started_at")
+        if settings.agent_max_turn_seconds and started_at is not None:
+            timeout = max(started_at + settings.agent_max_turn_seconds - time.time(), 0)
+
+        with tracer.span(
+            "agent.action",
+            **{"tool.name": tool_name, "tool.prefetched": prefetched_tool is not None},
+        ):
+            try:
+                async with asyncio.timeout(timeout) as deadline:
+                    if tool_to_use is None:
+                        response = f"Tool '{tool_name}' not found"
+                    elif prefetched_tool is not None:
+                        response = await prefetched_tool.ainvoke(action["args"])
+                    else:
+                        response = await tool_to_use.ainvoke(action["args"])
+            except TimeoutError:
+                if not deadline.expired():
+                    raise
+                response = TOOL_CALL_TIMED_OUT
 
         tool_message = ToolMessage(content=str(response), tool_call_id=action["id"])
-        return {"messages": [tool_message]}
+        return {
+            "messages": [tool_message],
+            "tool_calls": (state.get("tool_calls") or 0) + 1,
+        }
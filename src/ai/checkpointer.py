@@ -0,0 +1,46 @@
+from typing import Any, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+
+from src.monitoring.tracing import CLIENT, tracer
+
+
+class TracedPostgresSaver(AsyncPostgresSaver):
+    """Postgres checkpointer whose reads and writes show up as trace spans."""
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        with tracer.span("checkpoint.get", kind=CLIENT) as span:
+            checkpoint_tuple = await super().aget_tuple(config)
+            span.set_attribute("checkpoint.found", checkpoint_tuple is not None)
+            return checkpoint_tuple
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        with tracer.span(
+            "checkpoint.put", kind=CLIENT, **{"checkpoint.channels": len(new_versions)}
+        ):
+            return await super().aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ):
+        with tracer.span(
+            "checkpoint.put_writes", kind=CLIENT, **{"checkpoint.writes": len(writes)}
+        ):
+            await super().aput_writes(config, writes, task_id, task_path)
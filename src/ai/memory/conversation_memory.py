@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from psycopg_pool import AsyncConnectionPool
+
+from src.ai.memory.embedders import Embedder, create_embedder
+from src.ai.memory.vector_index import VectorIndex, vectors_from_blobs
+from src.api.sessions import username_from_session_id
+from src.config.settings import settings
+from src.monitoring.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+memory_recall_seconds = metrics.histogram(
+    "memory_recall_seconds", "Time to recall memories for a turn, including sync."
+)
+memory_operations = metrics.counter(
+    "memory_operations_total",
+    "Memory operations, by kind (stored/skipped/recalled/empty/error).",
+)
+
+# Rough characters per token, to keep the injected context within budget
+# without running a tokenizer.
+CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class Memory:
+    """A remembered turn from one of the user's earlier conversations."""
+
+    id: int
+    thread_id: str
+    content: str
+    created_at: datetime
+    score: float
+
+
+class _UserIndex:
+    def __init__(self):
+        self.index = VectorIndex()
+        self.lock = asyncio.Lock()
+
+
+class ConversationMemory:
+    """
+    Long-term memory across a user's conversations. Finished turns are
+    embedded and stored in Postgres; each user's vectors are loaded into an
+    in-memory index on first use and caught up with rows stored since (also
+    by other API processes) before every recall.
+    """
+
+    def __init__(
+        self,
+        pool: AsyncConnectionPool,
+        embedder: Embedder,
+        top_k: int = 4,
+        min_score: float = 0.2,
+        token_budget: int = 400,
+        min_turn_chars: int = 80,
+        cached_users: int = 1000,
+    ):
+        self.pool = pool
+        self.embedder = embedder
+        self.top_k = top_k
+        self.min_score = min_score
+        self.token_budget = token_budget
+        self.min_turn_chars = min_turn_chars
+        self.cached_users = cached_users
+        self._users: "OrderedDict[str, _UserIndex]" = OrderedDict()
+
+    async def remember(self, thread_id: str, content: str):
+        """Stores a finished turn of a user's conversation, if it is worth recalling."""
+        username = username_from_session_id(thread_id)
+        if not username or len(content) < self.min_turn_chars:
+            memory_operations.inc(kind="skipped")
+            return
+
+        query = """
+                insert into public.conversation_memories (username, thread_id, embedder, content, embedding)
+                values (%(username)s, %(thread_id)s, %(embedder)s, %(content)s, %(embedding)s); \
+                """
+        try:
+            vector = (await self.embedder.embed_documents([content]))[0]
+            async with self.pool.connection() as conn:
+                async with conn.transaction():
+                    # Serializes a user's inserts, so their ids commit in
+                    # ascending order and catch-up reads past the last id
+                    # seen cannot skip a row.
+                    await conn.execute(
+                        "select pg_advisory_xact_lock(hashtext(%(username)s));",
+                        {"username": username},
+                    )
+                    await conn.execute(
+                        query,
+                        {
+                            "username": username,
+                            "thread_id": thread_id,
+                            "embedder": self.embedder.name,
+                            "content": content,
+                            "embedding": vector.astype("float32").tobytes(),
+                        },
+                    )
+            memory_operations.inc(kind="stored")
+        except Exception as e:
+            memory_operations.inc(kind="error")
+            logger.error("Failed to store memory for thread %s: %s", thread_id, e)
+
+    async def recall(self, thread_id: str, text: str) -> List[Memory]:
+        """
+        Returns the user's memories most similar to the text, best first,
+        leaving out the current conversation, which is already in context.
+        """
+        username = username_from_session_id(thread_id)
+        if not username:
+            return []
+
+        started = time.perf_counter()
+        query_vector = await self.embedder.embed_query(text)
+        user_index = await self._synced_index(username)
+        # Extra candidates make up for those of the current thread.
+        ids, scores = user_index.index.search(query_vector, self.top_k * 3)
+        candidates = {
+            int(id_): float(score)
+            for id_, score in zip(ids, scores)
+            if score >= self.min_score
+        }
+        memories = await self._fetch(candidates, exclude_thread_id=thread_id)
+        memory_recall_seconds.observe(time.perf_counter() - started)
+        memory_operations.inc(kind="recalled" if memories else "empty")
+        return memories[: self.top_k]
+
+    def format_context(self, memories: List[Memory]) -> Optional[str]:
+        """Formats memories for the system prompt, within the token budget."""
+        budget = self.token_budget * CHARS_PER_TOKEN
+        lines = []
+        for memory in memories:
+            line = (
+                f"- ({memory.created_at:%Y-%m-%d}) {' '.join(memory.content.split())}"
+            )
+            if len(line) > budget:
+                if budget < 80:
+                    break
+                line = line[: budget - 3] + "..."
+            lines.append(line)
+            budget -= len(line)
+        if not lines:
+            return None
+        return (
+            "Excerpts from the user's earlier conversations that may be relevant. "
+            "Use them only if the user refers to them or they clearly help:\n"
+            + "\n".join(lines)
+        )
+
+    async def _synced_index(self, username: str) -> _UserIndex:
+        user_index = self._users.get(username)
+        if user_index is None:
+            user_index = self._users[username] = _UserIndex()
+            if len(self._users) > self.cached_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(username)
+
+        query = """
+                select id, embedding
+                from public.conversation_memories
+                where username = %(username)s
+                  and embedder = %(embedder)s
+                  and id > %(last_id)s
+                order by id; \
+                """
+        async with user_index.lock:
+            async with self.pool.connection() as conn:
+                # Binary results skip hex-decoding the embeddings.
+                async with conn.cursor(binary=True) as cur:
+                    await cur.execute(
+                        query,
+                        {
+                            "username": username,
+                            "embedder": self.embedder.name,
+                            "last_id": user_index.index.last_id,
+                        },
+                    )
+                    rows = await cur.fetchall()
+            if rows:
+                user_index.index.add(
+                    [row[0] for row in rows],
+                    vectors_from_blobs([row[1] for row in rows]),
+                )
+        return user_index
+
+    async def _fetch(
+        self, candidates: Dict[int, float], exclude_thread_id: str
+    ) -> List[Memory]:
+        if not candidates:
+            return []
+        query = """
+                select id, thread_id, content, created_at
+                from public.conversation_memories
+                where id = any (%(ids)s)
+                  and thread_id <> %(thread_id)s; \
+                """
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    query, {"ids": list(candidates), "thread_id": exclude_thread_id}
+                )
+                rows = await cur.fetchall()
+        memories = [
+            Memory(id_, thread_id, content, created_at, candidates[id_])
+            for id_, thread_id, content, created_at in rows
+        ]
+        return sorted(memories, key=lambda memory: memory.score, reverse=True)
+
+
+def create_conversation_memory(
+    pool: AsyncConnectionPool,
+) -> Optional[ConversationMemory]:
+    """Builds the configured conversation memory, or None if it is disabled."""
+    if not settings.enable_conversation_memory:
+        return None
+    return ConversationMemory(
+        pool,
+        create_embedder(),
+        top_k=settings.memory_top_k,
+        min_score=settings.memory_min_score,
+        token_budget=settings.memory_token_budget,
+        min_turn_chars=settings.memory_min_turn_chars,
+        cached_users=settings.memory_cached_users,
+    )
@@ -0,0 +1,109 @@
+import hashlib
+import math
+import re
+from abc import ABC, abstractmethod
+from typing import List, Sequence
+
+import numpy as np
+
+from src.config.settings import settings
+
+_WORD_PATTERN = re.compile(r"\w+")
+# Words too common to say anything about what a conversation was about.
+_STOP_WORDS = frozenset(
+    "a about all also am an and any are as at be been but by can could did do "
+    "does for from had has have he her his how i if in is it its just like me "
+    "my no not of on or our please she so than that the their them then there "
+    "these they this to too us was we were what when where which who why will "
+    "with would you your".split()
+)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scales rows to unit length, so dot products are cosine similarities."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class Embedder(ABC):
+    """Turns texts into unit-length float32 vectors."""
+
+    # Stored with every memory, so vectors of different embedders never mix.
+    name: str
+
+    @abstractmethod
+    async def embed_documents(self, texts: Sequence[str]) -> np.ndarray:
+        """Embeds texts to be stored, as an (n, dimensions) array."""
+        pass
+
+    async def embed_query(self, text: str) -> np.ndarray:
+        """Embeds a search query, as a (dimensions,) array."""
+        return (await self.embed_documents([text]))[0]
+
+
+class HashingEmbedder(Embedder):
+    """
+    Deterministic bag-of-words embedder for offline use: word unigrams and
+    bigrams are hashed into a fixed number of signed buckets, weighted by
+    sublinear term frequency, leaving out stop words. It matches on shared
+    words, not meaning.
+    """
+
+    def __init__(self, dimensions: int = 512):
+        self.dimensions = dimensions
+        self.name = f"hashing-{dimensions}"
+
+    async def embed_documents(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = {}
+            for feature in self._features(text):
+                counts[feature] = counts.get(feature, 0) + 1
+            for feature, count in counts.items():
+                digest = int.from_bytes(
+                    hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(),
+                    "little",
+                )
+                sign = 1.0 if digest & 1 else -1.0
+                vectors[row, (digest >> 1) % self.dimensions] += sign * (
+                    1.0 + math.log(count)
+                )
+        return normalize(vectors)
+
+    @staticmethod
+    def _features(text: str) -> List[str]:
+        words = [
+            word
+            for word in _WORD_PATTERN.findall(text.casefold())
+            if word not in _STOP_WORDS
+        ]
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class GoogleEmbedder(Embedder):
+    """Embeds with a Google Generative AI embedding model."""
+
+    def __init__(self, model: str):
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        self.client = GoogleGenerativeAIEmbeddings(
+            model=model, google_api_key=settings.google_api_key
+        )
+        self.name = f"google:{model}"
+
+    async def embed_documents(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = await self.client.aembed_documents(
+            list(texts), task_type="retrieval_document"
+        )
+        return normalize(np.asarray(vectors, dtype=np.float32))
+
+    async def embed_query(self, text: str) -> np.ndarray:
+        vector = await self.client.aembed_query(text, task_type="retrieval_query")
+        return normalize(np.asarray([vector], dtype=np.float32))[0]
+
+
+def create_embedder() -> Embedder:
+    """Builds the embedder configured by MEMORY_EMBEDDER."""
+    if settings.memory_embedder == "google":
+        return GoogleEmbedder(settings.memory_embedding_model)
+    return HashingEmbedder(settings.memory_embedding_dimensions)
@@ -0,0 +1,67 @@
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def vectors_from_blobs(blobs: Sequence[bytes]) -> np.ndarray:
+    """Decodes stored float32 embeddings into an (n, dimensions) array."""
+    if not blobs:
+        return np.empty((0, 0), dtype=np.float32)
+    return np.frombuffer(b"".join(blobs), dtype=np.float32).reshape(len(blobs), -1)
+
+
+class VectorIndex:
+    """
+    Append-only in-memory index of unit vectors with exact cosine top-k.
+    Vectors live in one contiguous float32 matrix that grows by doubling,
+    so a search is a single matrix-vector product over all entries.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self._capacity = capacity
+        self._vectors: Optional[np.ndarray] = None
+        self._ids = np.empty(capacity, dtype=np.int64)
+        self.size = 0
+
+    @property
+    def last_id(self) -> int:
+        """The highest id added so far, or 0."""
+        return int(self._ids[self.size - 1]) if self.size else 0
+
+    def add(self, ids: Sequence[int], vectors: np.ndarray):
+        """Adds vectors with their ids, which must be ascending."""
+        count = len(ids)
+        if count == 0:
+            return
+        if self._vectors is None:
+            self._vectors = np.empty(
+                (max(self._capacity, count), vectors.shape[1]), dtype=np.float32
+            )
+            self._ids = np.empty(len(self._vectors), dtype=np.int64)
+        elif self.size + count > len(self._vectors):
+            self._grow(self.size + count)
+        self._vectors[self.size : self.size + count] = vectors
+        self._ids[self.size : self.size + count] = ids
+        self.size += count
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the ids and cosine scores of the k nearest vectors, best first."""
+        if self.size == 0 or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        scores = self._vectors[: self.size] @ query
+        if k < self.size:
+            top = np.argpartition(scores, -k)[-k:]
+        else:
+            top = np.arange(self.size)
+        top = top[np.argsort(-scores[top])]
+        return self._ids[top], scores[top]
+
+    def _grow(self, needed: int):
+        capacity = len(self._vectors)
+        while capacity < needed:
+            capacity *= 2
+        vectors = np.empty((capacity, self._vectors.shape[1]), dtype=np.float32)
+        vectors[: self.size] = self._vectors[: self.size]
+        ids = np.empty(capacity, dtype=np.int64)
+        ids[: self.size] = self._ids[: self.size]
+        self._vectors, self._ids = vectors, ids
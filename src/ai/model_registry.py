@@ -0,0 +1,104 @@
+import asyncio
+import logging
+from contextlib import nullcontext
+from typing import AsyncContextManager, Dict, Optional, Sequence, Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import Runnable
+from langchain_core.tools import BaseTool
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from src.ai.replay.replay_model import ReplayChatModel
+from src.ai.tools.base import catalog_key
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """
+    Lazily creates chat model clients and shares them by (model, temperature,
+    tools), so every caller of the same configuration reuses one client and
+    its connection channel.
+    """
+
+    def __init__(self):
+        self._clients: Dict[Tuple[str, float], BaseChatModel] = {}
+        self._bound: Dict[Tuple[str, float, Tuple], Runnable] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def get_chat_model(
+        self,
+        model: str,
+        temperature: float,
+        tools: Optional[Sequence[BaseTool]] = None,
+    ) -> Runnable:
+        """Returns the shared client for a model, bound to the given tools."""
+        key = (model, temperature)
+        client = self._clients.get(key)
+        if client is None:
+            client = self._create_client(model, temperature)
+            self._clients[key] = client
+            logger.info(
+                "Model Registry: Created client for '%s' (%s).", model, temperature
+            )
+
+        if not tools:
+            return client
+
+        bound_key = key + (catalog_key(tools),)
+        bound = self._bound.get(bound_key)
+        if bound is None:
+            bound = client.bind_tools(tools)
+            self._bound[bound_key] = bound
+        return bound
+
+    def limit(self, model: str) -> AsyncContextManager:
+        """
+        Returns an async context manager that bounds concurrent calls to a model,
+        per MODEL_CONCURRENCY_LIMITS or MODEL_MAX_CONCURRENCY (0 means unlimited).
+        """
+        max_concurrency = settings.model_concurrency_limits.get(
+            model, settings.model_max_concurrency
+        )
+        if max_concurrency <= 0:
+            return nullcontext()
+
+        semaphore = self._semaphores.get(model)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(max_concurrency)
+            self._semaphores[model] = semaphore
+        return semaphore
+
+    async def warm_up(self, models: Sequence[Tuple[str, float]]):
+        """
+        Opens the connection channel of each model with a one-token request, so
+        the first user request after a deploy does not pay for channel setup.
+        Failures are logged and never block startup.
+        """
+
+        async def warm(model: str, temperature: float):
+            client = self.get_chat_model(model, temperature)
+            try:
+                await asyncio.wait_for(
+                    client.ainvoke("ping", generation_config={"max_output_tokens": 1}),
+                    timeout=settings.model_warmup_timeout_seconds,
+                )
+                logger.info("Model Registry: Warmed up '%s'.", model)
+            except Exception as e:
+                logger.warning("Model Registry: Warm-up of '%s' failed: %s", model, e)
+
+        await asyncio.gather(*(warm(model, temp) for model, temp in set(models)))
+
+    @staticmethod
+    def _create_client(model: str, temperature: float) -> BaseChatModel:
+        if settings.replay_mode == "replay":
+            return ReplayChatModel()
+        return ChatGoogleGenerativeAI(
+            model=model,
+            temperature=temperature,
+            google_api_key=settings.google_api_key,
+        )
+
+
+model_registry = ModelRegistry()
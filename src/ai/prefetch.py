@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import re
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool, StructuredTool
+
+from src.monitoring.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+prefetch_counter = metrics.counter(
+    "tool_prefetch_total",
+    "Speculative tool calls by outcome: started, hit (used by the tool call) or waste.",
+)
+
+# Claimed prefetches whose tool call has not run after this long are
+# cancelled, e.g. when a turn fails between the model call and the tool node.
+PREFETCH_TTL_SECONDS = 60.0
+
+
+class PrefetchRule(ABC):
+    """Detects a high-confidence tool intent in a user message."""
+
+    tool_name: str
+
+    @abstractmethod
+    def match(self, text: str) -> Optional[Dict[str, Any]]:
+        """Returns the tool arguments to prefetch, or None when unsure."""
+
+
+class WeatherCityRule(PrefetchRule):
+    """Matches plain current-weather questions about a single city."""
+
+    tool_name = "get_current_weather"
+
+    _pattern = re.compile(
+        r"^\s*(?:what(?:'s| is)\s+the\s+|how(?:'s| is)\s+the\s+)?"
+        r"(?:current\s+)?(?:weather|temperature)\s+(?:like\s+)?(?:in|for|at)\s+"
+        r"(?P<city>[^\W\d_][\w .'-]{1,60}?)"
+        r"(?:\s+(?:right\s+now|now|today))?\s*[?.!]*\s*$",
+        re.IGNORECASE,
+    )
+    _ambiguous = re.compile(
+        r"\b(?:and|or|vs|versus|tomorrow|yesterday|tonight|next|last|week|weekend)\b",
+        re.IGNORECASE,
+    )
+
+    def match(self, text: str) -> Optional[Dict[str, Any]]:
+        found = self._pattern.match(text)
+        if not found:
+            return None
+        city = found.group("city").strip()
+        # Several cities or another point in time are not a plain current lookup.
+        if self._ambiguous.search(city):
+            return None
+        return {"city": city}
+
+
+DEFAULT_PREFETCH_RULES: List[PrefetchRule] = [WeatherCityRule()]
+
+
+class Prefetch:
+    """A speculative tool call running alongside the model call."""
+
+    def __init__(self, tool: BaseTool, args: Dict[str, Any]):
+        self.tool = tool
+        self.args = args
+        # Callbacks are detached so a wasted prefetch never shows up as a tool
+        # event in the turn's stream.
+        self.task = asyncio.create_task(
+            tool.ainvoke(args, config=RunnableConfig(callbacks=[]))
+        )
+
+    def matches(self, tool_call: Dict[str, Any]) -> bool:
+        return tool_call["name"] == self.tool.name and _normalize(
+            tool_call["args"]
+        ) == _normalize(self.args)
+
+
+class ToolPrefetcher:
+    """
+    Starts tool calls speculatively from the user message, in parallel with the
+    first model call of a turn. A prefetched result is handed to the tool call
+    the model emits if it asks for the same call; otherwise it is discarded.
+    """
+
+    def __init__(self, rules: Sequence[PrefetchRule]):
+        self.rules = list(rules)
+        self._claimed: Dict[str, Prefetch] = {}
+
+    def start(self, text: str, tools: Sequence[BaseTool]) -> List[Prefetch]:
+        """Starts a prefetch for every rule that matches the user message."""
+        tools_by_name = {tool.name: tool for tool in tools}
+        prefetches = []
+        for rule in self.rules:
+            tool = tools_by_name.get(rule.tool_name)
+            if tool is None:
+                continue
+            args = rule.match(text)
+            if args is not None:
+                prefetches.append(Prefetch(tool, args))
+                prefetch_counter.inc(tool=tool.name, outcome="started")
+        return prefetches
+
+    def claim(self, prefetches: List[Prefetch], response: Optional[AIMessage]):
+        """
+        Assigns prefetches to the matching tool calls of the model response
+        and cancels the rest. A claimed prefetch counts as a hit once its tool
+        call takes it, and is released after PREFETCH_TTL_SECONDS otherwise.
+        """
+        loop = asyncio.get_running_loop()
+        tool_calls = list(response.tool_calls) if response is not None else []
+        for prefetch in prefetches:
+            tool_call = next((c for c in tool_calls if prefetch.matches(c)), None)
+            if tool_call is None:
+                prefetch.task.cancel()
+                prefetch_counter.inc(tool=prefetch.tool.name, outcome="waste")
+                continue
+            tool_calls.remove(tool_call)
+            self._claimed[tool_call["id"]] = prefetch
+            loop.call_later(PREFETCH_TTL_SECONDS, self.release, [tool_call["id"]])
+
+    def take(self, tool_call_id: str) -> Optional[BaseTool]:
+        """
+        Returns a stand-in for the tool of a claimed call that resolves to the
+        prefetched result, or None if the call was not prefetched.
+        """
+        prefetch = self._claimed.pop(tool_call_id, None)
+        if prefetch is None:
+            return None
+        prefetch_counter.inc(tool=prefetch.tool.name, outcome="hit")
+
+        async def prefetched_result(**kwargs: Any) -> Any:
+            return await prefetch.task
+
+        return StructuredTool(
+            name=prefetch.tool.name,
+            description=prefetch.tool.description,
+            args_schema=prefetch.tool.args_schema,
+            coroutine=prefetched_result,
+        )
+
+    def release(self, tool_call_ids: Iterable[str]):
+        """Cancels the claimed prefetches of tool calls that will not run."""
+        for tool_call_id in tool_call_ids:
+            prefetch = self._claimed.pop(tool_call_id, None)
+            if prefetch is not None:
+                prefetch.task.cancel()
+                prefetch_counter.inc(tool=prefetch.tool.name, outcome="waste")
+
+
+def _normalize(args: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        key: value.strip().casefold() if isinstance(value, str) else value
+        for key, value in args.items()
+    }
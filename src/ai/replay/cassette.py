@@ -0,0 +1,164 @@
+import hashlib
+import json
+import logging
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.runnables.config import ensure_config
+
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Cassettes of the turns currently in flight, keyed by thread_id. A registry is
+# used instead of a context variable because the SSE generator that opens a
+# cassette may be finalized in a different context than the one it started in.
+_active_cassettes: Dict[str, "Cassette"] = {}
+
+
+class CassetteError(RuntimeError):
+    """Raised when a replayed turn diverges from, or is missing, its recording."""
+
+
+class Cassette:
+    """Model responses and tool results recorded for a single chat turn."""
+
+    def __init__(
+        self,
+        path: Path,
+        session_id: str,
+        user_input: str,
+        interactions: Optional[List[Dict[str, Any]]] = None,
+        recorded_at: Optional[float] = None,
+    ):
+        self.path = path
+        self.session_id = session_id
+        self.user_input = user_input
+        self.interactions = interactions or []
+        self.recorded_at = recorded_at or time.time()
+        self._model_cursor = 0
+        self._tool_cursors: Dict[str, int] = {}
+
+    @staticmethod
+    def path_for(directory: str, session_id: str, user_input: str) -> Path:
+        """Returns the cassette file for a turn, derived from its thread and input."""
+        key = f"{session_id}\n{user_input}".encode("utf-8")
+        return Path(directory) / f"{hashlib.sha256(key).hexdigest()[:16]}.json"
+
+    @classmethod
+    def load(cls, path: Path) -> "Cassette":
+        """Loads a cassette from disk."""
+        if not path.exists():
+            raise CassetteError(f"No cassette recorded at '{path}'.")
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return cls(
+            path,
+            data["session_id"],
+            data["user_input"],
+            data["interactions"],
+            data.get("recorded_at"),
+        )
+
+    def save(self):
+        """Writes the cassette to disk."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "session_id": self.session_id,
+            "user_input": self.user_input,
+            "recorded_at": self.recorded_at,
+            "interactions": self.interactions,
+        }
+        self.path.write_text(json.dumps(data, indent=1), encoding="utf-8")
+
+    def record_model(self, chunks: List[Dict[str, Any]], message: BaseMessage):
+        """Records one model call: its streamed chunks with timing and the result."""
+        self.interactions.append(
+            {"kind": "model", "chunks": chunks, "message": message_to_dict(message)}
+        )
+
+    def record_tool(self, name: str, tool_input: Any, output: str, duration: float):
+        """Records one tool call with its output and duration."""
+        self.interactions.append(
+            {
+                "kind": "tool",
+                "name": name,
+                "input": tool_input,
+                "output": output,
+                "duration": duration,
+            }
+        )
+
+    def next_model(self) -> Dict[str, Any]:
+        """Returns the next recorded model call."""
+        calls = [i for i in self.interactions if i["kind"] == "model"]
+        if self._model_cursor >= len(calls):
+            raise CassetteError(
+                f"Cassette '{self.path.name}' has no more recorded model calls."
+            )
+        interaction = calls[self._model_cursor]
+        self._model_cursor += 1
+        return interaction
+
+    def next_tool(self, name: str) -> Dict[str, Any]:
+        """Returns the next recorded call of the given tool."""
+        calls = [
+            i for i in self.interactions if i["kind"] == "tool" and i["name"] == name
+        ]
+        cursor = self._tool_cursors.get(name, 0)
+        if cursor >= len(calls):
+            raise CassetteError(
+                f"Cassette '{self.path.name}' has no more recorded calls of '{name}'."
+            )
+        self._tool_cursors[name] = cursor + 1
+        return calls[cursor]
+
+
+def load_message(data: Dict[str, Any]) -> BaseMessage:
+    """Deserializes a recorded message, dropping its run-specific id."""
+    message = messages_from_dict([data])[0]
+    message.id = None
+    return message
+
+
+def iter_cassettes(directory: str) -> Iterator[Cassette]:
+    """Yields all cassettes in a directory, oldest recording first."""
+    cassettes = [Cassette.load(path) for path in Path(directory).glob("*.json")]
+    yield from sorted(cassettes, key=lambda cassette: cassette.recorded_at)
+
+
+@contextmanager
+def use_cassette(session_id: str, user_input: str) -> Iterator[Optional[Cassette]]:
+    """
+    Opens the cassette for a chat turn according to REPLAY_MODE. Recordings
+    are written when the turn finishes; outside record/replay mode it yields None.
+    """
+    if settings.replay_mode == "off":
+        yield None
+        return
+
+    path = Cassette.path_for(settings.replay_cassette_dir, session_id, user_input)
+    if settings.replay_mode == "replay":
+        cassette = Cassette.load(path)
+    else:
+        cassette = Cassette(path, session_id, user_input)
+
+    _active_cassettes[session_id] = cassette
+    try:
+        yield cassette
+    finally:
+        _active_cassettes.pop(session_id, None)
+        if settings.replay_mode == "record":
+            cassette.save()
+            logger.info("Recorded cassette '%s' for thread '%s'.", path, session_id)
+
+
+def get_active_cassette() -> Cassette:
+    """Returns the cassette of the turn running in the current thread context."""
+    thread_id = ensure_config().get("configurable", {}).get("thread_id")
+    cassette = _active_cassettes.get(thread_id)
+    if cassette is None:
+        raise CassetteError(f"No cassette is active for thread '{thread_id}'.")
+    return cassette
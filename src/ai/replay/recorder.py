@@ -0,0 +1,83 @@
+import time
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.messages import message_to_dict
+from langchain_core.outputs import ChatGenerationChunk, LLMResult
+
+from src.ai.replay.cassette import Cassette
+
+
+class CassetteRecorder(AsyncCallbackHandler):
+    """
+    Callback handler that records the model and tool calls of one chat turn,
+    including the delay before every streamed chunk, into a cassette.
+    """
+
+    run_inline = True
+
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+        self._model_runs: Dict[UUID, Dict[str, Any]] = {}
+        self._tool_runs: Dict[UUID, Dict[str, Any]] = {}
+
+    async def on_chat_model_start(
+        self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, **kwargs
+    ):
+        self._model_runs[run_id] = {"last": time.perf_counter(), "chunks": []}
+
+    async def on_llm_new_token(
+        self,
+        token: str,
+        *,
+        chunk: Optional[ChatGenerationChunk] = None,
+        run_id: UUID,
+        **kwargs,
+    ):
+        run = self._model_runs.get(run_id)
+        if run is None or not isinstance(chunk, ChatGenerationChunk):
+            return
+        now = time.perf_counter()
+        run["chunks"].append(
+            {"delay": now - run["last"], "message": message_to_dict(chunk.message)}
+        )
+        run["last"] = now
+
+    async def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        run = self._model_runs.pop(run_id, None)
+        if run is None:
+            return
+        self.cassette.record_model(run["chunks"], response.generations[0][0].message)
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self._model_runs.pop(run_id, None)
+
+    async def on_tool_start(
+        self,
+        serialized: Dict[str, Any],
+        input_str: str,
+        *,
+        run_id: UUID,
+        inputs: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ):
+        self._tool_runs[run_id] = {
+            "name": serialized.get("name"),
+            "input": inputs if inputs is not None else input_str,
+            "started": time.perf_counter(),
+        }
+
+    async def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs):
+        run = self._tool_runs.pop(run_id, None)
+        if run is None:
+            return
+        self.cassette.record_tool(
+            run["name"],
+            run["input"],
+            str(output),
+            time.perf_counter() - run["started"],
+        )
+
+    async def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self._tool_runs.pop(run_id, None)
@@ -0,0 +1,84 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import (
+    BaseChatModel,
+    agenerate_from_stream,
+)
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.messages.tool import tool_call_chunk
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+from src.ai.replay.cassette import get_active_cassette, load_message
+from src.config.settings import settings
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    Chat model that plays back the responses recorded in the active cassette,
+    streaming the recorded chunks with their original timing scaled by
+    REPLAY_TIMING (1.0 is real time, 0 disables delays).
+    """
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "ReplayChatModel":
+        """Tool schemas are irrelevant for playback; the recording decides."""
+        return self
+
+    def _generate(self, messages: List[BaseMessage], stop=None, **kwargs):
+        raise NotImplementedError("ReplayChatModel only supports async calls.")
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return await agenerate_from_stream(self._astream(messages, stop, **kwargs))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        interaction = get_active_cassette().next_model()
+        if interaction["chunks"]:
+            timeline = [
+                (chunk["delay"], load_message(chunk["message"]))
+                for chunk in interaction["chunks"]
+            ]
+        else:
+            timeline = [(0.0, _to_chunk(load_message(interaction["message"])))]
+
+        for delay, chunk in timeline:
+            delay *= settings.replay_timing
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield ChatGenerationChunk(message=chunk)
+
+
+def _to_chunk(message: AIMessage) -> AIMessageChunk:
+    """Converts a recorded non-streamed response into a single stream chunk."""
+    return AIMessageChunk(
+        content=message.content,
+        additional_kwargs=message.additional_kwargs,
+        response_metadata=message.response_metadata,
+        usage_metadata=message.usage_metadata,
+        tool_call_chunks=[
+            tool_call_chunk(
+                name=call["name"],
+                args=json.dumps(call["args"]),
+                id=call["id"],
+                index=index,
+            )
+            for index, call in enumerate(message.tool_calls)
+        ],
+    )
@@ -0,0 +1,34 @@
+import asyncio
+from typing import Any, List
+
+from langchain_core.tools import BaseTool
+
+from src.ai.replay.cassette import get_active_cassette, iter_cassettes
+from src.config.settings import settings
+
+
+class ReplayTool(BaseTool):
+    """Tool that returns the results recorded in the active cassette."""
+
+    description: str = "Replays recorded results of a tool."
+
+    def _run(self, *args: Any, **kwargs: Any) -> str:
+        raise NotImplementedError("ReplayTool only supports async calls.")
+
+    async def _arun(self, *args: Any, **kwargs: Any) -> str:
+        interaction = get_active_cassette().next_tool(self.name)
+        delay = interaction["duration"] * settings.replay_timing
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return interaction["output"]
+
+
+def load_replay_tools(directory: str) -> List[BaseTool]:
+    """Creates a replay tool for every tool name found in the recorded cassettes."""
+    names = {
+        interaction["name"]
+        for cassette in iter_cassettes(directory)
+        for interaction in cassette.interactions
+        if interaction["kind"] == "tool"
+    }
+    return [ReplayTool(name=name) for name in sorted(names)]
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Sequence, Tuple
 from langchain_core.tools import BaseTool
 
 
@@ -10,3 +10,10 @@ class ToolProvider(ABC):
     async def get_tools(self) -> List[BaseTool]:
         """Get list of tools provided by this provider."""
         pass
+
+
+def catalog_key(tools: Sequence[BaseTool]) -> Tuple:
+    """Identifies a set of tools by the names and schemas the model sees."""
+    return tuple(
+        sorted((tool.name, tool.description, repr(tool.args)) for tool in tools)
+    )
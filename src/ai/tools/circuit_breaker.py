@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Tuple, Type, TypeVar
+
+from langchain_core.tools import StructuredTool, ToolException
+
+from src.config.settings import settings
+from src.monitoring.metrics import metrics
+from src.monitoring.tracing import CLIENT, tracer
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+circuit_state = metrics.gauge(
+    "tool_circuit_state",
+    "Circuit state per tool server (0 closed, 1 half-open, 2 open).",
+)
+tool_server_calls = metrics.counter(
+    "tool_server_calls_total",
+    "Calls to tool servers, by server and outcome (ok/error/timeout/rejected).",
+)
+
+# Breakers by tool server, shared by every provider and tool of the server.
+_breakers: Dict[str, "CircuitBreaker"] = {}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a tool server whose circuit is open."""
+
+
+class ToolUnavailableError(ToolException):
+    """A tool call that failed because its server is down or unresponsive."""
+
+
+class CircuitBreaker:
+    """
+    Tracks the health of one tool server. After `failure_threshold` failed
+    calls in a row the circuit opens and calls fail immediately. Once
+    `recovery_seconds` have passed, a single probe call is let through
+    (half-open): its success closes the circuit, its failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        recovery_seconds: float = 30.0,
+        timeout_seconds: float = 10.0,
+        ignored_exceptions: Tuple[Type[BaseException], ...] = (),
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.timeout_seconds = timeout_seconds
+        # Errors that the server answered with, which prove it is up.
+        self.ignored_exceptions = ignored_exceptions
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def retry_after(self) -> float:
+        """Seconds until an open circuit lets a probe through."""
+        if self.state != OPEN:
+            return 0.0
+        return max(self.opened_at + self.recovery_seconds - time.monotonic(), 0.0)
+
+    def allow(self) -> bool:
+        """Whether a call may go to the server now."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if self.retry_after() > 0:
+                return False
+            self._transition(HALF_OPEN)
+        if self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self):
+        self._probing = False
+        self.failures = 0
+        if self.state != CLOSED:
+            self._transition(CLOSED)
+
+    def record_failure(self):
+        self._probing = False
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self._transition(OPEN)
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """Calls the server through the breaker, within the call timeout."""
+        if not self.allow():
+            tool_server_calls.inc(server=self.name, outcome="rejected")
+            raise CircuitOpenError(
+                f"Circuit for '{self.name}' is open, "
+                f"retrying in {self.retry_after():.0f}s."
+            )
+        try:
+            async with asyncio.timeout(self.timeout_seconds):
+                result = await fn()
+        except asyncio.CancelledError:
+            # The caller went away; the call proved nothing either way.
+            self._probing = False
+            raise
+        except TimeoutError:
+            tool_server_calls.inc(server=self.name, outcome="timeout")
+            self.record_failure()
+            raise
+        except self.ignored_exceptions:
+            tool_server_calls.inc(server=self.name, outcome="ok")
+            self.record_success()
+            raise
+        except Exception:
+            tool_server_calls.inc(server=self.name, outcome="error")
+            self.record_failure()
+            raise
+        tool_server_calls.inc(server=self.name, outcome="ok")
+        self.record_success()
+        return result
+
+    def _transition(self, state: str):
+        logger.warning(
+            "Circuit for tool server '%s': %s -> %s.", self.name, self.state, state
+        )
+        self.state = state
+        circuit_state.set(_STATE_VALUES[state], server=self.name)
+
+
+def get_circuit_breaker(server: str) -> CircuitBreaker:
+    """Returns the shared breaker of a tool server, creating it on first use."""
+    breaker = _breakers.get(server)
+    if breaker is None:
+        breaker = _breakers[server] = CircuitBreaker(
+            server,
+            failure_threshold=settings.tool_breaker_failure_threshold,
+            recovery_seconds=settings.tool_breaker_recovery_seconds,
+            timeout_seconds=settings.tool_call_timeout_seconds,
+            ignored_exceptions=(ToolException,),
+        )
+        circuit_state.set(_STATE_VALUES[CLOSED], server=server)
+    return breaker
+
+
+def _tool_error_message(error: ToolException) -> str:
+    # Only outages are reported to the model; other tool errors propagate as before.
+    if isinstance(error, ToolUnavailableError):
+        return str(error)
+    raise error
+
+
+def guard_tool(tool: StructuredTool, breaker: CircuitBreaker) -> StructuredTool:
+    """
+    Returns a copy of a tool whose calls go through the breaker. Calls that
+    are rejected, time out or fail to reach the server return an error
+    message to the model instead of failing the turn.
+    """
+    call_tool = tool.coroutine
+
+    async def guarded(**arguments):
+        try:
+            with tracer.span(
+                "tool.call",
+                kind=CLIENT,
+                **{"tool.name": tool.name, "tool.server": breaker.name},
+            ):
+                return await breaker.call(lambda: call_tool(**arguments))
+        except ToolException:
+            raise
+        except CircuitOpenError as e:
+            raise ToolUnavailableError(
+                f"Tool '{tool.name}' is temporarily unavailable. {e}"
+            ) from e
+        except TimeoutError as e:
+            raise ToolUnavailableError(
+                f"Tool '{tool.name}' timed out after {breaker.timeout_seconds}s."
+            ) from e
+        except Exception as e:
+            raise ToolUnavailableError(
+                f"Tool '{tool.name}' is unavailable: {type(e).__name__}."
+            ) from e
+
+    return tool.model_copy(
+        update={"coroutine": guarded, "handle_tool_error": _tool_error_message}
+    )
@@ -1,15 +1,31 @@
 import logging
-from typing import List
+from typing import Dict, List, Optional
+
+import httpx
 from langchain_core.tools import BaseTool
 from langchain_mcp_adapters.client import MultiServerMCPClient
 from langchain_mcp_adapters.sessions import StreamableHttpConnection
+from mcp.shared._httpx_utils import create_mcp_http_client
 
 from src.config.settings import settings
 from src.ai.tools.base import ToolProvider
+from src.ai.tools.circuit_breaker import get_circuit_breaker, guard_tool
+from src.monitoring.tracing import inject_traceparent
 
 logger = logging.getLogger(__name__)
 
 
+def _create_http_client(
+    headers: Optional[Dict[str, str]] = None,
+    timeout: Optional[httpx.Timeout] = None,
+    auth: Optional[httpx.Auth] = None,
+) -> httpx.AsyncClient:
+    """MCP's HTTP client, passing the trace context on to the MCP server."""
+    client = create_mcp_http_client(headers, timeout, auth)
+    client.event_hooks["request"].append(inject_traceparent)
+    return client
+
+
 class MCPToolProvider(ToolProvider):
     """Provider for MCP (Model Context Protocol) tools."""
 
@@ -22,16 +38,29 @@ class MCPToolProvider(ToolProvider):
             return []
 
         try:
-            self.client = MultiServerMCPClient(
-                connections={
-                    settings.mcp_ws_server_name: StreamableHttpConnection(
-                        transport="streamable_http", url=settings.mcp_ws_url
-                    )
-                }
-            )
-
-            tools = await self.client.get_tools(server_name=settings.mcp_ws_server_name)
-            return tools
+            return await self.load_tools()
         except Exception as e:
-            logger.warning(f"Failed to load MCP tools: {e}")
+            logger.warning("Failed to load MCP tools: %s", e)
             return []
+
+    async def load_tools(self) -> List[BaseTool]:
+        """
+        Loads the MCP server's tool catalog through the server's circuit
+        breaker, raising if the server is unavailable. Calls of the returned
+        tools go through the same breaker.
+        """
+        breaker = get_circuit_breaker(settings.mcp_ws_server_name)
+        self.client = MultiServerMCPClient(
+            connections={
+                settings.mcp_ws_server_name: StreamableHttpConnection(
+                    transport="streamable_http",
+                    url=settings.mcp_ws_url,
+                    httpx_client_factory=_create_http_client,
+                )
+            }
+        )
+
+        tools = await breaker.call(
+            lambda: self.client.get_tools(server_name=settings.mcp_ws_server_name)
+        )
+        return [guard_tool(tool, breaker) for tool in tools]
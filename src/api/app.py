@@ -5,15 +5,29 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from psycopg_pool import AsyncConnectionPool, ConnectionPool
 
 from src.ai.agent_manager import AgentManager
+from src.ai.model_registry import model_registry
+from src.api.compression import CompressionMiddleware
 from src.api.exceptions import register_exception_handlers
+from src.api.jobs.handlers import JOB_HANDLERS
+from src.api.jobs.worker import JobWorker
 from src.api.migrations import run_migrations_sync
-from src.api.routes import chat, mcp
+from src.api.rate_limit import create_rate_limiter
+from src.api.replica import create_read_router
+from src.api.request_context import RequestContextMiddleware
+from src.api.routes import admin, chat, mcp
+from src.api.turn_buffer import create_turn_buffer
+from src.api.usage import create_usage_writer
 from src.config.config_utils import get_project_version
 from src.config.logging_config import setup_logging
 from src.config.settings import settings
+from src.monitoring.alloc_profiler import AllocationMiddleware, AllocationProfiler
+from src.monitoring.loop_monitor import LoopMonitor
+from src.monitoring.metrics import metrics
+from src.monitoring.tracing import TracingMiddleware, setup_tracing, shutdown_tracing
 
 logger = logging.getLogger(__name__)
 
@@ -25,15 +39,33 @@ async def lifespan(app: FastAPI):
     before setting up the main asynchronous connection pool for the application.
     """
     setup_logging()
+    setup_tracing("py-ai-api")
     logger.info("Application startup: Initializing resources...")
 
-    # 1. Run migrations synchronously using a dedicated synchronous pool
-    try:
-        with ConnectionPool(conninfo=settings.db_dsn) as sync_pool:
-            await asyncio.to_thread(run_migrations_sync, sync_pool)
-    except Exception as e:
-        logger.critical(f"Database migration failed during startup: {e}")
-        raise
+    # Started first, so stalls during the rest of startup are caught too.
+    app.state.loop_monitor = LoopMonitor(
+        settings.loop_monitor_interval_seconds, settings.loop_stall_threshold_seconds
+    )
+    if settings.loop_monitor_enabled:
+        await app.state.loop_monitor.start()
+    app.state.alloc_profiler = AllocationProfiler()
+
+    # 1. Run migrations synchronously using a dedicated synchronous pool.
+    # Deploy pipelines may migrate once beforehand with `main.py migrate` and
+    # disable this; otherwise an advisory lock lets only one worker upgrade.
+    if settings.run_migrations_on_startup:
+        try:
+            with ConnectionPool(
+                conninfo=settings.db_dsn, min_size=1, max_size=1
+            ) as sync_pool:
+                await asyncio.to_thread(
+                    run_migrations_sync,
+                    sync_pool,
+                    settings.migration_lock_mode == "wait",
+                )
+        except Exception as e:
+            logger.critical("Database migration failed during startup: %s", e)
+            raise
 
     # 2. Set up the main asynchronous pool for the application
     db_pool = AsyncConnectionPool(conninfo=settings.db_dsn, open=False)
@@ -43,12 +75,46 @@ async def lifespan(app: FastAPI):
     manager = AgentManager()
     await manager.start(db_pool)
     app.state.agent_manager = manager
+    app.state.rate_limiter = create_rate_limiter(db_pool)
+    app.state.read_router = create_read_router(db_pool)
+    await app.state.read_router.start()
+    app.state.turn_buffer = create_turn_buffer(db_pool)
+    app.state.usage_writer = create_usage_writer()
+    if app.state.usage_writer:
+        await app.state.usage_writer.start()
+
+    if settings.model_warmup_on_startup:
+        await model_registry.warm_up(
+            [
+                (settings.llm_model, settings.llm_temperature),
+                (
+                    settings.title_determinator_llm_model,
+                    settings.title_determinator_llm_temperature,
+                ),
+            ]
+        )
+
+    # Deployments running `main.py worker` separately disable this.
+    job_worker = None
+    if settings.job_worker_in_process:
+        job_worker = JobWorker(JOB_HANDLERS, settings.job_worker_concurrency)
+        await job_worker.start()
 
     yield
 
     logger.info("Application shutdown: Cleaning up resources...")
+    if job_worker:
+        await job_worker.stop()
+    # Interrupted buffered turns are accounted, so this precedes the usage writer.
+    await app.state.turn_buffer.stop()
+    if app.state.usage_writer:
+        await app.state.usage_writer.stop()
     await app.state.agent_manager.stop()
+    await app.state.read_router.stop()
     await db_pool.close()
+    await app.state.loop_monitor.stop()
+    app.state.alloc_profiler.stop()
+    await asyncio.to_thread(shutdown_tracing)
     logger.info("Application shutdown complete.")
 
 
@@ -59,9 +125,17 @@ def create_app() -> FastAPI:
         description="AI-powered chat API with MCP integration",
         version=get_project_version(),
         lifespan=lifespan,
+        default_response_class=ORJSONResponse,
     )
 
     register_exception_handlers(api)
+    if settings.compression_enabled:
+        api.add_middleware(
+            CompressionMiddleware,
+            minimum_size=settings.compression_minimum_size,
+            compresslevel=settings.compression_level,
+            compress_streams=settings.compression_streams,
+        )
     api.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
@@ -69,9 +143,13 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    api.add_middleware(AllocationMiddleware)
+    api.add_middleware(TracingMiddleware)
+    api.add_middleware(RequestContextMiddleware)
 
     api.include_router(chat.router)
     api.include_router(mcp.router)
+    api.include_router(admin.router)
 
     @api.get("/health")
     async def health_check(request: Request):
@@ -84,6 +162,10 @@ def create_app() -> FastAPI:
             "persistence_enabled": persistence_enabled,
         }
 
+    @api.get("/metrics")
+    async def get_metrics():
+        return metrics.snapshot()
+
     return api
 
 
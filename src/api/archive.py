@@ -0,0 +1,213 @@
+import logging
+import time
+import zlib
+from datetime import datetime
+from typing import List, Optional
+
+import orjson
+from langchain_core.messages import BaseMessage, messages_from_dict, messages_to_dict
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph.state import CompiledStateGraph
+
+from src.ai.checkpointer import TracedPostgresSaver
+from src.api.db import get_db_connection, get_db_pool
+from src.api.sessions import username_from_session_id
+from src.monitoring.metrics import metrics
+from src.monitoring.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+thread_restore_seconds = metrics.histogram(
+    "thread_restore_seconds",
+    "Time to restore an archived thread into the checkpointer on access.",
+)
+archive_operations = metrics.counter(
+    "thread_archive_operations_total",
+    "Thread archive operations, by kind (archived/skipped/restored/error).",
+)
+
+# Serializes archiving and restoring of the same thread across processes.
+_LOCK_THREAD = "select pg_advisory_xact_lock(hashtextextended(%(thread_id)s, 0));"
+
+
+def pack_messages(messages: List[BaseMessage]) -> bytes:
+    return zlib.compress(orjson.dumps(messages_to_dict(messages)))
+
+
+def unpack_messages(data: bytes) -> List[BaseMessage]:
+    return messages_from_dict(orjson.loads(zlib.decompress(data)))
+
+
+def _title(messages: List[BaseMessage]) -> Optional[str]:
+    """The first message's text, the conversation list's fallback title."""
+    if messages and isinstance(messages[0].content, str):
+        return messages[0].content
+    return None
+
+
+async def find_idle_threads(idle_days: float, limit: int) -> List[tuple]:
+    """
+    Returns (thread_id, checkpoint_id, last_active) of up to `limit` threads
+    without a checkpoint in the last `idle_days` days, least recent first.
+    """
+    query = """
+            with latest as (select distinct on (thread_id) thread_id,
+                                                           checkpoint_id,
+                                                           (checkpoint ->> 'ts')::timestamptz as last_active
+                            from checkpoints
+                            where checkpoint_ns = ''
+                            order by thread_id, checkpoint_id desc)
+            select thread_id, checkpoint_id, last_active
+            from latest
+            where last_active < now() - make_interval(secs => %(idle_seconds)s)
+            order by last_active
+            limit %(limit)s; \
+            """
+    async with get_db_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                query, {"idle_seconds": idle_days * 86400, "limit": limit}
+            )
+            return await cur.fetchall()
+
+
+async def archive_thread(
+    checkpointer: TracedPostgresSaver,
+    thread_id: str,
+    checkpoint_id: str,
+    last_active: datetime,
+) -> bool:
+    """
+    Moves a thread out of the checkpoint tables into the archive, keeping
+    only the messages of its latest checkpoint. Nothing is archived if the
+    thread got a new checkpoint since `checkpoint_id` was read.
+    """
+    config = RunnableConfig(configurable={"thread_id": thread_id})
+    checkpoint_tuple = await checkpointer.aget_tuple(config)
+    if (
+        checkpoint_tuple is None
+        or checkpoint_tuple.config["configurable"]["checkpoint_id"] != checkpoint_id
+    ):
+        return False
+    messages = checkpoint_tuple.checkpoint["channel_values"].get("messages", [])
+
+    latest_query = """
+                   select max(checkpoint_id)
+                   from checkpoints
+                   where thread_id = %(thread_id)s
+                     and checkpoint_ns = ''; \
+                   """
+    insert_query = """
+                   insert into public.conversation_archive
+                   (thread_id, username, title, checkpoint_id, message_count, messages, last_active)
+                   values (%(thread_id)s, %(username)s, %(title)s, %(checkpoint_id)s,
+                           %(message_count)s, %(messages)s, %(last_active)s)
+                   on conflict (thread_id) do nothing; \
+                   """
+    params = {
+        "thread_id": thread_id,
+        "username": username_from_session_id(thread_id),
+        "title": _title(messages),
+        "checkpoint_id": checkpoint_id,
+        "message_count": len(messages),
+        "messages": pack_messages(messages),
+        "last_active": last_active,
+    }
+    async with get_db_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(_LOCK_THREAD, params)
+            await cur.execute(latest_query, params)
+            if (await cur.fetchone())[0] != checkpoint_id:
+                return False
+            await cur.execute(insert_query, params)
+            if cur.rowcount != 1:
+                return False
+            for table in ("checkpoint_writes", "checkpoint_blobs", "checkpoints"):
+                await cur.execute(
+                    f"delete from {table} where thread_id = %(thread_id)s", params
+                )
+    return True
+
+
+async def archive_idle_threads(idle_days: float, batch_size: int) -> int:
+    """
+    Archives one batch of threads idle for longer than `idle_days` days.
+    Returns how many idle threads were found, so callers can tell whether
+    more are left.
+    """
+    idle_threads = await find_idle_threads(idle_days, batch_size)
+    checkpointer = TracedPostgresSaver(await get_db_pool())
+    archived = 0
+    for thread_id, checkpoint_id, last_active in idle_threads:
+        try:
+            if await archive_thread(
+                checkpointer, thread_id, checkpoint_id, last_active
+            ):
+                archived += 1
+                archive_operations.inc(kind="archived")
+            else:
+                archive_operations.inc(kind="skipped")
+        except Exception as e:
+            archive_operations.inc(kind="error")
+            logger.error("Could not archive thread '%s': %s", thread_id, e)
+    if idle_threads:
+        logger.info("Archived %s of %s idle threads.", archived, len(idle_threads))
+    return len(idle_threads)
+
+
+async def restore_thread(graph: CompiledStateGraph, thread_id: str) -> bool:
+    """
+    Restores an archived thread into the checkpointer, as a single checkpoint
+    holding its messages, so the next read or turn finds it as it was left.
+    Returns whether the thread was archived. Threads not in the archive
+    cost one primary key lookup.
+    """
+    exists_query = (
+        "select 1 from public.conversation_archive where thread_id = %(thread_id)s;"
+    )
+    select_query = """
+                   select messages
+                   from public.conversation_archive
+                   where thread_id = %(thread_id)s; \
+                   """
+    delete_query = (
+        "delete from public.conversation_archive where thread_id = %(thread_id)s;"
+    )
+    params = {"thread_id": thread_id}
+    async with get_db_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(exists_query, params)
+            if await cur.fetchone() is None:
+                return False
+
+    started = time.perf_counter()
+    with tracer.span("thread.restore", **{"session.id": thread_id}) as span:
+        async with get_db_connection() as conn:
+            async with conn.cursor() as cur:
+                # Held until the state is written, so concurrent requests for
+                # the thread wait and then find it restored.
+                await cur.execute(_LOCK_THREAD, params)
+                await cur.execute(select_query, params)
+                row = await cur.fetchone()
+                if row is None:
+                    return False
+                messages = unpack_messages(row[0])
+                span.set_attribute("thread.messages", len(messages))
+                if messages:
+                    config = RunnableConfig(configurable={"thread_id": thread_id})
+                    # Written as the agent's output, the last turn stays closed.
+                    await graph.aupdate_state(
+                        config, {"messages": messages}, as_node="agent"
+                    )
+                await cur.execute(delete_query, params)
+
+    elapsed = time.perf_counter() - started
+    thread_restore_seconds.observe(elapsed)
+    archive_operations.inc(kind="restored")
+    logger.info(
+        "Restored archived thread '%s' with %s messages in %.3fs.",
+        thread_id,
+        len(messages),
+        elapsed,
+    )
+    return True
@@ -0,0 +1,82 @@
+from typing import Tuple
+
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+STREAMING_CONTENT_TYPES = ("text/event-stream",)
+
+
+class StreamingGZipResponder(GZipResponder):
+    """
+    A GZipResponder that also compresses event streams, flushing the
+    compressor after every message so each event reaches the client as soon
+    as it is sent instead of waiting in the compression buffer.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int,
+        compresslevel: int,
+        streaming_content_types: Tuple[str, ...],
+    ):
+        super().__init__(app, minimum_size, compresslevel=compresslevel)
+        self.streaming_content_types = streaming_content_types
+        self.flush_per_message = False
+
+    async def send_with_compression(self, message: Message):
+        await super().send_with_compression(message)
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            self.flush_per_message = content_type.startswith(
+                self.streaming_content_types
+            )
+            if self.flush_per_message:
+                # The base class passes event streams through uncompressed.
+                self.content_type_is_excluded = False
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if self.flush_per_message and more_body:
+            self.gzip_file.write(body)
+            self.gzip_file.flush()
+            body = self.gzip_buffer.getvalue()
+            self.gzip_buffer.seek(0)
+            self.gzip_buffer.truncate()
+            return body
+        return super().apply_compression(body, more_body=more_body)
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Gzips responses of at least `minimum_size` bytes and, unless disabled,
+    event streams with a flush per event. Streams cost a few bytes of framing
+    per flush, so they only pay off for events of more than a few tokens.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        compresslevel: int = 6,
+        compress_streams: bool = True,
+    ):
+        super().__init__(app, minimum_size=minimum_size, compresslevel=compresslevel)
+        self.streaming_content_types = (
+            STREAMING_CONTENT_TYPES if compress_streams else ()
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or "gzip" not in Headers(scope=scope).get(
+            "Accept-Encoding", ""
+        ):
+            await super().__call__(scope, receive, send)
+            return
+
+        responder = StreamingGZipResponder(
+            self.app,
+            self.minimum_size,
+            self.compresslevel,
+            self.streaming_content_types,
+        )
+        await responder(scope, receive, send)
@@ -1,7 +1,9 @@
 import logging
 from contextlib import asynccontextmanager
-from typing import List, Dict, Any
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
 from psycopg_pool import AsyncConnectionPool
+from src.api.sessions import username_from_session_id
 from src.config.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -23,9 +25,9 @@ async def get_db_pool() -> AsyncConnectionPool:
 
 
 @asynccontextmanager
-async def get_db_connection():
-    """Provides a managed database connection from the pool."""
-    pool = await get_db_pool()
+async def get_db_connection(pool: Optional[AsyncConnectionPool] = None):
+    """Provides a managed database connection from the pool, or from `pool`."""
+    pool = pool or await get_db_pool()
     async with pool.connection() as conn:
         yield conn
 
@@ -42,21 +44,38 @@ async def check_conversation_title_exists(thread_id: str) -> bool:
 
 
 async def save_conversation_title(thread_id: str, title: str):
-    """Saves or updates a conversation title in the metadata table."""
+    """
+    Saves or updates a conversation title in the metadata table
+    and in the user's search index.
+    """
     query = """
             insert into public.conversation_metadata (thread_id, title)
             values (%(thread_id)s, %(title)s)
             on conflict (thread_id) do update set title      = excluded.title,
                                                   updated_at = now(); \
             """
+    search_query = """
+                   insert into public.conversation_search_entries (thread_id, username, kind, content)
+                   values (%(thread_id)s, %(username)s, 'title', %(title)s)
+                   on conflict (thread_id) where kind = 'title'
+                       do update set content = excluded.content; \
+                   """
+    username = username_from_session_id(thread_id)
+    params = {"thread_id": thread_id, "title": title, "username": username}
     async with get_db_connection() as conn:
         async with conn.cursor() as cur:
-            await cur.execute(query, {"thread_id": thread_id, "title": title})
+            await cur.execute(query, params)
+            if username:
+                await cur.execute(search_query, params)
 
 
-async def get_conversations_for_user(username: str) -> List[Dict[str, Any]]:
+async def get_conversations_for_user(
+    username: str, pool: Optional[AsyncConnectionPool] = None
+) -> List[Dict[str, Any]]:
     """
     Fetches all conversation threads for a given username, prioritizing AI-generated titles.
+    Archived threads are listed with the live ones, by their last checkpoint.
+    Runs on `pool` if given, e.g. a read replica.
     """
     pattern = f"{username}-%"
 
@@ -77,25 +96,223 @@ async def get_conversations_for_user(username: str) -> List[Dict[str, Any]]:
                            meta.title,
                            fc.title,
                            'new chat'
-                   ) as title
+                   ) as title,
+                   lc.max_checkpoint_id
             from latest_checkpoints lc
                      left join public.conversation_metadata meta on lc.thread_id = meta.thread_id
                      left join first_checkpoints fc on lc.thread_id = fc.thread_id
-            order by lc.max_checkpoint_id desc; \
+            union all
+            select archive.thread_id,
+                   coalesce(meta.title, archive.title, 'new chat') as title,
+                   archive.checkpoint_id
+            from public.conversation_archive archive
+                     left join public.conversation_metadata meta on archive.thread_id = meta.thread_id
+            where archive.username = %(username)s
+            order by max_checkpoint_id desc; \
             """
 
     conversations = []
     try:
-        async with get_db_connection() as conn:
+        async with get_db_connection(pool) as conn:
             async with conn.cursor() as cur:
-                await cur.execute(query, {"pattern": pattern})
+                await cur.execute(query, {"pattern": pattern, "username": username})
                 results = await cur.fetchall()
                 for row in results:
                     conversations.append({"conversation_id": row[0], "title": row[1]})
     except Exception as e:
         logger.error(
-            f"Database error in get_conversations_for_user for '{username}': {e}"
+            "Database error in get_conversations_for_user for '%s': %s", username, e
         )
         raise
 
     return conversations
+
+
+async def get_thread_version(
+    thread_id: str,
+) -> Tuple[Optional[str], Optional[datetime]]:
+    """
+    Returns the latest checkpoint_id of a thread and when it was written,
+    without loading its state. The ID is used as a cheap version marker for
+    conditional history reads, the time for routing them.
+    """
+    query = """
+            select checkpoint_id, (checkpoint ->> 'ts')::timestamptz
+            from checkpoints
+            where thread_id = %(thread_id)s
+              and checkpoint_ns = ''
+            order by checkpoint_id desc
+            limit 1; \
+            """
+    async with get_db_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(query, {"thread_id": thread_id})
+            row = await cur.fetchone()
+            return (row[0], row[1]) if row else (None, None)
+
+
+async def get_user_conversations_version(
+    username: str,
+) -> Tuple[str, Optional[datetime]]:
+    """
+    Returns a version marker for a user's conversation list, combining the newest
+    checkpoint, the most recent title change and the most recent archiving
+    across the user's threads, and the time of the latest of these changes.
+    """
+    pattern = f"{username}-%"
+
+    query = """
+            with latest_checkpoint as (select checkpoint_id,
+                                              (checkpoint ->> 'ts')::timestamptz as written_at
+                                       from checkpoints
+                                       where thread_id like %(pattern)s
+                                       order by checkpoint_id desc
+                                       limit 1)
+            select (select checkpoint_id from latest_checkpoint) as latest_checkpoint_id,
+                   (select max(updated_at)
+                    from public.conversation_metadata
+                    where thread_id like %(pattern)s)            as latest_title_update,
+                   (select max(archived_at)
+                    from public.conversation_archive
+                    where username = %(username)s)               as latest_archiving,
+                   (select written_at from latest_checkpoint)    as latest_checkpoint_at; \
+            """
+    async with get_db_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(query, {"pattern": pattern, "username": username})
+            *markers, latest_checkpoint_at = await cur.fetchone()
+    changes = [change for change in markers[1:] + [latest_checkpoint_at] if change]
+    return ":".join(str(marker) for marker in markers), max(changes, default=None)
+
+
+async def index_conversation_turn(thread_id: str, content: str):
+    """Appends the text of a saved turn to the user's search index."""
+    await index_conversation_turns([(thread_id, content)])
+
+
+async def index_conversation_turns(turns: List[Tuple[str, str]]):
+    """
+    Appends the texts of saved turns, as (thread_id, content) pairs, to their
+    users' search index in one round trip. Threads whose ID carries no
+    username prefix are not searchable and are skipped.
+    """
+    params = [
+        {"thread_id": thread_id, "username": username, "content": content}
+        for thread_id, content in turns
+        if (username := username_from_session_id(thread_id)) and content.strip()
+    ]
+    if not params:
+        return
+
+    query = """
+            insert into public.conversation_search_entries (thread_id, username, content)
+            values (%(thread_id)s, %(username)s, %(content)s); \
+            """
+    async with get_db_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.executemany(query, params)
+
+
+async def search_conversations_for_user(
+    username: str, search_text: str, limit: int, offset: int
+) -> List[Dict[str, Any]]:
+    """
+    Full-text searches a user's conversation titles and messages. Threads are
+    ranked by their best matching entry, which also provides the snippet.
+    """
+    query = """
+            with query as (select websearch_to_tsquery('simple', %(q)s) as tsq),
+                 matches as (select distinct on (e.thread_id) e.thread_id,
+                                                              e.content,
+                                                              ts_rank_cd(e.document, query.tsq) as rank
+                             from public.conversation_search_entries e,
+                                  query
+                             where e.username = %(username)s
+                               and e.document @@ query.tsq
+                             order by e.thread_id, rank desc),
+                 page as (select thread_id, content, rank
+                          from matches
+                          order by rank desc, thread_id
+                          limit %(limit)s offset %(offset)s)
+            select page.thread_id,
+                   coalesce(meta.title, 'new chat') as title,
+                   page.rank,
+                   ts_headline('simple', page.content, query.tsq,
+                               'MaxFragments=1, MaxWords=24, MinWords=8') as snippet
+            from page
+                     cross join query
+                     left join public.conversation_metadata meta on meta.thread_id = page.thread_id
+            order by page.rank desc, page.thread_id; \
+            """
+    params = {"q": search_text, "username": username, "limit": limit, "offset": offset}
+    async with get_db_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(query, params)
+            return [
+                {
+                    "conversation_id": row[0],
+                    "title": row[1],
+                    "rank": row[2],
+                    "snippet": row[3],
+                }
+                for row in await cur.fetchall()
+            ]
+
+
+# Grouping expressions of the usage rollups, keyed by the accepted `group_by`.
+_USAGE_GROUPS = {
+    "none": ("null::text", ""),
+    "model": ("u.model", ""),
+    "username": ("u.username", ""),
+    "status": ("u.status", ""),
+    "tool": ("tool", "cross join lateral unnest(u.tool_calls) as tool"),
+}
+
+
+async def get_usage_rollups(
+    bucket: str,
+    group_by: str,
+    since: datetime,
+    until: datetime,
+    username: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Aggregates turn usage into time buckets (date_trunc units such as 'hour'
+    or 'day'), optionally split by model, user, status or tool. When split by
+    tool, each turn counts once per tool it called.
+    """
+    group_expression, group_join = _USAGE_GROUPS[group_by]
+    query = f"""
+            select date_trunc(%(bucket)s, u.created_at) as bucket,
+                   {group_expression}                      as key,
+                   count(*)                                as turns,
+                   count(*) filter (where u.status = 'interrupted') as interrupted,
+                   count(*) filter (where u.status = 'error') as errors,
+                   sum(u.input_tokens)                     as input_tokens,
+                   sum(u.output_tokens)                    as output_tokens,
+                   sum(u.total_tokens)                     as total_tokens,
+                   sum(u.model_calls)                      as model_calls,
+                   percentile_cont(0.5) within group (order by u.ttft_ms) as ttft_p50_ms,
+                   percentile_cont(0.95) within group (order by u.ttft_ms) as ttft_p95_ms,
+                   percentile_cont(0.5) within group (order by u.duration_ms) as duration_p50_ms,
+                   percentile_cont(0.95) within group (order by u.duration_ms) as duration_p95_ms
+            from public.turn_usage u {group_join}
+            where u.created_at >= %(since)s
+              and u.created_at < %(until)s
+              and (%(username)s::text is null or u.username = %(username)s)
+            group by 1, 2
+            order by 1, 2; \
+            """
+    params = {"bucket": bucket, "since": since, "until": until, "username": username}
+    async with get_db_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(query, params)
+            columns = [column.name for column in cur.description]
+            rows = await cur.fetchall()
+    return [
+        {
+            **dict(zip(columns, row)),
+            "bucket": row[0].isoformat(),
+        }
+        for row in rows
+    ]
@@ -1,12 +1,24 @@
-from fastapi import Request, Depends
+import secrets
+from typing import Optional
+
+from fastapi import Depends, Header, HTTPException, status
+from fastapi.requests import HTTPConnection
 from src.ai.agents.chat_agent import ChatAgent
 from src.ai.agent_manager import AgentManager
+from src.api.rate_limit import RateLimiter
+from src.api.replica import ReadRouter
 from src.api.services.chat_service import ChatService
+from src.api.turn_buffer import TurnBuffer
+from src.api.usage import UsageWriter
+from src.config.settings import settings
 
 
-def get_agent_manager(request: Request) -> AgentManager:
-    """Dependency to get the agent manager from the app state."""
-    return request.app.state.agent_manager
+def get_agent_manager(connection: HTTPConnection) -> AgentManager:
+    """
+    Dependency to get the agent manager from the app state.
+    Typed as HTTPConnection so that WebSocket routes can use it too.
+    """
+    return connection.app.state.agent_manager
 
 
 def get_agent(manager: AgentManager = Depends(get_agent_manager)) -> ChatAgent:
@@ -17,6 +29,48 @@ def get_agent(manager: AgentManager = Depends(get_agent_manager)) -> ChatAgent:
     return manager.get_agent()
 
 
-def get_chat_service(agent: ChatAgent = Depends(get_agent)) -> ChatService:
+def get_rate_limiter(connection: HTTPConnection) -> Optional[RateLimiter]:
+    """Dependency to get the rate limiter, None if rate limiting is disabled."""
+    return connection.app.state.rate_limiter
+
+
+def get_read_router(connection: HTTPConnection) -> ReadRouter:
+    """Dependency to get the router choosing between the primary and the replica."""
+    return connection.app.state.read_router
+
+
+def get_turn_buffer(connection: HTTPConnection) -> TurnBuffer:
+    """Dependency to get the buffer of turns submitted with an idempotency key."""
+    return connection.app.state.turn_buffer
+
+
+def get_usage_writer(connection: HTTPConnection) -> Optional[UsageWriter]:
+    """Dependency to get the usage writer, None if accounting is disabled."""
+    return connection.app.state.usage_writer
+
+
+def get_chat_service(
+    agent: ChatAgent = Depends(get_agent),
+    rate_limiter: Optional[RateLimiter] = Depends(get_rate_limiter),
+    usage_writer: Optional[UsageWriter] = Depends(get_usage_writer),
+    turn_buffer: TurnBuffer = Depends(get_turn_buffer),
+) -> ChatService:
     """Dependency to get the chat service instance."""
-    return ChatService(agent)
+    return ChatService(agent, rate_limiter, usage_writer, turn_buffer)
+
+
+def verify_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """
+    Dependency guarding the admin routes. Requests must send ADMIN_API_TOKEN in
+    the X-Admin-Token header; without a configured token the routes answer 503.
+    """
+    expected = settings.admin_api_token
+    if not expected:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The admin API is disabled, as ADMIN_API_TOKEN is not set.",
+        )
+    if not (x_admin_token and secrets.compare_digest(x_admin_token, expected)):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin token."
+        )
@@ -1,20 +1,22 @@
 import logging
 from fastapi import Request, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
 logger = logging.getLogger(__name__)
 
 
-async def http_exception_handler(exc: StarletteHTTPException):
+async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     """
     Global handler for FastAPI's HTTPException.
-    Ensures that all manually raised HTTPErrors return a consistent JSON format.
+    Ensures that all manually raised HTTPErrors return a consistent JSON format,
+    keeping headers such as Retry-After.
     """
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail},
+        headers=exc.headers,
     )
 
 
@@ -29,9 +31,9 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         field_path = ".".join(str(loc) for loc in error["loc"])
         errors.append({"field": field_path, "message": error["msg"]})
 
-    logger.warning(f"Request validation failed for {request.url}: {errors}")
+    logger.warning("Request validation failed for %s: %s", request.url, errors)
 
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
         content={"detail": "Validation Error", "errors": errors},
     )
@@ -44,10 +46,13 @@ async def generic_exception_handler(request: Request, exc: Exception):
     to the client to avoid leaking implementation details.
     """
     logger.error(
-        f"Unhandled exception for request: {request.method} {request.url}", exc_info=exc
+        "Unhandled exception for request: %s %s",
+        request.method,
+        request.url,
+        exc_info=exc,
     )
 
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={"detail": "An unexpected internal server error occurred."},
     )
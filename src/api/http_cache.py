@@ -0,0 +1,39 @@
+import hashlib
+from typing import Dict, Optional
+
+from fastapi import Response
+
+# Clients may keep a copy but must revalidate it with the ETag on every read.
+CACHE_CONTROL = "private, no-cache"
+
+
+def build_etag(*parts: object) -> str:
+    """Builds a weak ETag from the given version parts."""
+    raw = "|".join(str(part) for part in parts).encode("utf-8")
+    return f'W/"{hashlib.blake2b(raw, digest_size=12).hexdigest()}"'
+
+
+def _opaque_tag(tag: str) -> str:
+    """Strips the weak indicator so tags can be compared weakly (RFC 9110)."""
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(if_none_match: Optional[str], etag: str) -> bool:
+    """Checks whether an If-None-Match header matches the current ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    current = _opaque_tag(etag)
+    return any(_opaque_tag(tag) == current for tag in if_none_match.split(","))
+
+
+def cache_headers(etag: str) -> Dict[str, str]:
+    """Returns the validation headers sent with cacheable responses."""
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def not_modified_response(etag: str) -> Response:
+    """Builds an empty 304 response for a matching conditional request."""
+    return Response(status_code=304, headers=cache_headers(etag))
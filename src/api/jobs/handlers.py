@@ -0,0 +1,89 @@
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
+
+from src.ai.checkpointer import TracedPostgresSaver
+from src.api.archive import archive_idle_threads
+from src.api.db import get_db_pool
+from src.api.jobs.queue import enqueue_job
+from src.api.services.chat_title_service import generate_and_save_title
+from src.config.settings import settings
+from src.monitoring.tracing import current_traceparent
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+TITLE_JOB = "generate_title"
+ARCHIVE_JOB = "archive_threads"
+
+# User-facing work runs ahead of maintenance jobs.
+INTERACTIVE_PRIORITY = 10
+
+
+async def enqueue_title_job(thread_id: str):
+    """Queues title generation for a thread, once per pending job."""
+    payload = {"thread_id": thread_id}
+    traceparent = current_traceparent()
+    if traceparent:
+        payload["traceparent"] = traceparent
+    await enqueue_job(
+        TITLE_JOB,
+        payload,
+        dedup_key=thread_id,
+        priority=INTERACTIVE_PRIORITY,
+    )
+
+
+async def enqueue_archive_job():
+    """Schedules the next archival run, unless one is already queued or running."""
+    await enqueue_job(
+        ARCHIVE_JOB,
+        {},
+        dedup_key=ARCHIVE_JOB,
+        delay_seconds=settings.thread_archive_interval_seconds,
+    )
+
+
+async def load_thread_messages(thread_id: str) -> List[BaseMessage]:
+    """Reads a thread's messages from its latest checkpoint, without an agent."""
+    checkpointer = TracedPostgresSaver(await get_db_pool())
+    config = RunnableConfig(configurable={"thread_id": thread_id})
+    checkpoint_tuple = await checkpointer.aget_tuple(config)
+    if checkpoint_tuple is None:
+        return []
+    return checkpoint_tuple.checkpoint["channel_values"].get("messages", [])
+
+
+async def generate_title(payload: Dict[str, Any]):
+    """Generates a conversation title from the thread's saved history."""
+    thread_id = payload["thread_id"]
+    history = await load_thread_messages(thread_id)
+    if len(history) < 2:
+        logger.info("Thread '%s' has no answered turn yet, no title.", thread_id)
+        return
+    await generate_and_save_title(thread_id, history)
+
+
+async def archive_threads(payload: Dict[str, Any]):
+    """
+    Archives idle threads batch by batch until none are left, or for half
+    the job timeout; the next run picks up the rest.
+    """
+    deadline = time.monotonic() + settings.job_timeout_seconds / 2
+    batch_size = settings.thread_archive_batch_size
+    while time.monotonic() < deadline:
+        found = await archive_idle_threads(
+            settings.thread_archive_idle_days, batch_size
+        )
+        if found < batch_size:
+            break
+
+
+JOB_HANDLERS: Dict[str, JobHandler] = {
+    TITLE_JOB: generate_title,
+    ARCHIVE_JOB: archive_threads,
+}
@@ -0,0 +1,185 @@
+import random
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from psycopg.types.json import Jsonb
+
+from src.api.db import get_db_connection
+from src.config.settings import settings
+
+# Postgres channel that wakes idle workers when a job is enqueued.
+JOB_QUEUE_CHANNEL = "job_queue"
+
+
+@dataclass
+class Job:
+    """A claimed job, as handed to its handler by the worker."""
+
+    id: int
+    kind: str
+    payload: Dict[str, Any]
+    attempts: int
+    max_attempts: int
+    waited_seconds: float
+
+
+async def enqueue_job(
+    kind: str,
+    payload: Dict[str, Any],
+    dedup_key: Optional[str] = None,
+    priority: int = 0,
+    delay_seconds: float = 0.0,
+    max_attempts: Optional[int] = None,
+) -> Optional[int]:
+    """
+    Adds a job to the queue and wakes the workers. Jobs with a higher priority
+    run first. Returns None if a job of the same kind and dedup_key is
+    already queued or running.
+    """
+    query = """
+            insert into public.job_queue (kind, payload, priority, dedup_key, run_at, max_attempts)
+            values (%(kind)s, %(payload)s, %(priority)s, %(dedup_key)s,
+                    now() + make_interval(secs => %(delay)s), %(max_attempts)s)
+            on conflict (kind, dedup_key) where dedup_key is not null and status in ('queued', 'running')
+                do nothing
+            returning id; \
+            """
+    params = {
+        "kind": kind,
+        "payload": Jsonb(payload),
+        "priority": priority,
+        "dedup_key": dedup_key,
+        "delay": delay_seconds,
+        "max_attempts": max_attempts or settings.job_max_attempts,
+    }
+    async with get_db_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(query, params)
+            row = await cur.fetchone()
+            if row and not delay_seconds:
+                # Delivered on commit, so workers never see an unsaved job.
+                await cur.execute("select pg_notify(%s, %s)", (JOB_QUEUE_CHANNEL, kind))
+    return row[0] if row else None
+
+
+async def claim_jobs(worker_id: str, limit: int = 1) -> List[Job]:
+    """
+    Claims up to `limit` due jobs for a worker. Rows locked by other workers
+    are skipped rather than waited on, so workers never block each other.
+    """
+    query = """
+            with due as (select id
+                         from public.job_queue
+                         where status = 'queued'
+                           and run_at <= now()
+                         order by priority desc, run_at
+                         limit %(limit)s for update skip locked)
+            update public.job_queue job
+            set status    = 'running',
+                attempts  = job.attempts + 1,
+                locked_at = now(),
+                locked_by = %(worker_id)s
+            from due
+            where job.id = due.id
+            returning job.id, job.kind, job.payload, job.attempts, job.max_attempts,
+                extract(epoch from now() - job.run_at)::float8; \
+            """
+    async with get_db_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(query, {"limit": limit, "worker_id": worker_id})
+            return [Job(*row) for row in await cur.fetchall()]
+
+
+async def complete_job(job: Job):
+    """Removes a successfully finished job."""
+    async with get_db_connection() as conn:
+        await conn.execute("delete from public.job_queue where id = %s", (job.id,))
+
+
+async def fail_job(job: Job, error: str, retry: bool = True) -> bool:
+    """
+    Records a failed attempt. The job is rescheduled with exponential backoff
+    and jitter until it runs out of attempts, then kept with status 'failed'.
+    Returns whether it will be retried.
+    """
+    will_retry = retry and job.attempts < job.max_attempts
+    delay = min(
+        settings.job_retry_max_seconds,
+        settings.job_retry_base_seconds * 2 ** (job.attempts - 1),
+    ) * random.uniform(0.5, 1.0)
+    query = """
+            update public.job_queue
+            set status     = %(status)s,
+                run_at     = now() + make_interval(secs => %(delay)s),
+                locked_at  = null,
+                locked_by  = null,
+                last_error = %(error)s
+            where id = %(id)s; \
+            """
+    params = {
+        "id": job.id,
+        "status": "queued" if will_retry else "failed",
+        "delay": delay,
+        "error": error[:2000],
+    }
+    async with get_db_connection() as conn:
+        await conn.execute(query, params)
+    return will_retry
+
+
+async def release_job(job: Job):
+    """Puts a job back without counting the attempt, e.g. on worker shutdown."""
+    query = """
+            update public.job_queue
+            set status    = 'queued',
+                attempts  = greatest(attempts - 1, 0),
+                locked_at = null,
+                locked_by = null
+            where id = %(id)s; \
+            """
+    async with get_db_connection() as conn:
+        await conn.execute(query, {"id": job.id})
+
+
+async def heartbeat(worker_id: str):
+    """Refreshes the lock time of a worker's running jobs, so they are not reaped."""
+    query = """
+            update public.job_queue
+            set locked_at = now()
+            where status = 'running'
+              and locked_by = %(worker_id)s; \
+            """
+    async with get_db_connection() as conn:
+        await conn.execute(query, {"worker_id": worker_id})
+
+
+async def requeue_stale_jobs(stale_after_seconds: float) -> int:
+    """
+    Requeues jobs whose worker stopped sending heartbeats, e.g. after a crash. Jobs
+    that have used up their attempts are marked failed instead.
+    """
+    query = """
+            update public.job_queue
+            set status     = case when attempts >= max_attempts then 'failed' else 'queued' end,
+                locked_at  = null,
+                locked_by  = null,
+                last_error = 'Worker stopped before finishing the job.'
+            where status = 'running'
+              and locked_at < now() - make_interval(secs => %(stale_after)s); \
+            """
+    async with get_db_connection() as conn:
+        cur = await conn.execute(query, {"stale_after": stale_after_seconds})
+        return cur.rowcount
+
+
+async def get_queue_depth() -> Dict[tuple, int]:
+    """Counts jobs per (kind, status)."""
+    query = """
+            select kind, status, count(*)
+            from public.job_queue
+            group by kind, status; \
+            """
+    async with get_db_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(query)
+            return {(row[0], row[1]): row[2] for row in await cur.fetchall()}
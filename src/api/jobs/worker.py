@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import os
+import signal
+import socket
+import time
+from typing import Dict, List, Optional
+
+import psycopg
+
+from src.api import db
+from src.api.jobs.handlers import JOB_HANDLERS, JobHandler, enqueue_archive_job
+from src.api.jobs.queue import (
+    JOB_QUEUE_CHANNEL,
+    Job,
+    claim_jobs,
+    complete_job,
+    fail_job,
+    get_queue_depth,
+    heartbeat,
+    release_job,
+    requeue_stale_jobs,
+)
+from src.config.logging_config import setup_logging
+from src.config.settings import settings
+from src.monitoring.metrics import metrics
+from src.monitoring.tracing import CONSUMER, extract, setup_tracing, tracer
+
+logger = logging.getLogger(__name__)
+
+jobs_total = metrics.counter(
+    "jobs_total", "Finished job attempts, by kind and outcome (done/retry/failed)."
+)
+job_wait_seconds = metrics.histogram(
+    "job_wait_seconds", "Time from a job being due to being claimed, by kind."
+)
+job_run_seconds = metrics.histogram(
+    "job_run_seconds", "Handler run time of job attempts, by kind."
+)
+job_queue_depth = metrics.gauge(
+    "job_queue_depth", "Jobs in the queue, by kind and status."
+)
+
+
+class JobWorker:
+    """
+    Runs queued jobs with a fixed number of concurrent runners. Idle runners
+    wake on a Postgres notification for new jobs or after the poll interval.
+    A maintenance loop sends heartbeats, requeues jobs of dead workers,
+    samples the queue depth and keeps the thread archival job scheduled.
+    """
+
+    def __init__(
+        self,
+        handlers: Dict[str, JobHandler],
+        concurrency: int = 1,
+        worker_id: Optional[str] = None,
+    ):
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._runners: List[asyncio.Task] = []
+        self._background: List[asyncio.Task] = []
+        self._depth_keys: set = set()
+
+    async def start(self):
+        """Starts the runners, the notification listener and the maintenance loop."""
+        self._stopping = False
+        self._runners = [
+            asyncio.create_task(self._run()) for _ in range(self.concurrency)
+        ]
+        self._background = [
+            asyncio.create_task(self._listen()),
+            asyncio.create_task(self._maintain()),
+        ]
+        logger.info(
+            "Job worker '%s' started with %s runners.", self.worker_id, self.concurrency
+        )
+
+    async def stop(self):
+        """
+        Stops claiming new jobs and waits for running ones up to the shutdown
+        timeout. Jobs still running after it are put back on the queue.
+        """
+        self._stopping = True
+        self._wakeup.set()
+        for task in self._background:
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+
+        if self._runners:
+            _, pending = await asyncio.wait(
+                self._runners, timeout=settings.job_shutdown_timeout_seconds
+            )
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*self._runners, return_exceptions=True)
+        logger.info("Job worker '%s' stopped.", self.worker_id)
+
+    async def _run(self):
+        """Claims and runs one job at a time until the worker stops."""
+        while not self._stopping:
+            try:
+                jobs = await claim_jobs(self.worker_id)
+            except Exception as e:
+                logger.error("Job worker could not claim jobs: %s", e)
+                jobs = []
+
+            if not jobs:
+                await self._wait_for_work()
+                continue
+            await self._execute(jobs[0])
+
+    async def _wait_for_work(self):
+        try:
+            await asyncio.wait_for(
+                self._wakeup.wait(), timeout=settings.job_poll_interval_seconds
+            )
+        except asyncio.TimeoutError:
+            pass
+        if not self._stopping:
+            self._wakeup.clear()
+
+    async def _execute(self, job: Job):
+        """Runs a job's handler and records the outcome."""
+        job_wait_seconds.observe(max(job.waited_seconds, 0.0), kind=job.kind)
+        handler = self.handlers.get(job.kind)
+        started = time.perf_counter()
+        try:
+            # Continues the trace of the request that queued the job, if any.
+            with tracer.span(
+                f"job {job.kind}",
+                kind=CONSUMER,
+                parent=extract(job.payload.get("traceparent")),
+                **{"job.id": job.id, "job.attempt": job.attempts},
+            ):
+                if handler is None:
+                    raise LookupError(
+                        f"No handler registered for job kind '{job.kind}'."
+                    )
+                await asyncio.wait_for(
+                    handler(job.payload), timeout=settings.job_timeout_seconds
+                )
+        except asyncio.CancelledError:
+            await release_job(job)
+            raise
+        except Exception as e:
+            job_run_seconds.observe(time.perf_counter() - started, kind=job.kind)
+            retry = await fail_job(job, repr(e), retry=handler is not None)
+            jobs_total.inc(kind=job.kind, outcome="retry" if retry else "failed")
+            logger.error(
+                "Job %s (%s) failed on attempt %s/%s: %s",
+                job.id,
+                job.kind,
+                job.attempts,
+                job.max_attempts,
+                e,
+            )
+            return
+
+        job_run_seconds.observe(time.perf_counter() - started, kind=job.kind)
+        await complete_job(job)
+        jobs_total.inc(kind=job.kind, outcome="done")
+
+    async def _listen(self):
+        """Wakes idle runners on enqueue notifications, reconnecting on errors."""
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    settings.db_dsn, autocommit=True
+                ) as conn:
+                    await conn.execute(f"listen {JOB_QUEUE_CHANNEL}")
+                    async for _ in conn.notifies():
+                        self._wakeup.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Polling keeps the queue moving while the listener is down.
+                logger.warning("Job queue listener disconnected: %s", e)
+                await asyncio.sleep(settings.job_poll_interval_seconds)
+
+    async def _maintain(self):
+        while True:
+            try:
+                await heartbeat(self.worker_id)
+                requeued = await requeue_stale_jobs(settings.job_stale_after_seconds)
+                if requeued:
+                    logger.warning(
+                        "Requeued %s jobs of unresponsive workers.", requeued
+                    )
+                await self._sample_depth()
+                if settings.enable_thread_archive:
+                    await enqueue_archive_job()
+            except Exception as e:
+                logger.error("Job queue maintenance failed: %s", e)
+            await asyncio.sleep(settings.job_maintenance_interval_seconds)
+
+    async def _sample_depth(self):
+        depth = await get_queue_depth()
+        for kind, status in self._depth_keys - depth.keys():
+            job_queue_depth.set(0, kind=kind, status=status)
+        for (kind, status), count in depth.items():
+            job_queue_depth.set(count, kind=kind, status=status)
+        self._depth_keys = set(depth)
+
+
+async def run_worker():
+    """Runs a standalone job worker until SIGINT or SIGTERM."""
+    setup_logging()
+    setup_tracing("py-ai-worker")
+    worker = JobWorker(JOB_HANDLERS, concurrency=settings.job_worker_concurrency)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await worker.start()
+    try:
+        await stop.wait()
+    finally:
+        await worker.stop()
+        if db.db_pool is not None:
+            await db.db_pool.close()
@@ -1,22 +1,64 @@
 import logging
+import time
+
 from alembic import command
 from alembic.config import Config
 from psycopg_pool import ConnectionPool
 
+from src.config.settings import settings
+
 logger = logging.getLogger(__name__)
 
+# Arbitrary application-wide key for pg_advisory_lock; every process that
+# migrates this database must use the same value.
+MIGRATION_LOCK_ID = 7094093491
+
+LOCK_POLL_INTERVAL_SECONDS = 0.5
 
-def run_migrations_sync(sync_pool: ConnectionPool):
+
+def run_migrations_sync(sync_pool: ConnectionPool, wait: bool = True):
     """
     A synchronous function to run Alembic migrations using a shared pool.
-    """
-    logger.info("Running database migrations...")
-    alembic_cfg = Config("alembic.ini")
-
-    alembic_cfg.attributes["connection"] = sync_pool.getconn()
 
+    A session-level Postgres advisory lock makes sure only one process across
+    all replicas and workers upgrades at a time. Other processes either wait for
+    it and then find the schema at head (wait=True), or return right away
+    (wait=False).
+    """
+    conn = sync_pool.getconn()
+    conn.autocommit = True
     try:
-        command.upgrade(alembic_cfg, "head")
-        logger.info("Database migrations complete.")
+        if not _acquire_migration_lock(conn, wait):
+            logger.info("Another process is migrating the database, skipping.")
+            return
+
+        try:
+            logger.info("Running database migrations...")
+            alembic_cfg = Config("alembic.ini")
+            alembic_cfg.attributes["connection"] = conn
+            command.upgrade(alembic_cfg, "head")
+            logger.info("Database migrations complete.")
+        finally:
+            conn.execute("select pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
     finally:
-        sync_pool.putconn(alembic_cfg.attributes["connection"])
+        conn.autocommit = False
+        sync_pool.putconn(conn)
+
+
+def _acquire_migration_lock(conn, wait: bool) -> bool:
+    """Tries to take the migration lock, polling up to the configured timeout."""
+    deadline = time.monotonic() + settings.migration_lock_timeout_seconds
+    while True:
+        row = conn.execute(
+            "select pg_try_advisory_lock(%s)", (MIGRATION_LOCK_ID,)
+        ).fetchone()
+        if row[0]:
+            return True
+        if not wait:
+            return False
+        if time.monotonic() >= deadline:
+            raise TimeoutError(
+                "Timed out waiting for the database migration lock after "
+                f"{settings.migration_lock_timeout_seconds}s."
+            )
+        time.sleep(LOCK_POLL_INTERVAL_SECONDS)
@@ -0,0 +1,294 @@
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Union
+
+from fastapi import HTTPException, status
+from fastapi.requests import HTTPConnection
+from psycopg_pool import AsyncConnectionPool
+from pydantic import BaseModel
+
+from src.api.sessions import username_from_session_id
+from src.config.settings import settings
+from src.monitoring.metrics import metrics
+
+REQUESTS = "requests"
+TOKENS = "tokens"
+
+rate_limit_check_seconds = metrics.histogram(
+    "rate_limit_check_seconds", "Time spent admitting a request, by backend."
+)
+rate_limited_requests = metrics.counter(
+    "rate_limited_requests_total", "Requests rejected with 429, by exhausted bucket."
+)
+
+
+class RateLimitTier(BaseModel):
+    """Sustained rates and burst sizes of one tier's request and token buckets."""
+
+    requests_per_minute: float
+    request_burst: float
+    tokens_per_minute: float
+    token_burst: float
+
+    def bucket(self, name: str) -> Tuple[float, float]:
+        """Returns a bucket's (capacity, refill per second)."""
+        if name == REQUESTS:
+            return self.request_burst, self.requests_per_minute / 60
+        return self.token_burst, self.tokens_per_minute / 60
+
+
+@dataclass
+class RateLimitDecision:
+    """Outcome of admitting one request, with the data for the rate limit headers."""
+
+    allowed: bool
+    limit: float
+    remaining: float
+    reset_seconds: float
+    retry_after_seconds: float = 0.0
+    exhausted: Optional[str] = None
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "X-RateLimit-Limit": str(int(self.limit)),
+            "X-RateLimit-Remaining": str(max(int(self.remaining), 0)),
+            "X-RateLimit-Reset": str(math.ceil(self.reset_seconds)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(math.ceil(self.retry_after_seconds), 1))
+        return headers
+
+
+def _refill(
+    level: float, updated_at: float, now: float, capacity: float, rate: float
+) -> float:
+    return min(capacity, level + max(now - updated_at, 0.0) * rate)
+
+
+def _decide(tier: RateLimitTier, levels: Dict[str, float]) -> RateLimitDecision:
+    """
+    Admits a request if a request token is left and the token bucket is not
+    in debt. Model tokens are only known after the turn, so they are debited
+    afterwards and may take the bucket below zero.
+    """
+    capacity, rate = tier.bucket(REQUESTS)
+    requests_left = levels[REQUESTS]
+    tokens_left = levels[TOKENS]
+    token_capacity, token_rate = tier.bucket(TOKENS)
+
+    if requests_left < 1:
+        return RateLimitDecision(
+            allowed=False,
+            limit=capacity,
+            remaining=requests_left,
+            reset_seconds=(capacity - requests_left) / rate,
+            retry_after_seconds=(1 - requests_left) / rate,
+            exhausted=REQUESTS,
+        )
+    if tokens_left <= 0:
+        # Reported against the token bucket, and retried once it is back
+        # above zero, at least one token's refill away.
+        return RateLimitDecision(
+            allowed=False,
+            limit=token_capacity,
+            remaining=tokens_left,
+            reset_seconds=(token_capacity - tokens_left) / token_rate,
+            retry_after_seconds=max(-tokens_left, 1) / token_rate,
+            exhausted=TOKENS,
+        )
+    requests_left -= 1
+    return RateLimitDecision(
+        allowed=True,
+        limit=capacity,
+        remaining=requests_left,
+        reset_seconds=(capacity - requests_left) / rate,
+    )
+
+
+def get_tier(username: str) -> RateLimitTier:
+    """Resolves the configured tier of a user, falling back to the default tier."""
+    tier_name = settings.rate_limit_user_tiers.get(
+        username, settings.rate_limit_default_tier
+    )
+    return RateLimitTier(**settings.rate_limit_tiers[tier_name])
+
+
+class InMemoryRateLimiter:
+    """
+    Token buckets per user in process memory. Limits apply per API process,
+    so with N workers a user gets up to N times the configured rates.
+    """
+
+    # Buckets that have refilled completely are dropped when the table grows
+    # past this size, as they are equivalent to no entry at all.
+    PRUNE_THRESHOLD = 10_000
+
+    def __init__(self):
+        self._buckets: Dict[Tuple[str, str], List[float]] = {}
+        self._tiers: Dict[str, RateLimitTier] = {}
+
+    async def acquire(self, subject: str) -> RateLimitDecision:
+        tier = self._tier(subject)
+        now = time.monotonic()
+        levels = {
+            name: self._level(subject, name, tier, now) for name in (REQUESTS, TOKENS)
+        }
+        decision = _decide(tier, levels)
+        if decision.allowed:
+            self._buckets[(subject, REQUESTS)][0] -= 1
+        if len(self._buckets) > self.PRUNE_THRESHOLD:
+            self._prune(now)
+        return decision
+
+    async def debit_tokens(self, subject: str, tokens: int):
+        tier = self._tier(subject)
+        self._level(subject, TOKENS, tier, time.monotonic())
+        self._buckets[(subject, TOKENS)][0] -= tokens
+
+    def _tier(self, subject: str) -> RateLimitTier:
+        tier = self._tiers.get(subject)
+        if tier is None:
+            tier = self._tiers[subject] = get_tier(subject)
+        return tier
+
+    def _level(self, subject: str, name: str, tier: RateLimitTier, now: float) -> float:
+        """Refills a bucket up to now and returns its level."""
+        capacity, rate = tier.bucket(name)
+        bucket = self._buckets.get((subject, name))
+        if bucket is None:
+            bucket = self._buckets[(subject, name)] = [capacity, now]
+        else:
+            bucket[0] = _refill(bucket[0], bucket[1], now, capacity, rate)
+            bucket[1] = now
+        return bucket[0]
+
+    def _prune(self, now: float):
+        for key, (level, updated_at) in list(self._buckets.items()):
+            capacity, rate = self._tier(key[0]).bucket(key[1])
+            if _refill(level, updated_at, now, capacity, rate) >= capacity:
+                del self._buckets[key]
+                self._tiers.pop(key[0], None)
+
+
+class PostgresRateLimiter:
+    """
+    Token buckets per user in an unlogged Postgres table, shared by all API
+    processes and replicas. A user's rows are locked for the duration of one
+    short transaction, so concurrent requests are admitted one at a time.
+    """
+
+    def __init__(self, pool: AsyncConnectionPool):
+        self.pool = pool
+
+    async def acquire(self, subject: str) -> RateLimitDecision:
+        tier = get_tier(subject)
+        async with self.pool.connection() as conn:
+            async with conn.transaction():
+                levels, now = await self._locked_levels(conn, subject, tier)
+                decision = _decide(tier, levels)
+                if decision.allowed:
+                    levels[REQUESTS] -= 1
+                await self._store(conn, subject, levels, now)
+        return decision
+
+    async def debit_tokens(self, subject: str, tokens: int):
+        tier = get_tier(subject)
+        async with self.pool.connection() as conn:
+            async with conn.transaction():
+                levels, now = await self._locked_levels(conn, subject, tier)
+                levels[TOKENS] -= tokens
+                await self._store(conn, subject, levels, now)
+
+    @staticmethod
+    async def _locked_levels(
+        conn, subject: str, tier: RateLimitTier
+    ) -> Tuple[Dict[str, float], float]:
+        query = """
+                select bucket, level, updated_at
+                from public.rate_limit_buckets
+                where username = %(username)s
+                    for update; \
+                """
+        async with conn.cursor() as cur:
+            await cur.execute(query, {"username": subject})
+            rows = await cur.fetchall()
+
+        now = time.time()
+        levels = {name: tier.bucket(name)[0] for name in (REQUESTS, TOKENS)}
+        for name, level, updated_at in rows:
+            if name in levels:
+                capacity, rate = tier.bucket(name)
+                levels[name] = _refill(level, updated_at, now, capacity, rate)
+        return levels, now
+
+    @staticmethod
+    async def _store(conn, subject: str, levels: Dict[str, float], now: float):
+        query = """
+                insert into public.rate_limit_buckets (username, bucket, level, updated_at)
+                values (%(username)s, %(requests)s, %(requests_level)s, %(now)s),
+                       (%(username)s, %(tokens)s, %(tokens_level)s, %(now)s)
+                on conflict (username, bucket) do update set level      = excluded.level,
+                                                             updated_at = excluded.updated_at; \
+                """
+        await conn.execute(
+            query,
+            {
+                "username": subject,
+                "requests": REQUESTS,
+                "tokens": TOKENS,
+                "requests_level": levels[REQUESTS],
+                "tokens_level": levels[TOKENS],
+                "now": now,
+            },
+        )
+
+
+RateLimiter = Union[InMemoryRateLimiter, PostgresRateLimiter]
+
+
+def create_rate_limiter(pool: AsyncConnectionPool) -> Optional[RateLimiter]:
+    """Builds the configured rate limiter, or None if rate limiting is disabled."""
+    if not settings.rate_limit_enabled:
+        return None
+    if settings.rate_limit_backend == "postgres":
+        return PostgresRateLimiter(pool)
+    return InMemoryRateLimiter()
+
+
+def rate_limit_subject(session_id: str, connection: HTTPConnection) -> str:
+    """
+    Returns the key a request is limited under: the username prefix of the
+    session ID, or the client address for session IDs without one, so that
+    minting new session IDs does not reset the limits.
+    """
+    username = username_from_session_id(session_id)
+    if username:
+        return username
+    client = connection.client
+    return f"ip:{client.host}" if client else "anonymous"
+
+
+async def enforce_rate_limit(
+    limiter: Optional[RateLimiter], subject: str
+) -> Dict[str, str]:
+    """
+    Admits a request or raises a 429 carrying Retry-After and the reset hints.
+    Returns the rate limit headers for the successful response.
+    """
+    if limiter is None:
+        return {}
+
+    started = time.perf_counter()
+    decision = await limiter.acquire(subject)
+    rate_limit_check_seconds.observe(
+        time.perf_counter() - started, backend=settings.rate_limit_backend
+    )
+    if not decision.allowed:
+        rate_limited_requests.inc(bucket=decision.exhausted)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Rate limit exceeded: out of {decision.exhausted}.",
+            headers=decision.headers(),
+        )
+    return decision.headers()
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+from psycopg_pool import AsyncConnectionPool
+
+from src.ai.checkpointer import TracedPostgresSaver
+from src.config.settings import settings
+from src.monitoring.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+routed_reads = metrics.counter(
+    "db_routed_reads_total",
+    "Read-only requests, by target (primary/replica) and the reason for it.",
+)
+replica_lag_seconds = metrics.gauge(
+    "db_replica_lag_seconds", "How far the replica's replayed WAL is behind, in time."
+)
+replica_lag_bytes = metrics.gauge(
+    "db_replica_lag_bytes", "How far the replica's replayed WAL is behind the primary."
+)
+
+
+@dataclass
+class ReadTarget:
+    """Where a read-only request runs its queries."""
+
+    name: str
+    pool: AsyncConnectionPool
+    checkpointer: TracedPostgresSaver
+
+
+class ReadRouter:
+    """
+    Routes read-only requests to a replica when one is configured. A
+    request goes to the primary instead when what it reads was written
+    within the last `read_your_writes_seconds`, so clients always see their
+    own writes, and while the replica lags further behind than that or
+    cannot be reached. The lag is measured every `lag_check_seconds`.
+    """
+
+    def __init__(
+        self,
+        primary_pool: AsyncConnectionPool,
+        replica_pool: Optional[AsyncConnectionPool] = None,
+        read_your_writes_seconds: float = 5.0,
+        lag_check_seconds: float = 1.0,
+    ):
+        self.read_your_writes_seconds = read_your_writes_seconds
+        self.lag_check_seconds = lag_check_seconds
+        self.primary = ReadTarget(
+            "primary", primary_pool, TracedPostgresSaver(primary_pool)
+        )
+        self.replica = (
+            ReadTarget("replica", replica_pool, TracedPostgresSaver(replica_pool))
+            if replica_pool is not None
+            else None
+        )
+        # None until the first successful check and while the replica is down.
+        self.lag_seconds: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self.replica is None or self._task is not None:
+            return
+        # Opened without waiting, so an unreachable replica does not block startup.
+        await self.replica.pool.open(wait=False)
+        self._task = asyncio.create_task(self._check_lag())
+        logger.info(
+            "Routing reads to the replica (read-your-writes window %ss).",
+            self.read_your_writes_seconds,
+        )
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.replica is not None:
+            await self.replica.pool.close()
+
+    def route(self, last_write: Optional[datetime]) -> ReadTarget:
+        """Picks the target for a read of data last written at `last_write`."""
+        if self.replica is None:
+            reason = "no_replica"
+        elif self.lag_seconds is None:
+            reason = "replica_unavailable"
+        elif self.lag_seconds > self.read_your_writes_seconds:
+            reason = "replica_lagging"
+        elif (
+            last_write is not None
+            and (datetime.now(timezone.utc) - last_write).total_seconds()
+            < self.read_your_writes_seconds
+        ):
+            reason = "recent_write"
+        else:
+            routed_reads.inc(target="replica", reason="replica")
+            return self.replica
+        routed_reads.inc(target="primary", reason=reason)
+        return self.primary
+
+    async def _check_lag(self):
+        while True:
+            try:
+                lag_seconds, lag_bytes = await self.measure_lag()
+                if self.lag_seconds is None:
+                    logger.info("Replica is reachable, lag %.3fs.", lag_seconds)
+                self.lag_seconds = lag_seconds
+                replica_lag_seconds.set(lag_seconds)
+                if lag_bytes is not None:
+                    replica_lag_bytes.set(lag_bytes)
+            except Exception as e:
+                if self.lag_seconds is not None:
+                    logger.warning(
+                        "Replica lag check failed, reading from the primary: %s", e
+                    )
+                self.lag_seconds = None
+            await asyncio.sleep(self.lag_check_seconds)
+
+    async def measure_lag(self) -> Tuple[float, Optional[float]]:
+        """
+        Returns the replica's lag in seconds and in bytes of WAL. A replica
+        that has replayed the primary's current WAL position counts as caught
+        up, as its last replayed transaction is old when the primary is idle.
+        """
+        async with self.primary.pool.connection() as conn:
+            cur = await conn.execute("select pg_current_wal_lsn()::text;")
+            (primary_lsn,) = await cur.fetchone()
+
+        query = """
+                select pg_is_in_recovery(),
+                       case
+                           when pg_last_wal_replay_lsn() >= %(primary_lsn)s::pg_lsn then 0
+                           else extract(epoch from now() - pg_last_xact_replay_timestamp())
+                           end::float8,
+                       pg_wal_lsn_diff(%(primary_lsn)s::pg_lsn, pg_last_wal_replay_lsn())::float8; \
+                """
+        async with self.replica.pool.connection(timeout=self.lag_check_seconds) as conn:
+            cur = await conn.execute(query, {"primary_lsn": primary_lsn})
+            in_recovery, lag_seconds, lag_bytes = await cur.fetchone()
+        if not in_recovery:
+            # Not a streaming standby (e.g. logically replicated), which
+            # cannot report its lag.
+            return 0.0, None
+        return max(lag_seconds or 0.0, 0.0), max(lag_bytes or 0.0, 0.0)
+
+
+def create_read_router(primary_pool: AsyncConnectionPool) -> ReadRouter:
+    """Creates the read router, with a replica pool if DB_REPLICA_DSN is set."""
+    replica_pool = None
+    if settings.db_replica_dsn:
+        replica_pool = AsyncConnectionPool(conninfo=settings.db_replica_dsn, open=False)
+    return ReadRouter(
+        primary_pool,
+        replica_pool,
+        settings.db_replica_read_your_writes_seconds,
+        settings.db_replica_lag_check_seconds,
+    )
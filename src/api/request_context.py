@@ -0,0 +1,46 @@
+import re
+import uuid
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.config.logging_config import request_id_var
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# Incoming IDs end up in every log line of the request, so only short tokens pass.
+_VALID_REQUEST_ID = re.compile(r"[\w.:-]{1,128}")
+
+
+class RequestContextMiddleware:
+    """
+    Gives every HTTP request and WebSocket connection a request ID, taken
+    from the X-Request-ID header or generated, for the duration of its
+    handling, and returns it in the response headers.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        if not request_id or not _VALID_REQUEST_ID.fullmatch(request_id):
+            request_id = uuid.uuid4().hex
+
+        async def send_with_request_id(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[REQUEST_ID_HEADER] = request_id
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
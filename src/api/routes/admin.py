@@ -0,0 +1,100 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import BaseModel, Field
+
+from src.api.db import get_usage_rollups
+from src.api.dependencies import verify_admin_token
+
+router = APIRouter(
+    prefix="/admin", tags=["admin"], dependencies=[Depends(verify_admin_token)]
+)
+logger = logging.getLogger(__name__)
+
+
+@router.get("/usage")
+async def get_usage(
+    bucket: Literal["minute", "hour", "day", "week", "month"] = "hour",
+    group_by: Literal["none", "model", "username", "status", "tool"] = "none",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    username: Optional[str] = Query(None),
+):
+    """
+    Token and latency rollups of agent turns per time bucket, optionally split
+    by model, user, status or tool. Defaults to the last 24 hours.
+    """
+    until = until or datetime.now(timezone.utc)
+    since = since or until - timedelta(days=1)
+    try:
+        rows = await get_usage_rollups(bucket, group_by, since, until, username)
+    except Exception as e:
+        logger.error("API error aggregating usage: %s", e)
+        raise HTTPException(status_code=500, detail="Could not aggregate usage.")
+    return {
+        "bucket": bucket,
+        "group_by": group_by,
+        "since": since.isoformat(),
+        "until": until.isoformat(),
+        "rows": rows,
+    }
+
+
+class LoopMonitorUpdate(BaseModel):
+    """Runtime changes to the event loop monitor."""
+
+    enabled: Optional[bool] = None
+    stall_threshold_seconds: Optional[float] = Field(None, gt=0)
+
+
+@router.get("/event-loop")
+async def get_event_loop_status(request: Request):
+    """Event loop lag percentiles and the most recent stalls, with their stacks."""
+    return request.app.state.loop_monitor.status()
+
+
+@router.put("/event-loop")
+async def update_event_loop_monitor(update: LoopMonitorUpdate, request: Request):
+    """Turns the event loop monitor on or off, or changes its stall threshold."""
+    monitor = request.app.state.loop_monitor
+    if update.stall_threshold_seconds is not None:
+        monitor.stall_threshold_seconds = update.stall_threshold_seconds
+    if update.enabled is True:
+        await monitor.start()
+    elif update.enabled is False:
+        await monitor.stop()
+    return monitor.status()
+
+
+class AllocationProfilerUpdate(BaseModel):
+    """Turns allocation profiling on or off."""
+
+    enabled: bool
+    # Stack frames kept per allocation; more show callers but cost more.
+    frames: int = Field(1, ge=1, le=50)
+
+
+@router.get("/allocations")
+async def get_allocations(request: Request, top: int = Query(20, ge=1, le=200)):
+    """RSS, traced memory and the allocation sites that grew most while profiling."""
+    return await asyncio.to_thread(request.app.state.alloc_profiler.report, top)
+
+
+@router.put("/allocations")
+async def update_allocation_profiler(
+    update: AllocationProfilerUpdate, request: Request
+):
+    """
+    Starts or stops allocation profiling. While on, every request's retained
+    memory is recorded in request_allocated_bytes, at a large CPU cost.
+    Taking the baseline snapshot and clearing the traces run off the event loop.
+    """
+    profiler = request.app.state.alloc_profiler
+    if update.enabled:
+        await asyncio.to_thread(profiler.start, update.frames)
+    else:
+        await asyncio.to_thread(profiler.stop)
+    return {"enabled": profiler.running, "frames": profiler.frames}
@@ -1,13 +1,45 @@
 import logging
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from fastapi.responses import StreamingResponse, JSONResponse
+from typing import Optional
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    BackgroundTasks,
+    Header,
+    Query,
+    Request,
+    WebSocket,
+)
+from fastapi.responses import StreamingResponse, ORJSONResponse
 from pydantic import BaseModel
 from langchain_core.runnables import RunnableConfig
 
-from src.api.dependencies import get_chat_service, get_agent
+from src.api.dependencies import get_chat_service, get_agent, get_read_router
 from src.api.services.chat_service import ChatService
+from src.api.services.chat_socket_service import ChatSocketSession
+from src.api.services.conversation_transfer_service import (
+    export_conversations,
+    import_conversations,
+)
 from src.ai.agents.chat_agent import ChatAgent
-from src.api.db import get_conversations_for_user
+from src.api.archive import restore_thread
+from src.api.db import (
+    get_conversations_for_user,
+    get_thread_version,
+    get_user_conversations_version,
+    search_conversations_for_user,
+)
+from src.api.rate_limit import enforce_rate_limit, rate_limit_subject
+from src.api.replica import ReadRouter
+from src.api.turn_buffer import IdempotencyKeyReused, ResumePointExpired
+from src.api.http_cache import (
+    build_etag,
+    cache_headers,
+    is_not_modified,
+    not_modified_response,
+)
+from src.config.settings import settings
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 logger = logging.getLogger(__name__)
@@ -23,44 +55,215 @@ class ChatInput(BaseModel):
 @router.post("/stream")
 async def stream_chat(
     chat_input: ChatInput,
+    request: Request,
     background_tasks: BackgroundTasks,
     chat_service: ChatService = Depends(get_chat_service),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
 ):
-    """Stream chat responses and trigger title generation in the background."""
+    """
+    Stream chat responses and trigger title generation in the background.
+    The agent run is cancelled if the client disconnects mid-answer.
+    Requests are rate limited per user, answering 429 with reset hints.
+    With an Idempotency-Key header the turn is resumable: resubmitting it
+    with the same key and the last received event ID in Last-Event-ID
+    continues the same turn's stream instead of running it again, and is
+    not rate limited.
+    """
+    subject = rate_limit_subject(chat_input.session_id, request)
+    if idempotency_key is not None:
+        if not 0 < len(idempotency_key) <= 255:
+            raise HTTPException(status_code=400, detail="Invalid Idempotency-Key.")
+        try:
+            after = int(last_event_id) if last_event_id else 0
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID.")
+        try:
+            events, headers = await chat_service.open_resumable_chat(
+                chat_input.message,
+                chat_input.session_id,
+                idempotency_key,
+                after,
+                rate_limit_subject=subject,
+            )
+        except IdempotencyKeyReused:
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key was already used for another message.",
+            )
+        except ResumePointExpired:
+            raise HTTPException(
+                status_code=409, detail="The turn can no longer be resumed."
+            )
+        return StreamingResponse(
+            events, media_type="text/event-stream", headers=headers
+        )
+
+    headers = await enforce_rate_limit(chat_service.rate_limiter, subject)
     return StreamingResponse(
         chat_service.stream_chat(
-            chat_input.message, chat_input.session_id, background_tasks
+            chat_input.message,
+            chat_input.session_id,
+            background_tasks,
+            is_disconnected=request.is_disconnected,
+            rate_limit_subject=subject,
         ),
         media_type="text/event-stream",
+        headers=headers,
     )
 
 
+@router.websocket("/ws")
+async def chat_socket(
+    websocket: WebSocket, chat_service: ChatService = Depends(get_chat_service)
+):
+    """
+    Run chat turns for many sessions over one WebSocket. Client frames are
+    {"op": "send", "s": session_id, "m": message} and {"op": "cancel", "s":
+    session_id}; server frames are {"s": session_id, "t": type, "d": data}.
+    """
+    await ChatSocketSession(websocket, chat_service).run()
+
+
 @router.get("/history/{session_id}")
-async def get_chat_history(session_id: str, agent: ChatAgent = Depends(get_agent)):
-    """Retrieve the full chat history for a given session ID."""
+async def get_chat_history(
+    session_id: str,
+    agent: ChatAgent = Depends(get_agent),
+    read_router: ReadRouter = Depends(get_read_router),
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    Retrieve the full chat history for a given session ID.
+    Answers conditional requests with 304 before any state is deserialized.
+    Archived threads are restored first. The state is read from the replica
+    unless the thread was written too recently for it.
+    """
     try:
+        # The version is read before the state, so a concurrent write can only
+        # make the returned ETag older than the body, never newer.
+        version, written_at = await get_thread_version(session_id)
+        if version is None and await restore_thread(agent.runnable, session_id):
+            version, written_at = await get_thread_version(session_id)
+        etag = build_etag("history", session_id, version)
+        if is_not_modified(if_none_match, etag):
+            return not_modified_response(etag)
+
         config = RunnableConfig(configurable={"thread_id": session_id})
-        state = await agent.runnable.aget_state(config)
+        target = read_router.route(written_at)
+        checkpoint_tuple = await target.checkpointer.aget_tuple(config)
 
-        if state is None:
-            return JSONResponse(content=[])
+        if checkpoint_tuple is None:
+            return ORJSONResponse(content=[], headers=cache_headers(etag))
 
-        messages = [msg.dict() for msg in state.values.get("messages", [])]
-        return JSONResponse(content=messages)
+        messages = [
+            msg.dict()
+            for msg in checkpoint_tuple.checkpoint["channel_values"].get("messages", [])
+        ]
+        return ORJSONResponse(content=messages, headers=cache_headers(etag))
 
     except Exception as e:
-        logger.error(f"Error retrieving history for session {session_id}: {e}")
+        logger.error("Error retrieving history for session %s: %s", session_id, e)
         raise HTTPException(status_code=500, detail="Could not retrieve chat history.")
 
 
 @router.get("/user/{username}")
-async def get_user_conversations(username: str):
-    """Retrieve all conversation threads for a specific user."""
+async def get_user_conversations(
+    username: str,
+    read_router: ReadRouter = Depends(get_read_router),
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    Retrieve all conversation threads for a specific user.
+    Answers conditional requests with 304 when no thread or title has changed.
+    The list is read from the replica unless it changed too recently for it.
+    """
     try:
-        conversations = await get_conversations_for_user(username)
-        return JSONResponse(content=conversations)
+        version, changed_at = await get_user_conversations_version(username)
+        etag = build_etag("conversations", username, version)
+        if is_not_modified(if_none_match, etag):
+            return not_modified_response(etag)
+
+        target = read_router.route(changed_at)
+        conversations = await get_conversations_for_user(username, target.pool)
+        return ORJSONResponse(content=conversations, headers=cache_headers(etag))
     except Exception as e:
-        logger.error(f"API error fetching conversations for user '{username}': {e}")
+        logger.error("API error fetching conversations for user '%s': %s", username, e)
         raise HTTPException(
             status_code=500, detail="Could not retrieve user conversations."
         )
+
+
+@router.get("/user/{username}/export")
+async def export_user_conversations(
+    username: str, read_router: ReadRouter = Depends(get_read_router)
+):
+    """
+    Stream all of a user's threads and messages, archived ones included, as
+    NDJSON ending in an "end" line with the totals. Memory use does not grow
+    with the size of the history.
+    """
+    try:
+        _, changed_at = await get_user_conversations_version(username)
+    except Exception as e:
+        logger.error("API error exporting conversations for user '%s': %s", username, e)
+        raise HTTPException(
+            status_code=500, detail="Could not export user conversations."
+        )
+    target = read_router.route(changed_at)
+    return StreamingResponse(
+        export_conversations(username, target.pool, target.checkpointer.serde),
+        media_type="application/x-ndjson",
+    )
+
+
+@router.post("/user/{username}/import")
+async def import_user_conversations(
+    username: str, request: Request, agent: ChatAgent = Depends(get_agent)
+):
+    """
+    Import threads from an NDJSON export, streamed in the request body.
+    Existing threads are skipped and threads of other users rejected;
+    answers with the counts of each.
+    """
+    try:
+        return await import_conversations(
+            username,
+            request.stream(),
+            agent.runnable,
+            settings.conversation_import_batch_size,
+            settings.conversation_import_concurrency,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("API error importing conversations for user '%s': %s", username, e)
+        raise HTTPException(
+            status_code=500, detail="Could not import user conversations."
+        )
+
+
+@router.get("/user/{username}/search")
+async def search_user_conversations(
+    username: str,
+    q: str = Query(..., min_length=1, max_length=256),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+):
+    """
+    Full-text search over a user's conversation titles and messages.
+    Accepts web-search syntax ("quoted phrases", -excluded, or).
+    """
+    try:
+        # One extra row tells whether another page exists.
+        results = await search_conversations_for_user(username, q, limit + 1, offset)
+        return {
+            "results": results[:limit],
+            "limit": limit,
+            "offset": offset,
+            "has_more": len(results) > limit,
+        }
+    except Exception as e:
+        logger.error("API error searching conversations for user '%s': %s", username, e)
+        raise HTTPException(
+            status_code=500, detail="Could not search user conversations."
+        )
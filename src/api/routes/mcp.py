@@ -1,6 +1,6 @@
 from typing import Optional
 from fastapi import APIRouter
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 
 from src.ai.tools.mcp_tools import MCPToolProvider
 
@@ -11,7 +11,7 @@ router = APIRouter(prefix="/mcp", tags=["mcp"])
 async def call_mcp(city: Optional[str] = None):
     """Call MCP tool directly (for testing)."""
     if not city:
-        return JSONResponse(
+        return ORJSONResponse(
             content={"error": "City parameter is required"}, status_code=400
         )
 
@@ -19,7 +19,7 @@ async def call_mcp(city: Optional[str] = None):
     tools = await provider.get_tools()
 
     if not tools:
-        return JSONResponse(
+        return ORJSONResponse(
             content={"error": "No MCP tools available"}, status_code=503
         )
 
@@ -28,9 +28,9 @@ async def call_mcp(city: Optional[str] = None):
     )
 
     if not weather_tool:
-        return JSONResponse(
+        return ORJSONResponse(
             content={"error": "Weather tool not found"}, status_code=404
         )
 
     result = await weather_tool.ainvoke({"city": city})
-    return JSONResponse(content=result)
+    return ORJSONResponse(content=result)
@@ -1,54 +1,425 @@
-import json
-from typing import AsyncGenerator
+import asyncio
+import logging
+from contextlib import aclosing
+from typing import (
+    Any,
+    AsyncGenerator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
 
+import anyio
+import orjson
 from fastapi import BackgroundTasks
-from langchain_core.messages import HumanMessage
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
 from langchain_core.runnables import RunnableConfig
 
-from src.ai.agents.chat_agent import ChatAgent
-from src.api.services.chat_title_service import generate_and_save_title
+from src.ai.agents.chat_agent import ChatAgent, is_interrupted
+from src.ai.replay.cassette import use_cassette
+from src.ai.replay.recorder import CassetteRecorder
+from src.api.archive import restore_thread
+from src.api.db import index_conversation_turn
+from src.api.jobs.handlers import enqueue_title_job
+from src.api.rate_limit import RateLimiter, enforce_rate_limit
+from src.api.turn_buffer import (
+    IdempotencyKeyReused,
+    ResumePointExpired,
+    TurnBuffer,
+    idempotent_turns,
+    message_hash,
+)
+from src.api.usage import TurnTracker, UsageWriter
+from src.config.logging_config import session_id_var
+from src.config.settings import settings
+from src.monitoring.metrics import metrics
+from src.monitoring.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+cancelled_turns = metrics.counter(
+    "chat_turns_cancelled_total",
+    "Agent turns cancelled because the client went away, by the stage they were in.",
+)
+
+# Signals the end of the agent run on the event queue.
+_DONE = object()
+
+
+class _QueueBackpressure(AsyncCallbackHandler):
+    """
+    Holds the model's token stream while the turn's event queue is full.
+    astream_events buffers its events without limit, so the bounded queue
+    alone would not slow the model down.
+    """
+
+    def __init__(self, queue: asyncio.Queue):
+        self.queue = queue
+        self.drained = asyncio.Event()
+
+    async def on_llm_new_token(self, token: str, **kwargs: Any):
+        while self.queue.full():
+            self.drained.clear()
+            await self.drained.wait()
+
+
+def message_text(message: BaseMessage) -> str:
+    """The text of a message, joining the text parts of multi-part content."""
+    content = message.content
+    if isinstance(content, list):
+        content = " ".join(
+            part if isinstance(part, str) else part.get("text", "") for part in content
+        )
+    return content
+
+
+def turn_text(user_input: str, history: List[BaseMessage]) -> str:
+    """Joins the user's message and the final AI answer of the turn."""
+    answer = history[-1] if history else None
+    if not isinstance(answer, AIMessage):
+        return user_input
+    return f"{user_input}\n{message_text(answer)}"
 
 
 class ChatService:
     """Service for handling chat interactions, relying on the agent's checkpointer."""
 
-    def __init__(self, agent: ChatAgent):
+    def __init__(
+        self,
+        agent: ChatAgent,
+        rate_limiter: Optional[RateLimiter] = None,
+        usage_writer: Optional[UsageWriter] = None,
+        turn_buffer: Optional[TurnBuffer] = None,
+    ):
         self.agent = agent
+        self.rate_limiter = rate_limiter
+        self.usage_writer = usage_writer
+        self.turn_buffer = turn_buffer
 
     async def stream_chat(
-        self, user_input: str, session_id: str, background_tasks: BackgroundTasks
-    ) -> AsyncGenerator[str, None]:
+        self,
+        user_input: str,
+        session_id: str,
+        background_tasks: BackgroundTasks,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+        rate_limit_subject: Optional[str] = None,
+    ) -> AsyncGenerator[bytes, None]:
         """
-        Stream chat responses and queue a background task to generate a title.
+        Stream chat responses as Server-Sent Events, then queue the post-turn
+        background tasks.
         """
-        inputs = {"messages": [HumanMessage(content=user_input)]}
-        config = RunnableConfig(configurable={"thread_id": session_id})
-
-        async for event in self.agent.runnable.astream_events(
-            inputs, config=config, version="v1"
-        ):
-            kind = event["event"]
-            if kind == "on_tool_start":
-                tool_input = event["data"]["input"]
-                tool_input_str = json.dumps(tool_input)
-                yield self._format_sse(
-                    "tool_start", f"Using tool with input: `{tool_input_str}`..."
-                )
-            elif kind == "on_chat_model_stream":
-                chunk = event["data"]["chunk"]
-                if chunk.content:
-                    yield self._format_sse("chunk", chunk.content)
+        events = self.stream_events(
+            user_input, session_id, is_disconnected, rate_limit_subject
+        )
+        async with aclosing(events):
+            async for event_type, data in events:
+                yield self._format_sse(event_type, data)
 
         # This code runs after the generator has been fully consumed by the client.
         yield self._format_sse("end", "")
+        await self.queue_post_turn_tasks(user_input, session_id, background_tasks)
+
+    async def open_resumable_chat(
+        self,
+        user_input: str,
+        session_id: str,
+        idempotency_key: str,
+        last_event_id: int = 0,
+        rate_limit_subject: Optional[str] = None,
+    ) -> Tuple[AsyncGenerator[bytes, None], Dict[str, str]]:
+        """
+        Starts the turn submitted under `idempotency_key`, or attaches to it
+        if it was submitted before, and returns its Server-Sent Events after
+        `last_event_id`, each with its ID, and the rate limit headers. Only
+        starting a turn is rate limited; resuming one it already paid for
+        is free. The turn runs detached from the
+        request, with its events buffered, so a client that lost the stream
+        can resubmit with Last-Event-ID and get the rest of the same turn.
+        It is cancelled once no client has been attached for the resume
+        grace period. Raises IdempotencyKeyReused if the key was used for
+        another message and ResumePointExpired if the events after
+        `last_event_id` are no longer buffered.
+        """
+        buffer = self.turn_buffer
+        try:
+            created = await buffer.start(
+                session_id, idempotency_key, message_hash(user_input)
+            )
+        except IdempotencyKeyReused:
+            idempotent_turns.inc(outcome="conflict")
+            raise
+        headers: Dict[str, str] = {}
+        if created:
+            try:
+                headers = await enforce_rate_limit(
+                    self.rate_limiter, rate_limit_subject
+                )
+            except BaseException:
+                # A rejected turn is not kept, so it can be submitted again.
+                await buffer.discard(session_id, idempotency_key)
+                raise
+            idempotent_turns.inc(outcome="started")
+            buffer.run(
+                self._buffer_turn(
+                    user_input, session_id, idempotency_key, rate_limit_subject
+                )
+            )
+        else:
+            try:
+                await buffer.check_resumable(session_id, idempotency_key, last_event_id)
+            except ResumePointExpired:
+                idempotent_turns.inc(outcome="expired")
+                raise
+            idempotent_turns.inc(outcome="resumed")
+        events = self._stream_buffered_turn(session_id, idempotency_key, last_event_id)
+        return events, headers
+
+    async def _buffer_turn(
+        self,
+        user_input: str,
+        session_id: str,
+        idempotency_key: str,
+        rate_limit_subject: Optional[str],
+    ):
+        """Runs a turn into the turn buffer, then its post-turn tasks."""
+        buffer = self.turn_buffer
 
+        async def abandoned() -> bool:
+            return await buffer.abandoned(session_id, idempotency_key)
+
+        try:
+            events = self.stream_events(
+                user_input, session_id, abandoned, rate_limit_subject
+            )
+            async with aclosing(events):
+                async for event_type, data in events:
+                    await buffer.append(session_id, idempotency_key, event_type, data)
+            await buffer.append(session_id, idempotency_key, "end", "")
+        except Exception as e:
+            logger.error("Buffered turn for thread '%s' failed: %s", session_id, e)
+            await buffer.append(
+                session_id, idempotency_key, "error", "The turn failed."
+            )
+            return
+        finally:
+            with anyio.CancelScope(shield=True):
+                await buffer.finish(session_id, idempotency_key)
+
+        background_tasks = BackgroundTasks()
+        try:
+            await self.queue_post_turn_tasks(user_input, session_id, background_tasks)
+            await background_tasks()
+        except Exception as e:
+            logger.error("Post-turn tasks for thread '%s' failed: %s", session_id, e)
+
+    async def _stream_buffered_turn(
+        self, session_id: str, idempotency_key: str, last_event_id: int
+    ) -> AsyncGenerator[bytes, None]:
+        try:
+            async for event_id, event_type, data in self.turn_buffer.events(
+                session_id, idempotency_key, last_event_id
+            ):
+                yield self._format_sse(event_type, data, event_id)
+        except ResumePointExpired:
+            # The client fell further behind than the buffer holds; it gets
+            # a 409 on reconnecting instead of a stream with a gap.
+            logger.warning(
+                "Client of buffered turn for thread '%s' fell behind.", session_id
+            )
+
+    async def queue_post_turn_tasks(
+        self, user_input: str, session_id: str, background_tasks: BackgroundTasks
+    ):
+        """
+        Queues title generation, search indexing and, with conversation
+        memory enabled, storing the turn for recall, for the turn that just
+        ended. Interrupted turns get none of them.
+        """
+        config = RunnableConfig(configurable={"thread_id": session_id})
         final_state = await self.agent.runnable.aget_state(config)
         if final_state:
             history = final_state.values.get("messages", [])
             # We generate a title after the first user message and AI response.
-            if len(history) >= 2:
-                background_tasks.add_task(generate_and_save_title, session_id, history)
+            # Replayed turns skip it, as the title model is not recorded.
+            if (
+                len(history) >= 2
+                and settings.replay_mode != "replay"
+                and not is_interrupted(history[-1])
+            ):
+                text = turn_text(user_input, history)
+                background_tasks.add_task(enqueue_title_job, session_id)
+                background_tasks.add_task(index_conversation_turn, session_id, text)
+                if self.agent.memory:
+                    background_tasks.add_task(
+                        self.agent.memory.remember, session_id, text
+                    )
+
+    async def stream_events(
+        self,
+        user_input: str,
+        session_id: str,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+        rate_limit_subject: Optional[str] = None,
+    ) -> AsyncGenerator[Tuple[str, str], None]:
+        """
+        Runs one agent turn in a background task and yields its events as
+        (type, data) pairs. An archived thread is restored before the turn
+        starts. The run is cancelled when the consumer is cancelled
+        or `is_disconnected` reports the client gone, and the interrupted turn
+        is committed to the checkpoint before a final "cancelled" event.
+        However the turn ends, its usage is recorded and its model tokens
+        are debited from the user's token budget. The run waits while
+        CHAT_STREAM_QUEUE_SIZE events are unconsumed, so a slow reader slows
+        it down instead of events piling up in memory.
+        """
+        # Set in the task running the turn, so its logs carry the session ID.
+        session_id_var.set(session_id)
+        await restore_thread(self.agent.runnable, session_id)
+        inputs = {"messages": [HumanMessage(content=user_input)]}
+        config = RunnableConfig(
+            configurable={"thread_id": session_id},
+            recursion_limit=self.agent.recursion_limit,
+        )
+        tracker = TurnTracker()
+        status = "interrupted"
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.chat_stream_queue_size)
+        backpressure = _QueueBackpressure(queue)
+        config["callbacks"] = [backpressure]
+
+        with use_cassette(session_id, user_input) as cassette:
+            if settings.replay_mode == "record":
+                config["callbacks"].append(CassetteRecorder(cassette))
+
+            run = asyncio.create_task(self._run_turn(inputs, config, queue, tracker))
+            loop = asyncio.get_running_loop()
+            poll_at = loop.time() + settings.chat_disconnect_poll_seconds
+            try:
+                while True:
+                    # The deadline is kept across events, so the client is
+                    # checked on schedule even while chunks keep arriving.
+                    try:
+                        async with asyncio.timeout_at(poll_at):
+                            item = await queue.get()
+                        backpressure.drained.set()
+                    except TimeoutError:
+                        poll_at = loop.time() + settings.chat_disconnect_poll_seconds
+                        if is_disconnected is not None and await is_disconnected():
+                            break
+                        continue
+
+                    if item is _DONE or isinstance(item, BaseException):
+                        await run
+                        if item is _DONE:
+                            status = "completed"
+                            return
+                        status = "error"
+                        raise item
+                    yield item
+            finally:
+                # Runs even while this task is being cancelled, so the
+                # checkpoint is never left mid-turn.
+                with anyio.CancelScope(shield=True):
+                    if not run.done():
+                        await self._cancel_turn(run, config, tracker)
+                    await self._account_turn(
+                        tracker, session_id, status, rate_limit_subject
+                    )
+
+        yield "cancelled", ""
+
+    async def _run_turn(
+        self,
+        inputs: dict,
+        config: RunnableConfig,
+        queue: asyncio.Queue,
+        tracker: TurnTracker,
+    ):
+        """Runs the agent and forwards its stream events to the queue."""
+        with tracer.span(
+            "chat.turn", **{"session.id": config["configurable"]["thread_id"]}
+        ) as span:
+            try:
+                async for event in self.agent.runnable.astream_events(
+                    inputs, config=config, version="v2"
+                ):
+                    tracker.observe(event)
+                    kind = event["event"]
+                    if kind == "on_tool_start":
+                        tool_input = event["data"]["input"]
+                        tool_input_str = orjson.dumps(tool_input).decode()
+                        await queue.put(
+                            (
+                                "tool_start",
+                                f"Using tool with input: `{tool_input_str}`...",
+                            )
+                        )
+                    elif kind == "on_chat_model_stream":
+                        chunk = event["data"]["chunk"]
+                        if chunk.content:
+                            await queue.put(("chunk", chunk.content))
+            except Exception as e:
+                span.record_exception(e)
+                await queue.put(e)
+            else:
+                await queue.put(_DONE)
+            finally:
+                span.set_attribute("llm.total_tokens", tracker.total_tokens)
+
+    async def _cancel_turn(
+        self, run: asyncio.Task, config: RunnableConfig, tracker: TurnTracker
+    ):
+        """Cancels a running turn, aborting its model and tool calls."""
+        thread_id = config["configurable"]["thread_id"]
+        run.cancel()
+        try:
+            await run
+        except asyncio.CancelledError:
+            pass
+
+        try:
+            await self.agent.commit_interrupted_turn(
+                config, "".join(tracker.partial_text)
+            )
+        except Exception as e:
+            logger.error(
+                "Error committing interrupted turn for thread %s: %s", thread_id, e
+            )
+        cancelled_turns.inc(stage=tracker.stage)
+        logger.info(
+            "Cancelled turn for thread '%s' during stage '%s'.",
+            thread_id,
+            tracker.stage,
+        )
+
+    async def _account_turn(
+        self,
+        tracker: TurnTracker,
+        thread_id: str,
+        status: str,
+        rate_limit_subject: Optional[str],
+    ):
+        """Records a finished turn's usage and debits its tokens from the budget."""
+        if self.usage_writer:
+            self.usage_writer.record(tracker.usage(thread_id, status))
+        if self.rate_limiter and rate_limit_subject and tracker.total_tokens:
+            try:
+                await self.rate_limiter.debit_tokens(
+                    rate_limit_subject, tracker.total_tokens
+                )
+            except Exception as e:
+                logger.error(
+                    "Error debiting tokens for '%s': %s", rate_limit_subject, e
+                )
 
-    def _format_sse(self, event_type: str, data: str) -> str:
+    def _format_sse(
+        self, event_type: str, data: str, event_id: Optional[int] = None
+    ) -> bytes:
         """Format data for Server-Sent Events."""
-        return f"data: {json.dumps({'type': event_type, 'data': data})}\n\n"
+        event = b"data: " + orjson.dumps({"type": event_type, "data": data}) + b"\n\n"
+        if event_id is None:
+            return event
+        return b"id: %d\n" % event_id + event
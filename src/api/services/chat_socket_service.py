@@ -0,0 +1,170 @@
+import asyncio
+import logging
+from contextlib import aclosing
+from typing import Any, Dict, Literal, Optional, Set
+
+import anyio
+import orjson
+from fastapi import BackgroundTasks, HTTPException, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel, ValidationError
+
+from src.api.rate_limit import enforce_rate_limit, rate_limit_subject
+from src.api.services.chat_service import ChatService
+from src.config.settings import settings
+from src.monitoring.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+open_connections = metrics.gauge(
+    "chat_ws_connections", "Open chat WebSocket connections."
+)
+socket_turns = metrics.counter(
+    "chat_ws_turns_total",
+    "Turns run over chat WebSockets, by outcome (end/cancelled/error/rejected).",
+)
+
+
+class ClientFrame(BaseModel):
+    """A frame from the client: start a turn on a session, or cancel it."""
+
+    op: Literal["send", "cancel"]
+    s: str
+    m: Optional[str] = None
+
+
+class ChatSocketSession:
+    """
+    Serves one chat WebSocket, over which a client runs turns for any number
+    of sessions at once. Server frames are compact JSON tagged with their
+    session, {"s": session_id, "t": type, "d": data}, where the types match
+    the SSE events plus "error". Frames go out through a bounded queue, and
+    turns wait while it is full, down to the model's token stream, so a slow
+    reader holds back the turns instead of buffering without limit.
+    """
+
+    def __init__(self, websocket: WebSocket, chat_service: ChatService):
+        self.websocket = websocket
+        self.chat_service = chat_service
+        self._outgoing: asyncio.Queue = asyncio.Queue(
+            maxsize=settings.chat_ws_send_queue_size
+        )
+        # Running turns by session, and every task this connection started,
+        # including turns whose post-turn work is still going.
+        self._turns: Dict[str, asyncio.Task] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def run(self):
+        """Accepts the connection and serves it until the client goes away."""
+        await self.websocket.accept()
+        open_connections.inc()
+        sender = asyncio.create_task(self._send_frames())
+        try:
+            while True:
+                await self._handle(await self.websocket.receive_text())
+        except WebSocketDisconnect:
+            pass
+        finally:
+            # Turns of a closed connection are interrupted like a closed SSE
+            # stream. Shielded, as the server may be cancelling this handler.
+            with anyio.CancelScope(shield=True):
+                for task in list(self._turns.values()):
+                    task.cancel()
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+                sender.cancel()
+                await asyncio.gather(sender, return_exceptions=True)
+            open_connections.dec()
+
+    async def _handle(self, text: str):
+        # Rejections never wait for the send queue, so a client that is behind
+        # on reading still gets its cancel frames read.
+        try:
+            frame = ClientFrame.model_validate_json(text)
+        except ValidationError:
+            self._emit_nowait(None, "error", "Invalid frame.")
+            return
+
+        if frame.op == "cancel":
+            task = self._turns.get(frame.s)
+            if task:
+                task.cancel()
+            return
+
+        if not frame.m:
+            self._emit_nowait(frame.s, "error", "Missing message.")
+        elif frame.s in self._turns:
+            self._emit_nowait(frame.s, "error", "A turn is already running.")
+        elif len(self._turns) >= settings.chat_ws_max_active_turns:
+            self._emit_nowait(frame.s, "error", "Too many turns running.")
+        else:
+            task = asyncio.create_task(self._run_turn(frame.s, frame.m))
+            self._turns[frame.s] = task
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            return
+        socket_turns.inc(outcome="rejected")
+
+    async def _run_turn(self, session_id: str, message: str):
+        subject = rate_limit_subject(session_id, self.websocket)
+        try:
+            await enforce_rate_limit(self.chat_service.rate_limiter, subject)
+        except HTTPException as e:
+            socket_turns.inc(outcome="rejected")
+            self._turns.pop(session_id, None)
+            await self._emit(
+                session_id,
+                "error",
+                {"status": e.status_code, "detail": e.detail, "headers": e.headers},
+            )
+            return
+
+        events = self.chat_service.stream_events(
+            message, session_id, rate_limit_subject=subject
+        )
+        try:
+            async with aclosing(events):
+                async for event_type, data in events:
+                    await self._emit(session_id, event_type, data)
+        except asyncio.CancelledError:
+            # stream_events has committed the interrupted turn by now.
+            socket_turns.inc(outcome="cancelled")
+            self._turns.pop(session_id, None)
+            self._emit_nowait(session_id, "cancelled", "")
+            return
+        except Exception as e:
+            logger.error("Error in WebSocket turn for session %s: %s", session_id, e)
+            socket_turns.inc(outcome="error")
+            self._turns.pop(session_id, None)
+            await self._emit(session_id, "error", "The turn failed.")
+            return
+
+        # The session is free for its next turn as soon as the client sees "end",
+        # while the post-turn work still runs, as it does after an SSE response.
+        socket_turns.inc(outcome="end")
+        self._turns.pop(session_id, None)
+        await self._emit(session_id, "end", "")
+        background_tasks = BackgroundTasks()
+        await self.chat_service.queue_post_turn_tasks(
+            message, session_id, background_tasks
+        )
+        await background_tasks()
+
+    async def _emit(self, session_id: Optional[str], event_type: str, data: Any):
+        await self._outgoing.put(self._encode(session_id, event_type, data))
+
+    def _emit_nowait(self, session_id: Optional[str], event_type: str, data: Any):
+        """
+        Emits without waiting, for turns being torn down and rejections,
+        dropping the frame if the client is too far behind to take it.
+        """
+        try:
+            self._outgoing.put_nowait(self._encode(session_id, event_type, data))
+        except asyncio.QueueFull:
+            pass
+
+    async def _send_frames(self):
+        while True:
+            await self.websocket.send_text(await self._outgoing.get())
+
+    @staticmethod
+    def _encode(session_id: Optional[str], event_type: str, data: Any) -> str:
+        return orjson.dumps({"s": session_id, "t": event_type, "d": data}).decode()
@@ -0,0 +1,306 @@
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import orjson
+from langchain_core.messages import (
+    BaseMessage,
+    HumanMessage,
+    message_to_dict,
+    messages_from_dict,
+)
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.graph.state import CompiledStateGraph
+from psycopg_pool import AsyncConnectionPool
+
+from src.ai.agents.chat_agent import is_interrupted
+from src.api.archive import unpack_messages
+from src.api.db import (
+    get_db_connection,
+    index_conversation_turns,
+    save_conversation_title,
+)
+from src.api.services.chat_service import message_text, turn_text
+from src.api.sessions import (
+    SESSION_UUID_REGEX,
+    session_id_prefix_pattern,
+    username_from_session_id,
+)
+from src.monitoring.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+transferred_messages = metrics.counter(
+    "conversation_transfer_messages_total",
+    "Messages exported or imported in bulk, by direction.",
+)
+
+# Rows are whole threads, so few are fetched from the server-side cursor at once.
+_EXPORT_FETCH_THREADS = 8
+
+
+def _line(record: Dict[str, Any]) -> bytes:
+    return orjson.dumps(record) + b"\n"
+
+
+def _thread_lines(
+    thread_id: str,
+    title: Optional[str],
+    archived: bool,
+    messages: List[BaseMessage],
+) -> bytes:
+    header = {
+        "type": "thread",
+        "thread_id": thread_id,
+        "title": title,
+        "archived": archived,
+        "message_count": len(messages),
+    }
+    return _line(header) + b"".join(
+        _line(
+            {"type": "message", "thread_id": thread_id, "message": message_to_dict(m)}
+        )
+        for m in messages
+    )
+
+
+async def export_conversations(
+    username: str, pool: AsyncConnectionPool, serde: SerializerProtocol
+) -> AsyncIterator[bytes]:
+    """
+    Yields all of a user's threads as NDJSON: a "thread" line followed by
+    one "message" line per message of its latest checkpoint, then a closing
+    "end" line with the totals, so clients can tell a complete export from
+    a broken stream. Threads are read through server-side cursors, so
+    memory use is bounded by the largest thread, not the whole history.
+    """
+    live_query = """
+                 select latest.thread_id, meta.title, blob.type, blob.blob
+                 from (select distinct on (thread_id) thread_id, checkpoint
+                       from checkpoints
+                       where thread_id like %(pattern)s
+                         and substr(thread_id, %(suffix_start)s) ~ %(uuid_regex)s
+                         and checkpoint_ns = ''
+                       order by thread_id, checkpoint_id desc) latest
+                          join checkpoint_blobs blob
+                               on blob.thread_id = latest.thread_id
+                                   and blob.checkpoint_ns = ''
+                                   and blob.channel = 'messages'
+                                   and blob.version = latest.checkpoint -> 'channel_versions' ->> 'messages'
+                          left join public.conversation_metadata meta on latest.thread_id = meta.thread_id
+                 where blob.type <> 'empty'
+                 order by latest.thread_id; \
+                 """
+    archived_query = """
+                     select archive.thread_id, meta.title, archive.messages
+                     from public.conversation_archive archive
+                              left join public.conversation_metadata meta on archive.thread_id = meta.thread_id
+                     where archive.username = %(username)s
+                     order by archive.thread_id; \
+                     """
+    # Only "{username}-{uuid}" threads, not those of users whose name merely
+    # starts with "{username}-", matching the archive's username column.
+    params = {
+        "pattern": session_id_prefix_pattern(username),
+        "suffix_start": len(username) + 2,
+        "uuid_regex": SESSION_UUID_REGEX,
+        "username": username,
+    }
+    threads = messages = 0
+    async with get_db_connection(pool) as conn:
+        async with conn.cursor(name="export_live", binary=True) as cur:
+            cur.itersize = _EXPORT_FETCH_THREADS
+            await cur.execute(live_query, params)
+            async for thread_id, title, blob_type, blob in cur:
+                thread_messages = serde.loads_typed((blob_type, blob))
+                threads += 1
+                messages += len(thread_messages)
+                yield _thread_lines(thread_id, title, False, thread_messages)
+
+        async with conn.cursor(name="export_archived", binary=True) as cur:
+            cur.itersize = _EXPORT_FETCH_THREADS
+            await cur.execute(archived_query, params)
+            async for thread_id, title, packed in cur:
+                thread_messages = unpack_messages(packed)
+                threads += 1
+                messages += len(thread_messages)
+                yield _thread_lines(thread_id, title, True, thread_messages)
+
+    transferred_messages.inc(messages, direction="export")
+    yield _line({"type": "end", "threads": threads, "messages": messages})
+
+
+async def _read_records(lines: AsyncIterator[bytes]) -> AsyncIterator[Dict[str, Any]]:
+    """Parses NDJSON from a byte stream cut at arbitrary points."""
+    buffer = bytearray()
+    number = 0
+    async for chunk in lines:
+        buffer += chunk
+        if b"\n" not in chunk:
+            continue
+        *complete, rest = buffer.split(b"\n")
+        buffer = bytearray(rest)
+        for line in complete:
+            number += 1
+            if line.strip():
+                yield _parse(line, number)
+    if buffer.strip():
+        yield _parse(buffer, number + 1)
+
+
+def _parse(line: bytes, number: int) -> Dict[str, Any]:
+    try:
+        record = orjson.loads(line)
+    except orjson.JSONDecodeError as e:
+        raise ValueError(f"Line {number} is not valid JSON: {e}")
+    if not isinstance(record, dict) or "type" not in record:
+        raise ValueError(f"Line {number} is not an export record.")
+    return record
+
+
+def _message_from_record(record: Dict[str, Any]) -> BaseMessage:
+    try:
+        return messages_from_dict([record["message"]])[0]
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(
+            f"Invalid message in thread '{record.get('thread_id')}': {e!r}"
+        )
+
+
+async def _existing_threads(thread_ids: List[str]) -> set:
+    query = """
+            select thread_id
+            from checkpoints
+            where thread_id = any (%(thread_ids)s)
+            union
+            select thread_id
+            from public.conversation_archive
+            where thread_id = any (%(thread_ids)s); \
+            """
+    async with get_db_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(query, {"thread_ids": thread_ids})
+            return {row[0] for row in await cur.fetchall()}
+
+
+def _turn_texts(messages: List[BaseMessage]) -> List[str]:
+    """
+    The search index texts of a thread's turns, as a live turn indexes them:
+    each user message with the final AI answer before the next one.
+    Interrupted turns are not indexed.
+    """
+    starts = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+    texts = []
+    for start, end in zip(starts, starts[1:] + [len(messages)]):
+        turn = messages[start:end]
+        if len(turn) >= 2 and not is_interrupted(turn[-1]):
+            texts.append(turn_text(message_text(turn[0]), turn))
+    return texts
+
+
+async def _write_thread(
+    graph: CompiledStateGraph,
+    thread_id: str,
+    title: Optional[str],
+    messages: List[BaseMessage],
+):
+    config = RunnableConfig(configurable={"thread_id": thread_id})
+    # Written as the agent's output, like a restored archive, so the last
+    # turn stays closed.
+    await graph.aupdate_state(config, {"messages": messages}, as_node="agent")
+    if title:
+        await save_conversation_title(thread_id, title)
+
+
+async def import_conversations(
+    username: str,
+    lines: AsyncIterator[bytes],
+    graph: CompiledStateGraph,
+    batch_size: int = 500,
+    concurrency: int = 4,
+) -> Dict[str, int]:
+    """
+    Imports threads in the export format through the checkpointer, each as
+    a single checkpoint holding its messages, with their turns indexed for
+    search like live ones. Complete threads are written
+    in batches of about `batch_size` messages, at most `concurrency` at a
+    time, so an import holds few connections of the pool chat turns use.
+    Threads that already exist, live or archived, are skipped, so a failed
+    import can be run again; threads of other users are rejected. Raises
+    ValueError on malformed input, after writing the batches before it.
+    """
+    result = {"threads": 0, "messages": 0, "skipped": 0, "rejected": 0}
+    batch: List[Tuple[str, Optional[str], List[BaseMessage]]] = []
+    batch_messages = 0
+    writers = asyncio.Semaphore(concurrency)
+
+    async def write(thread: Tuple[str, Optional[str], List[BaseMessage]]):
+        async with writers:
+            await _write_thread(graph, *thread)
+
+    async def flush():
+        nonlocal batch, batch_messages
+        pending, batch, batch_messages = batch, [], 0
+        if not pending:
+            return
+        existing = await _existing_threads([thread_id for thread_id, _, _ in pending])
+        writes = [thread for thread in pending if thread[0] not in existing]
+        await asyncio.gather(*(write(thread) for thread in writes))
+        # Indexed like live turns, so search finds imported conversations.
+        await index_conversation_turns(
+            [
+                (thread_id, text)
+                for thread_id, _, messages in writes
+                for text in _turn_texts(messages)
+            ]
+        )
+        result["skipped"] += len(pending) - len(writes)
+        result["threads"] += len(writes)
+        written = sum(len(messages) for _, _, messages in writes)
+        result["messages"] += written
+        transferred_messages.inc(written, direction="import")
+
+    current: Optional[Tuple[str, Optional[str], List[BaseMessage]]] = None
+    rejected_thread_id: Optional[str] = None
+    async for record in _read_records(lines):
+        kind = record["type"]
+        if kind == "message":
+            thread_id = record.get("thread_id")
+            if rejected_thread_id is not None and thread_id == rejected_thread_id:
+                continue
+            if current is None or thread_id != current[0]:
+                raise ValueError("Message record outside of its thread.")
+            current[2].append(_message_from_record(record))
+            continue
+        if kind not in ("thread", "end"):
+            raise ValueError(f"Unknown record type '{kind}'.")
+
+        if current is not None:
+            batch.append(current)
+            batch_messages += len(current[2])
+            if batch_messages >= batch_size:
+                await flush()
+        current = rejected_thread_id = None
+        if kind == "thread":
+            thread_id = record.get("thread_id")
+            if not isinstance(thread_id, str) or not thread_id:
+                raise ValueError("Thread record without a thread_id.")
+            if username_from_session_id(thread_id) != username:
+                result["rejected"] += 1
+                rejected_thread_id = thread_id
+            else:
+                current = (thread_id, record.get("title"), [])
+    if current is not None:
+        batch.append(current)
+    await flush()
+
+    logger.info(
+        "Imported %s threads with %s messages for '%s' (%s skipped, %s rejected).",
+        result["threads"],
+        result["messages"],
+        username,
+        result["skipped"],
+        result["rejected"],
+    )
+    return result
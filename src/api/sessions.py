@@ -0,0 +1,22 @@
+import re
+from typing import Optional
+
+_UUID = r"[0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}"
+
+# Clients create session IDs as "{username}-{uuid4}".
+_SESSION_ID_PATTERN = re.compile(rf"^(?P<username>.+)-{_UUID}$")
+
+# The part of a session ID after "{username}-", as a Postgres regular expression.
+SESSION_UUID_REGEX = rf"^{_UUID}$"
+
+
+def username_from_session_id(session_id: str) -> Optional[str]:
+    """Extracts the username prefix of a session ID, if it has the usual format."""
+    match = _SESSION_ID_PATTERN.match(session_id)
+    return match.group("username") if match else None
+
+
+def session_id_prefix_pattern(username: str) -> str:
+    """A LIKE pattern matching the session IDs that start with "{username}-"."""
+    escaped = username.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}-%"
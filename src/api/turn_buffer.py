@@ -0,0 +1,472 @@
+import asyncio
+import hashlib
+import itertools
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Coroutine, Deque, List, Optional, Set, Tuple, Union
+
+from psycopg_pool import AsyncConnectionPool
+
+from src.config.settings import settings
+from src.monitoring.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+idempotent_turns = metrics.counter(
+    "idempotent_turns_total",
+    "Turn submissions with an idempotency key, by outcome "
+    "(started/resumed/conflict/expired).",
+)
+
+# (seq, type, data) of a buffered event; seqs start at 1 and have no gaps.
+BufferedEvent = Tuple[int, str, str]
+
+
+class IdempotencyKeyReused(Exception):
+    """The idempotency key was already used for a turn with another message."""
+
+
+class ResumePointExpired(Exception):
+    """The events following the client's Last-Event-ID are no longer buffered."""
+
+
+def message_hash(message: str) -> str:
+    return hashlib.sha256(message.encode()).hexdigest()
+
+
+@dataclass
+class _Turn:
+    message_hash: str
+    events: Deque[BufferedEvent]
+    next_seq: int = 1
+    done: bool = False
+    finished_at: float = 0.0
+    consumers: int = 0
+    detached_at: float = field(default_factory=time.monotonic)
+    # Replaced on every change, so waiters never miss one.
+    changed: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def notify(self):
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+class InMemoryTurnBuffer:
+    """
+    Keeps the last `max_events` events of turns submitted with an
+    idempotency key in process memory, so a client that lost its connection
+    can reconnect with Last-Event-ID and receive the rest of the turn
+    instead of starting it again. A turn keeps running while no client is
+    attached for up to `resume_grace_seconds`, and stays buffered for
+    `ttl_seconds` after it ends. Reconnects must reach the same process.
+    """
+
+    def __init__(
+        self,
+        max_events: int = 2000,
+        ttl_seconds: float = 300.0,
+        resume_grace_seconds: float = 30.0,
+        max_turns: int = 10000,
+    ):
+        self.max_events = max_events
+        self.ttl_seconds = ttl_seconds
+        self.resume_grace_seconds = resume_grace_seconds
+        self.max_turns = max_turns
+        self._turns: "OrderedDict[Tuple[str, str], _Turn]" = OrderedDict()
+        self._producers: Set[asyncio.Task] = set()
+
+    async def start(self, session_id: str, key: str, message_hash: str) -> bool:
+        """
+        Registers a turn under its idempotency key. Returns False if the turn
+        is already known, and raises IdempotencyKeyReused if it was for
+        another message.
+        """
+        self._expire()
+        turn = self._turns.get((session_id, key))
+        if turn is not None:
+            if turn.message_hash != message_hash:
+                raise IdempotencyKeyReused()
+            return False
+        self._turns[(session_id, key)] = _Turn(
+            message_hash, deque(maxlen=self.max_events)
+        )
+        return True
+
+    async def discard(self, session_id: str, key: str):
+        """Forgets a turn that was registered but never run."""
+        self._turns.pop((session_id, key), None)
+
+    def run(self, producer: Coroutine) -> asyncio.Task:
+        """Runs a turn's producer detached from the request that started it."""
+        task = asyncio.create_task(producer)
+        self._producers.add(task)
+        task.add_done_callback(self._producers.discard)
+        return task
+
+    async def append(self, session_id: str, key: str, event_type: str, data: str):
+        turn = self._turns[(session_id, key)]
+        seq = turn.next_seq
+        turn.next_seq += 1
+        turn.events.append((seq, event_type, data))
+        turn.notify()
+        return seq
+
+    async def finish(self, session_id: str, key: str):
+        turn = self._turns[(session_id, key)]
+        turn.done = True
+        turn.finished_at = time.monotonic()
+        turn.notify()
+
+    async def check_resumable(self, session_id: str, key: str, after: int):
+        """Raises ResumePointExpired if events after `after` were dropped."""
+        turn = self._turns.get((session_id, key))
+        if turn is None or (turn.events and turn.events[0][0] > after + 1):
+            raise ResumePointExpired()
+
+    async def events(
+        self, session_id: str, key: str, after: int = 0
+    ) -> AsyncIterator[BufferedEvent]:
+        """Yields the turn's events after `after`, following it until it ends."""
+        turn = self._turns.get((session_id, key))
+        if turn is None:
+            return
+        turn.consumers += 1
+        try:
+            while True:
+                changed = turn.changed
+                if turn.events and turn.events[0][0] > after + 1:
+                    # The client fell behind by more than the buffer holds.
+                    raise ResumePointExpired()
+                first = turn.events[0][0] if turn.events else 1
+                for event in itertools.islice(
+                    turn.events, max(after + 1 - first, 0), None
+                ):
+                    after = event[0]
+                    yield event
+                if turn.done and after >= turn.next_seq - 1:
+                    return
+                await changed.wait()
+        finally:
+            turn.consumers -= 1
+            if not turn.consumers:
+                turn.detached_at = time.monotonic()
+
+    async def abandoned(self, session_id: str, key: str) -> bool:
+        """Whether no client has been attached to the turn for the grace period."""
+        turn = self._turns.get((session_id, key))
+        return (
+            turn is not None
+            and not turn.consumers
+            and time.monotonic() - turn.detached_at > self.resume_grace_seconds
+        )
+
+    async def stop(self):
+        """Cancels the running producers, which commit their interrupted turns."""
+        for task in self._producers:
+            task.cancel()
+        await asyncio.gather(*self._producers, return_exceptions=True)
+
+    def _is_local(self, session_id: str, key: str) -> bool:
+        return (session_id, key) in self._turns
+
+    def _expire(self):
+        # Turns are kept in start order, so ended ones are dropped from the front.
+        now = time.monotonic()
+        while self._turns:
+            turn = next(iter(self._turns.values()))
+            if not turn.done:
+                break
+            if (
+                now - turn.finished_at < self.ttl_seconds
+                and len(self._turns) <= self.max_turns
+            ):
+                break
+            self._turns.popitem(last=False)
+
+
+class PostgresTurnBuffer(InMemoryTurnBuffer):
+    """
+    Also mirrors the buffers into unlogged Postgres tables, so reconnects
+    reaching another API process are served too. Events are written in the
+    background, in batches gathered over `flush_seconds`, so streaming a
+    turn does not wait on the database. Clients attached to the process
+    running the turn read from its memory; others poll the tables every
+    `poll_seconds` and count as attached while they do.
+    """
+
+    # Old rows are deleted at most this often.
+    CLEANUP_INTERVAL_SECONDS = 60.0
+
+    def __init__(
+        self,
+        pool: AsyncConnectionPool,
+        poll_seconds: float = 0.1,
+        flush_seconds: float = 0.05,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.pool = pool
+        self.poll_seconds = poll_seconds
+        self.flush_seconds = flush_seconds
+        self._cleaned_at = 0.0
+        # (session_id, key, seq, type, data) of events not yet written.
+        self._pending: List[Tuple[str, str, int, str, str]] = []
+        self._has_pending = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def start(self, session_id: str, key: str, message_hash: str) -> bool:
+        if self._is_local(session_id, key):
+            return await super().start(session_id, key, message_hash)
+        await self._cleanup()
+
+        insert_query = """
+                       insert into public.chat_turns (session_id, idempotency_key, message_hash)
+                       values (%(session_id)s, %(key)s, %(message_hash)s)
+                       on conflict (session_id, idempotency_key) do nothing; \
+                       """
+        select_query = """
+                       select message_hash
+                       from public.chat_turns
+                       where session_id = %(session_id)s
+                         and idempotency_key = %(key)s; \
+                       """
+        params = {"session_id": session_id, "key": key, "message_hash": message_hash}
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(insert_query, params)
+                if cur.rowcount == 1:
+                    return await super().start(session_id, key, message_hash)
+                await cur.execute(select_query, params)
+                row = await cur.fetchone()
+        if row is not None and row[0] != message_hash:
+            raise IdempotencyKeyReused()
+        return False
+
+    async def discard(self, session_id: str, key: str):
+        await super().discard(session_id, key)
+        query = """
+                delete
+                from public.chat_turns
+                where session_id = %(session_id)s
+                  and idempotency_key = %(key)s; \
+                """
+        async with self.pool.connection() as conn:
+            await conn.execute(query, {"session_id": session_id, "key": key})
+
+    async def append(self, session_id: str, key: str, event_type: str, data: str):
+        seq = await super().append(session_id, key, event_type, data)
+        self._pending.append((session_id, key, seq, event_type, data))
+        self._has_pending.set()
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_periodically())
+        return seq
+
+    async def finish(self, session_id: str, key: str):
+        await super().finish(session_id, key)
+        # The events go first, so readers that see "done" find all of them.
+        await self._flush()
+        query = """
+                update public.chat_turns
+                set done       = true,
+                    updated_at = now()
+                where session_id = %(session_id)s
+                  and idempotency_key = %(key)s; \
+                """
+        async with self.pool.connection() as conn:
+            await conn.execute(query, {"session_id": session_id, "key": key})
+
+    async def stop(self):
+        await super().stop()
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self._flush()
+
+    async def _flush_periodically(self):
+        while True:
+            await self._has_pending.wait()
+            await asyncio.sleep(self.flush_seconds)
+            self._has_pending.clear()
+            try:
+                await self._flush()
+            except Exception as e:
+                logger.error("Could not write buffered turn events: %s", e)
+
+    async def _flush(self):
+        """Writes the pending events, then trims turns past `max_events`."""
+        async with self._flush_lock:
+            events, self._pending = self._pending, []
+            if not events:
+                return
+            insert_query = """
+                           insert into public.chat_turn_events (session_id, idempotency_key, seq, type, data)
+                           values (%s, %s, %s, %s, %s); \
+                           """
+            touch_query = """
+                          update public.chat_turns turn
+                          set updated_at = now()
+                          from unnest(%(session_ids)s::text[], %(keys)s::text[]) as batch(session_id, idempotency_key)
+                          where turn.session_id = batch.session_id
+                            and turn.idempotency_key = batch.idempotency_key; \
+                          """
+            trim_query = """
+                         delete
+                         from public.chat_turn_events event
+                             using unnest(%(session_ids)s::text[], %(keys)s::text[], %(last_seqs)s::int[])
+                                 as batch(session_id, idempotency_key, last_seq)
+                         where event.session_id = batch.session_id
+                           and event.idempotency_key = batch.idempotency_key
+                           and event.seq <= batch.last_seq - %(max_events)s; \
+                         """
+            last_seqs = {}
+            for session_id, key, seq, _, _ in events:
+                last_seqs[(session_id, key)] = seq
+            trimmed = [turn for turn, seq in last_seqs.items() if seq > self.max_events]
+            async with self.pool.connection() as conn:
+                async with conn.cursor() as cur:
+                    await cur.executemany(insert_query, events)
+                    await cur.execute(
+                        touch_query,
+                        {
+                            "session_ids": [turn[0] for turn in last_seqs],
+                            "keys": [turn[1] for turn in last_seqs],
+                        },
+                    )
+                    if trimmed:
+                        await cur.execute(
+                            trim_query,
+                            {
+                                "session_ids": [turn[0] for turn in trimmed],
+                                "keys": [turn[1] for turn in trimmed],
+                                "last_seqs": [last_seqs[turn] for turn in trimmed],
+                                "max_events": self.max_events,
+                            },
+                        )
+
+    async def check_resumable(self, session_id: str, key: str, after: int):
+        if self._is_local(session_id, key):
+            return await super().check_resumable(session_id, key, after)
+        query = """
+                select min(event.seq)
+                from public.chat_turns turn
+                         left join public.chat_turn_events event
+                                   on event.session_id = turn.session_id
+                                       and event.idempotency_key = turn.idempotency_key
+                where turn.session_id = %(session_id)s
+                  and turn.idempotency_key = %(key)s
+                group by turn.session_id; \
+                """
+        async with self.pool.connection() as conn:
+            cur = await conn.execute(query, {"session_id": session_id, "key": key})
+            row = await cur.fetchone()
+        if row is None or (row[0] is not None and row[0] > after + 1):
+            raise ResumePointExpired()
+
+    async def events(
+        self, session_id: str, key: str, after: int = 0
+    ) -> AsyncIterator[BufferedEvent]:
+        if self._is_local(session_id, key):
+            async for event in super().events(session_id, key, after):
+                yield event
+            return
+
+        # Marks the client as attached, and reads the turn's state before its
+        # events, so that no event written before "done" is missed.
+        turn_query = """
+                     update public.chat_turns
+                     set consumer_seen_at = now()
+                     where session_id = %(session_id)s
+                       and idempotency_key = %(key)s
+                     returning done, extract(epoch from now() - updated_at)::float8; \
+                     """
+        events_query = """
+                       select seq, type, data
+                       from public.chat_turn_events
+                       where session_id = %(session_id)s
+                         and idempotency_key = %(key)s
+                         and seq > %(after)s
+                       order by seq; \
+                       """
+        params = {"session_id": session_id, "key": key, "after": after}
+        while True:
+            async with self.pool.connection() as conn:
+                cur = await conn.execute(turn_query, params)
+                turn = await cur.fetchone()
+                if turn is None:
+                    return
+                cur = await conn.execute(events_query, params)
+                rows = await cur.fetchall()
+            if rows and rows[0][0] > params["after"] + 1:
+                raise ResumePointExpired()
+            for row in rows:
+                params["after"] = row[0]
+                yield row
+            done, idle_seconds = turn
+            if done:
+                return
+            if idle_seconds > self.ttl_seconds:
+                # The process running the turn went away.
+                logger.warning(
+                    "Buffered turn '%s' of session '%s' stopped without ending.",
+                    key,
+                    session_id,
+                )
+                return
+            await asyncio.sleep(self.poll_seconds)
+
+    async def abandoned(self, session_id: str, key: str) -> bool:
+        if not await super().abandoned(session_id, key):
+            return False
+        query = """
+                select consumer_seen_at < now() - make_interval(secs => %(grace)s)
+                from public.chat_turns
+                where session_id = %(session_id)s
+                  and idempotency_key = %(key)s; \
+                """
+        params = {
+            "session_id": session_id,
+            "key": key,
+            "grace": self.resume_grace_seconds,
+        }
+        async with self.pool.connection() as conn:
+            cur = await conn.execute(query, params)
+            row = await cur.fetchone()
+        return row is None or row[0]
+
+    async def _cleanup(self):
+        now = time.monotonic()
+        if now - self._cleaned_at < self.CLEANUP_INTERVAL_SECONDS:
+            return
+        self._cleaned_at = now
+        query = """
+                with expired as (
+                    delete from public.chat_turns
+                        where updated_at < now() - make_interval(secs => %(ttl)s)
+                        returning session_id, idempotency_key)
+                delete
+                from public.chat_turn_events event
+                    using expired
+                where event.session_id = expired.session_id
+                  and event.idempotency_key = expired.idempotency_key; \
+                """
+        async with self.pool.connection() as conn:
+            await conn.execute(query, {"ttl": self.ttl_seconds})
+
+
+TurnBuffer = Union[InMemoryTurnBuffer, PostgresTurnBuffer]
+
+
+def create_turn_buffer(pool: AsyncConnectionPool) -> TurnBuffer:
+    """Builds the configured turn buffer."""
+    options = {
+        "max_events": settings.chat_turn_buffer_max_events,
+        "ttl_seconds": settings.chat_turn_buffer_ttl_seconds,
+        "resume_grace_seconds": settings.chat_turn_resume_grace_seconds,
+    }
+    if settings.chat_turn_buffer_backend == "postgres":
+        return PostgresTurnBuffer(pool, **options)
+    return InMemoryTurnBuffer(**options)
@@ -0,0 +1,221 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from psycopg.types.json import Jsonb
+
+from src.api.db import get_db_connection
+from src.api.sessions import username_from_session_id
+from src.config.settings import settings
+from src.monitoring.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+usage_records = metrics.counter(
+    "usage_records_total",
+    "Turn usage records, by outcome (written/dropped_full/dropped_error).",
+)
+
+
+@dataclass
+class TurnUsage:
+    """The compact accounting record of one agent turn."""
+
+    thread_id: str
+    username: Optional[str]
+    status: str
+    model: Optional[str]
+    input_tokens: int
+    output_tokens: int
+    total_tokens: int
+    model_calls: int
+    tool_calls: List[str]
+    node_durations_ms: Dict[str, int]
+    ttft_ms: Optional[int]
+    duration_ms: int
+
+
+@dataclass
+class TurnTracker:
+    """
+    Follows a turn through its astream_events (v2) stream: what it is doing,
+    for committing it if it is cancelled, and what it costs, for accounting.
+    """
+
+    stage: str = "start"
+    partial_text: List[str] = field(default_factory=list)
+    started: float = field(default_factory=time.perf_counter)
+    first_token_at: Optional[float] = None
+    model: Optional[str] = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+    total_tokens: int = 0
+    model_calls: int = 0
+    tool_calls: List[str] = field(default_factory=list)
+    node_durations: Dict[str, float] = field(default_factory=dict)
+    _node_starts: Dict[str, float] = field(default_factory=dict)
+
+    def observe(self, event: Dict[str, Any]):
+        kind = event["event"]
+        if kind == "on_chat_model_start":
+            self.stage = "model"
+            self.partial_text.clear()
+        elif kind == "on_chat_model_stream":
+            content = event["data"]["chunk"].content
+            if content:
+                if self.first_token_at is None:
+                    self.first_token_at = time.perf_counter()
+                if isinstance(content, str):
+                    self.partial_text.append(content)
+        elif kind == "on_chat_model_end":
+            self._observe_model_output(event)
+        elif kind == "on_tool_start":
+            self.stage = "tool"
+            self.partial_text.clear()
+            self.tool_calls.append(event["name"])
+        elif kind in ("on_chain_start", "on_chain_end"):
+            self._observe_node(event)
+
+    def usage(self, thread_id: str, status: str) -> TurnUsage:
+        return TurnUsage(
+            thread_id=thread_id,
+            username=username_from_session_id(thread_id),
+            status=status,
+            model=self.model or settings.llm_model,
+            input_tokens=self.input_tokens,
+            output_tokens=self.output_tokens,
+            total_tokens=self.total_tokens,
+            model_calls=self.model_calls,
+            tool_calls=self.tool_calls,
+            node_durations_ms={
+                node: round(seconds * 1000)
+                for node, seconds in self.node_durations.items()
+            },
+            ttft_ms=(
+                round((self.first_token_at - self.started) * 1000)
+                if self.first_token_at is not None
+                else None
+            ),
+            duration_ms=round((time.perf_counter() - self.started) * 1000),
+        )
+
+    def _observe_model_output(self, event: Dict[str, Any]):
+        self.model_calls += 1
+        output = event["data"].get("output")
+        usage_metadata = getattr(output, "usage_metadata", None)
+        if usage_metadata:
+            self.input_tokens += usage_metadata.get("input_tokens", 0)
+            self.output_tokens += usage_metadata.get("output_tokens", 0)
+            self.total_tokens += usage_metadata.get("total_tokens", 0)
+        response_metadata = getattr(output, "response_metadata", None) or {}
+        self.model = (
+            response_metadata.get("model_name")
+            or event.get("metadata", {}).get("ls_model_name")
+            or self.model
+        )
+
+    def _observe_node(self, event: Dict[str, Any]):
+        # Graph nodes are the chains named after the node they run in.
+        node = event.get("metadata", {}).get("langgraph_node")
+        if node is None or event["name"] != node:
+            return
+        if event["event"] == "on_chain_start":
+            self._node_starts[event["run_id"]] = time.perf_counter()
+            return
+        started = self._node_starts.pop(event["run_id"], None)
+        if started is not None:
+            self.node_durations[node] = (
+                self.node_durations.get(node, 0.0) + time.perf_counter() - started
+            )
+
+
+class UsageWriter:
+    """
+    Buffers turn usage records and inserts them in batches from a background
+    task, so accounting never adds a database round trip to a turn. Records
+    are dropped, and counted, when the buffer is full or a batch fails.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 100,
+        flush_interval_seconds: float = 2.0,
+        max_queue: int = 10_000,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, usage: TurnUsage):
+        try:
+            self._queue.put_nowait(usage)
+        except asyncio.QueueFull:
+            usage_records.inc(outcome="dropped_full")
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stops the writer after flushing the buffered records."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        batch = []
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        if batch:
+            await self._write(batch)
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = asyncio.get_running_loop().time() + self.flush_interval_seconds
+            try:
+                while len(batch) < self.batch_size:
+                    async with asyncio.timeout_at(deadline):
+                        batch.append(await self._queue.get())
+            except TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                await self._write(batch)
+                raise
+            await self._write(batch)
+
+    async def _write(self, batch: List[TurnUsage]):
+        query = """
+                insert into public.turn_usage (thread_id, username, status, model,
+                                               input_tokens, output_tokens, total_tokens,
+                                               model_calls, tool_calls, node_durations_ms,
+                                               ttft_ms, duration_ms)
+                values (%(thread_id)s, %(username)s, %(status)s, %(model)s,
+                        %(input_tokens)s, %(output_tokens)s, %(total_tokens)s,
+                        %(model_calls)s, %(tool_calls)s, %(node_durations_ms)s,
+                        %(ttft_ms)s, %(duration_ms)s); \
+                """
+        params = [
+            {**usage.__dict__, "node_durations_ms": Jsonb(usage.node_durations_ms)}
+            for usage in batch
+        ]
+        try:
+            async with get_db_connection() as conn:
+                async with conn.cursor() as cur:
+                    await cur.executemany(query, params)
+            usage_records.inc(len(batch), outcome="written")
+        except Exception as e:
+            usage_records.inc(len(batch), outcome="dropped_error")
+            logger.error("Failed to write %s turn usage records: %s", len(batch), e)
+
+
+def create_usage_writer() -> Optional[UsageWriter]:
+    """Builds the configured usage writer, or None if accounting is disabled."""
+    if not settings.usage_accounting_enabled:
+        return None
+    return UsageWriter(
+        batch_size=settings.usage_writer_batch_size,
+        flush_interval_seconds=settings.usage_writer_flush_seconds,
+        max_queue=settings.usage_writer_max_queue,
+    )
@@ -1,10 +1,149 @@
+import atexit
 import logging
+import queue
+import random
 import sys
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+import orjson
+
+from src.config.settings import settings
+from src.monitoring.metrics import metrics
+
+# Set per request and per chat turn; every record logged within carries them.
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+session_id_var: ContextVar[Optional[str]] = ContextVar("session_id", default=None)
+
+dropped_log_records = metrics.counter(
+    "log_records_dropped_total", "Log records dropped because the log queue was full."
+)
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Attributes every LogRecord has; anything else was passed with `extra=`.
+_RECORD_ATTRIBUTES = frozenset(
+    logging.LogRecord("", 0, "", 0, "", (), None).__dict__
+) | {"message", "asctime", "request_id", "session_id", "color_message"}
+
+_listener: Optional[QueueListener] = None
+
+
+class ContextFilter(logging.Filter):
+    """
+    Stamps records with the request and session IDs of the current context,
+    and keeps only a sample of DEBUG records. Records of a sampled request
+    are kept or dropped together, so a kept request can be followed through.
+    """
+
+    def __init__(self, debug_sample_rate: float = 1.0):
+        super().__init__()
+        self.debug_sample_rate = debug_sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        record.session_id = session_id_var.get()
+        if record.levelno > logging.DEBUG or self.debug_sample_rate >= 1.0:
+            return True
+        if record.request_id is None:
+            return random.random() < self.debug_sample_rate
+        bucket = zlib.crc32(record.request_id.encode()) / 0xFFFFFFFF
+        return bucket < self.debug_sample_rate
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        if getattr(record, "session_id", None):
+            entry["session_id"] = record.session_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return orjson.dumps(entry, default=str).decode()
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread without blocking the caller. Only
+    the message is interpolated here, since its arguments may change after
+    the call; timestamps, tracebacks, JSON and the write happen on the
+    listener thread. Records are dropped and counted if the queue is full.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            dropped_log_records.inc()
+
+
+class _DrainingQueueListener(QueueListener):
+    """Waits for room in a full queue on stop, so queued records are written out."""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
 
 
 def setup_logging():
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        stream=sys.stdout,
-    )
+    """
+    Routes all logging through a bounded queue to a background thread that
+    formats and writes to stdout, so logging never blocks the event loop.
+    Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    handler = logging.StreamHandler(sys.stdout)
+    if settings.log_format == "json":
+        handler.setFormatter(JSONFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    queue_handler = _NonBlockingQueueHandler(queue.Queue(settings.log_queue_size))
+    queue_handler.addFilter(ContextFilter(settings.log_debug_sample_rate))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(queue_handler)
+    root.setLevel(settings.log_level.upper())
+    # Uvicorn writes its own logs directly to the console unless routed here.
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        logging.getLogger(name).handlers.clear()
+        logging.getLogger(name).propagate = True
+
+    _listener = _DrainingQueueListener(queue_handler.queue, handler)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Writes out queued records and stops the background thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
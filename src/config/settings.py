@@ -1,3 +1,5 @@
+from typing import Dict, Literal, Optional
+
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -38,6 +40,15 @@ class Settings(BaseSettings):
             f"{self.db_host}:{self.db_port}/{self.db_name}"
         )
 
+    # --- Database Migrations ---
+    run_migrations_on_startup: bool = Field(True, alias="RUN_MIGRATIONS_ON_STARTUP")
+    migration_lock_mode: Literal["wait", "skip"] = Field(
+        "wait", alias="MIGRATION_LOCK_MODE"
+    )
+    migration_lock_timeout_seconds: float = Field(
+        300.0, alias="MIGRATION_LOCK_TIMEOUT_SECONDS"
+    )
+
     # --- API Keys ---
     google_api_key: str = Field(..., alias="GOOGLE_API_KEY")
     tavily_api_key: str = Field(..., alias="TAVILY_API_KEY")
@@ -52,9 +63,31 @@ class Settings(BaseSettings):
     # --- Server Configuration ---
     mcp_ws_server_name: str = Field("py_api_mcp", alias="MCP_WS_SERVER_NAME")
     mcp_ws_port: int = Field(8001, alias="MCP_WS_PORT")
+    mcp_host: str = Field("127.0.0.1", alias="MCP_HOST")
+    mcp_stateless_http: bool = Field(False, alias="MCP_STATELESS_HTTP")
+    mcp_workers: int = Field(1, alias="MCP_WORKERS")
+    mcp_limit_concurrency: Optional[int] = Field(None, alias="MCP_LIMIT_CONCURRENCY")
     api_port: int = Field(8000, alias="API_PORT")
     api_host: str = Field("http://localhost", alias="API_HOST")
 
+    # --- Weather Tool Configuration ---
+    weather_api_timeout_seconds: float = Field(5.0, alias="WEATHER_API_TIMEOUT_SECONDS")
+    weather_api_max_connections: int = Field(50, alias="WEATHER_API_MAX_CONNECTIONS")
+    weather_batch_concurrency: int = Field(4, alias="WEATHER_BATCH_CONCURRENCY")
+    weather_batch_max_cities: int = Field(10, alias="WEATHER_BATCH_MAX_CITIES")
+
+    # --- Tool Server Resilience ---
+    tool_call_timeout_seconds: float = Field(20.0, alias="TOOL_CALL_TIMEOUT_SECONDS")
+    tool_breaker_failure_threshold: int = Field(
+        3, alias="TOOL_BREAKER_FAILURE_THRESHOLD"
+    )
+    tool_breaker_recovery_seconds: float = Field(
+        30.0, alias="TOOL_BREAKER_RECOVERY_SECONDS"
+    )
+    tool_catalog_refresh_seconds: float = Field(
+        60.0, alias="TOOL_CATALOG_REFRESH_SECONDS"
+    )
+
     # --- Model Configuration ---
     llm_model: str = Field("gemini-2.5-flash", alias="LLM_MODEL")
     llm_temperature: float = Field(0.0, alias="LLM_TEMPERATURE")
@@ -66,9 +99,166 @@ class Settings(BaseSettings):
         0.0, alias="TITLE_DETERMINATOR_LLM_TEMPERATURE"
     )
 
+    model_warmup_on_startup: bool = Field(False, alias="MODEL_WARMUP_ON_STARTUP")
+    model_warmup_timeout_seconds: float = Field(
+        10.0, alias="MODEL_WARMUP_TIMEOUT_SECONDS"
+    )
+    model_max_concurrency: int = Field(0, alias="MODEL_MAX_CONCURRENCY")
+    model_concurrency_limits: Dict[str, int] = Field(
+        default_factory=dict, alias="MODEL_CONCURRENCY_LIMITS"
+    )
+
+    # --- Chat Streaming ---
+    chat_disconnect_poll_seconds: float = Field(
+        0.5, alias="CHAT_DISCONNECT_POLL_SECONDS"
+    )
+    chat_stream_queue_size: int = Field(64, alias="CHAT_STREAM_QUEUE_SIZE")
+    chat_ws_max_active_turns: int = Field(8, alias="CHAT_WS_MAX_ACTIVE_TURNS")
+    chat_ws_send_queue_size: int = Field(256, alias="CHAT_WS_SEND_QUEUE_SIZE")
+    chat_turn_buffer_backend: Literal["memory", "postgres"] = Field(
+        "memory", alias="CHAT_TURN_BUFFER_BACKEND"
+    )
+    chat_turn_buffer_max_events: int = Field(2000, alias="CHAT_TURN_BUFFER_MAX_EVENTS")
+    chat_turn_buffer_ttl_seconds: float = Field(
+        300.0, alias="CHAT_TURN_BUFFER_TTL_SECONDS"
+    )
+    chat_turn_resume_grace_seconds: float = Field(
+        30.0, alias="CHAT_TURN_RESUME_GRACE_SECONDS"
+    )
+
+    # --- Response Compression ---
+    compression_enabled: bool = Field(True, alias="COMPRESSION_ENABLED")
+    compression_minimum_size: int = Field(1024, alias="COMPRESSION_MINIMUM_SIZE")
+    compression_level: int = Field(6, alias="COMPRESSION_LEVEL")
+    compression_streams: bool = Field(True, alias="COMPRESSION_STREAMS")
+
+    # --- Rate Limiting ---
+    rate_limit_enabled: bool = Field(True, alias="RATE_LIMIT_ENABLED")
+    rate_limit_backend: Literal["memory", "postgres"] = Field(
+        "memory", alias="RATE_LIMIT_BACKEND"
+    )
+    rate_limit_tiers: Dict[str, Dict[str, float]] = Field(
+        default_factory=lambda: {
+            "default": {
+                "requests_per_minute": 20,
+                "request_burst": 10,
+                "tokens_per_minute": 60000,
+                "token_burst": 200000,
+            }
+        },
+        alias="RATE_LIMIT_TIERS",
+    )
+    rate_limit_default_tier: str = Field("default", alias="RATE_LIMIT_DEFAULT_TIER")
+    rate_limit_user_tiers: Dict[str, str] = Field(
+        default_factory=dict, alias="RATE_LIMIT_USER_TIERS"
+    )
+
+    # --- Usage Accounting ---
+    usage_accounting_enabled: bool = Field(True, alias="USAGE_ACCOUNTING_ENABLED")
+    usage_writer_batch_size: int = Field(100, alias="USAGE_WRITER_BATCH_SIZE")
+    usage_writer_flush_seconds: float = Field(2.0, alias="USAGE_WRITER_FLUSH_SECONDS")
+    usage_writer_max_queue: int = Field(10000, alias="USAGE_WRITER_MAX_QUEUE")
+
+    # --- Admin API ---
+    admin_api_token: Optional[str] = Field(None, alias="ADMIN_API_TOKEN")
+
+    # --- Job Queue ---
+    job_worker_in_process: bool = Field(True, alias="JOB_WORKER_IN_PROCESS")
+    job_worker_concurrency: int = Field(2, alias="JOB_WORKER_CONCURRENCY")
+    job_poll_interval_seconds: float = Field(5.0, alias="JOB_POLL_INTERVAL_SECONDS")
+    job_max_attempts: int = Field(5, alias="JOB_MAX_ATTEMPTS")
+    job_timeout_seconds: float = Field(120.0, alias="JOB_TIMEOUT_SECONDS")
+    job_retry_base_seconds: float = Field(2.0, alias="JOB_RETRY_BASE_SECONDS")
+    job_retry_max_seconds: float = Field(300.0, alias="JOB_RETRY_MAX_SECONDS")
+    job_stale_after_seconds: float = Field(120.0, alias="JOB_STALE_AFTER_SECONDS")
+    job_maintenance_interval_seconds: float = Field(
+        15.0, alias="JOB_MAINTENANCE_INTERVAL_SECONDS"
+    )
+    job_shutdown_timeout_seconds: float = Field(
+        10.0, alias="JOB_SHUTDOWN_TIMEOUT_SECONDS"
+    )
+
+    # --- Conversation Memory ---
+    memory_embedder: Literal["hashing", "google"] = Field(
+        "hashing", alias="MEMORY_EMBEDDER"
+    )
+    memory_embedding_dimensions: int = Field(512, alias="MEMORY_EMBEDDING_DIMENSIONS")
+    memory_embedding_model: str = Field(
+        "models/text-embedding-004", alias="MEMORY_EMBEDDING_MODEL"
+    )
+    memory_top_k: int = Field(4, alias="MEMORY_TOP_K")
+    memory_min_score: float = Field(0.2, alias="MEMORY_MIN_SCORE")
+    memory_token_budget: int = Field(400, alias="MEMORY_TOKEN_BUDGET")
+    memory_min_turn_chars: int = Field(80, alias="MEMORY_MIN_TURN_CHARS")
+    memory_cached_users: int = Field(1000, alias="MEMORY_CACHED_USERS")
+
+    # --- Logging ---
+    log_level: str = Field("INFO", alias="LOG_LEVEL")
+    log_format: Literal["text", "json"] = Field("text", alias="LOG_FORMAT")
+    log_queue_size: int = Field(10000, alias="LOG_QUEUE_SIZE")
+    log_debug_sample_rate: float = Field(1.0, alias="LOG_DEBUG_SAMPLE_RATE")
+
+    # --- Event Loop Monitor ---
+    loop_monitor_enabled: bool = Field(True, alias="LOOP_MONITOR_ENABLED")
+    loop_monitor_interval_seconds: float = Field(
+        0.1, alias="LOOP_MONITOR_INTERVAL_SECONDS"
+    )
+    loop_stall_threshold_seconds: float = Field(
+        0.25, alias="LOOP_STALL_THRESHOLD_SECONDS"
+    )
+
+    # --- Tracing ---
+    tracing_exporter: Literal["none", "jsonl", "otlp"] = Field(
+        "none", alias="TRACING_EXPORTER"
+    )
+    tracing_file: str = Field("traces.jsonl", alias="TRACING_FILE")
+    tracing_otlp_endpoint: str = Field(
+        "http://localhost:4318/v1/traces", alias="TRACING_OTLP_ENDPOINT"
+    )
+    tracing_sample_rate: float = Field(1.0, alias="TRACING_SAMPLE_RATE")
+    tracing_queue_size: int = Field(2048, alias="TRACING_QUEUE_SIZE")
+
+    # --- Thread Archive ---
+    thread_archive_idle_days: float = Field(30.0, alias="THREAD_ARCHIVE_IDLE_DAYS")
+    thread_archive_batch_size: int = Field(100, alias="THREAD_ARCHIVE_BATCH_SIZE")
+    thread_archive_interval_seconds: float = Field(
+        3600.0, alias="THREAD_ARCHIVE_INTERVAL_SECONDS"
+    )
+
+    # --- Read Replica ---
+    db_replica_dsn: Optional[str] = Field(None, alias="DB_REPLICA_DSN")
+    db_replica_read_your_writes_seconds: float = Field(
+        5.0, alias="DB_REPLICA_READ_YOUR_WRITES_SECONDS"
+    )
+    db_replica_lag_check_seconds: float = Field(
+        1.0, alias="DB_REPLICA_LAG_CHECK_SECONDS"
+    )
+
+    # --- Conversation Import ---
+    conversation_import_batch_size: int = Field(
+        500, alias="CONVERSATION_IMPORT_BATCH_SIZE"
+    )
+    conversation_import_concurrency: int = Field(
+        4, alias="CONVERSATION_IMPORT_CONCURRENCY"
+    )
+
+    # --- Agent Loop Limits ---
+    agent_max_tool_calls: int = Field(8, alias="AGENT_MAX_TOOL_CALLS")
+    agent_max_model_calls: int = Field(10, alias="AGENT_MAX_MODEL_CALLS")
+    agent_max_turn_tokens: int = Field(100000, alias="AGENT_MAX_TURN_TOKENS")
+    agent_max_turn_seconds: float = Field(120.0, alias="AGENT_MAX_TURN_SECONDS")
+
+    # --- Record/Replay Configuration ---
+    replay_mode: Literal["off", "record", "replay"] = Field("off", alias="REPLAY_MODE")
+    replay_cassette_dir: str = Field(".cassettes", alias="REPLAY_CASSETTE_DIR")
+    replay_timing: float = Field(1.0, alias="REPLAY_TIMING")
+
     # --- Feature Flags ---
     enable_mcp_tools: bool = Field(True, alias="ENABLE_MCP_TOOLS")
     enable_search_tools: bool = Field(True, alias="ENABLE_SEARCH_TOOLS")
+    enable_tool_prefetch: bool = Field(False, alias="ENABLE_TOOL_PREFETCH")
+    enable_conversation_memory: bool = Field(False, alias="ENABLE_CONVERSATION_MEMORY")
+    enable_thread_archive: bool = Field(False, alias="ENABLE_THREAD_ARCHIVE")
 
 
 settings = Settings()
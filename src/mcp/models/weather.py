@@ -44,3 +44,10 @@ class Weather(BaseModel):
 
     location: Optional[Location] = None
     current: Optional[CurrentWeather] = None
+
+
+class CityWeather(BaseModel):
+    """Result for a single city of a batch weather request."""
+
+    weather: Optional[Weather] = None
+    error: Optional[str] = None
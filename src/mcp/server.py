@@ -1,30 +1,124 @@
 import logging
+from contextlib import asynccontextmanager
+from typing import Dict, List
+
+import uvicorn
 from fastmcp import FastMCP
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Mount
 
 from src.config.settings import settings
-from src.mcp.models.weather import Weather
+from src.mcp.models.weather import CityWeather, Weather
 from src.mcp.services.weather_service import WeatherService
+from src.monitoring.tracing import TracingMiddleware, setup_tracing
 
 logger = logging.getLogger(__name__)
 mcp = FastMCP(name="py_api_mcp")
 weather_service = WeatherService()
 
 
+# Output schemas are disabled: the MCP SDK re-validates every structured result
+# against them with jsonschema, which dominates per-call CPU, and the agent's
+# MCP adapter only reads the text content anyway.
 @mcp.tool(
-    name="get_current_weather", description="Get the current weather in a given city"
+    name="get_current_weather",
+    description="Get the current weather in a given city",
+    output_schema=None,
 )
 async def get_weather(city: str) -> Weather:
     """Get current weather for a city."""
     try:
         return await weather_service.get_current_weather(city)
     except Exception as e:
-        logger.error(f"Error getting weather data: {str(e)}")
+        logger.error("Error getting weather data: %s", e)
         raise
 
 
+@mcp.tool(
+    name="get_current_weather_batch",
+    description=(
+        "Get the current weather for several cities in a single call. "
+        "Use this instead of calling get_current_weather repeatedly whenever a "
+        "question involves two or more cities, such as comparisons. Results are "
+        "keyed by city; a city that could not be looked up has an 'error' "
+        "instead of 'weather'."
+    ),
+    output_schema=None,
+)
+async def get_weather_batch(cities: List[str]) -> Dict[str, CityWeather]:
+    """Get current weather for several cities concurrently."""
+    try:
+        return await weather_service.get_current_weather_batch(cities)
+    except Exception as e:
+        logger.error("Error getting batch weather data: %s", e)
+        raise
+
+
+@mcp.custom_route("/health", methods=["GET"], include_in_schema=False)
+async def health_check(request: Request) -> JSONResponse:
+    """Liveness probe: the worker process is up and serving requests."""
+    return JSONResponse({"status": "healthy"})
+
+
+@mcp.custom_route("/ready", methods=["GET"], include_in_schema=False)
+async def readiness_check(request: Request) -> JSONResponse:
+    """
+    Readiness probe: the worker's shared upstream client is open. Upstream
+    reachability is not checked, so an upstream outage does not take every
+    worker out of rotation.
+    """
+    if not weather_service.is_ready:
+        return JSONResponse({"status": "starting"}, status_code=503)
+    return JSONResponse(
+        {"status": "ready", "stateless_http": settings.mcp_stateless_http}
+    )
+
+
+def create_http_app() -> Starlette:
+    """
+    Builds the ASGI app served by each worker process. In stateless mode every
+    request is self-contained, so any worker behind a load balancer can serve it.
+    """
+    mcp_app = mcp.http_app(path="/mcp", stateless_http=settings.mcp_stateless_http)
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        setup_tracing("py-ai-mcp")
+        await weather_service.start()
+        try:
+            async with mcp_app.lifespan(app):
+                yield
+        finally:
+            await weather_service.close()
+
+    return Starlette(
+        routes=[Mount("/", app=mcp_app)],
+        middleware=[Middleware(TracingMiddleware)],
+        lifespan=lifespan,
+    )
+
+
 def run_mcp_server():
-    """Run the MCP server."""
-    mcp.run(transport="streamable-http", port=settings.mcp_ws_port)
+    """Run the MCP server, optionally as several stateless worker processes."""
+    workers = settings.mcp_workers
+    if workers > 1 and not settings.mcp_stateless_http:
+        logger.warning(
+            "MCP_WORKERS > 1 requires MCP_STATELESS_HTTP=true because MCP sessions "
+            "are pinned to one process. Falling back to a single worker."
+        )
+        workers = 1
+
+    uvicorn.run(
+        "src.mcp.server:create_http_app",
+        factory=True,
+        host=settings.mcp_host,
+        port=settings.mcp_ws_port,
+        workers=workers,
+        limit_concurrency=settings.mcp_limit_concurrency,
+    )
 
 
 if __name__ == "__main__":
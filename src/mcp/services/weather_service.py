@@ -1,7 +1,12 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
 import httpx
 
 from src.config.settings import settings
-from src.mcp.models.weather import Weather
+from src.mcp.models.weather import CityWeather, Weather
+from src.monitoring.tracing import CLIENT, tracer
 
 
 class WeatherService:
@@ -10,13 +15,105 @@ class WeatherService:
     def __init__(self):
         self.base_url = settings.weather_api_base_url
         self.api_key = settings.weather_api_key
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def is_ready(self) -> bool:
+        """Whether the shared upstream client is open."""
+        return self._client is not None and not self._client.is_closed
+
+    async def start(self):
+        """Opens the shared upstream client used for the lifetime of the server."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=settings.weather_api_timeout_seconds,
+                limits=httpx.Limits(
+                    max_connections=settings.weather_api_max_connections,
+                    max_keepalive_connections=settings.weather_api_max_connections,
+                ),
+            )
+
+    async def close(self):
+        """Closes the shared upstream client."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     async def get_current_weather(self, city: str) -> Weather:
         """Fetch current weather for a city."""
-        async with httpx.AsyncClient() as client:
+        async with self._client_scope() as client:
+            return await self._fetch_current_weather(client, city)
+
+    async def get_current_weather_batch(
+        self, cities: List[str]
+    ) -> Dict[str, CityWeather]:
+        """
+        Fetch current weather for several cities concurrently over one client.
+        Failures are reported per city instead of failing the whole batch.
+        """
+        unique_cities = list(dict.fromkeys(c.strip() for c in cities if c.strip()))
+        if len(unique_cities) > settings.weather_batch_max_cities:
+            raise ValueError(
+                f"At most {settings.weather_batch_max_cities} cities can be "
+                f"requested at once, got {len(unique_cities)}."
+            )
+
+        semaphore = asyncio.Semaphore(settings.weather_batch_concurrency)
+
+        async def fetch(client: httpx.AsyncClient, city: str) -> CityWeather:
+            async with semaphore:
+                try:
+                    weather = await self._fetch_current_weather(client, city)
+                    return CityWeather(weather=weather)
+                except Exception as e:
+                    return CityWeather(error=self._describe_error(e))
+
+        async with self._client_scope() as client:
+            results = await asyncio.gather(
+                *(fetch(client, city) for city in unique_cities)
+            )
+        return dict(zip(unique_cities, results))
+
+    @asynccontextmanager
+    async def _client_scope(self) -> AsyncIterator[httpx.AsyncClient]:
+        """
+        Yields the shared client when the service was started, otherwise a
+        short-lived client for this call only.
+        """
+        if self.is_ready:
+            yield self._client
+        else:
+            async with httpx.AsyncClient(
+                timeout=settings.weather_api_timeout_seconds
+            ) as client:
+                yield client
+
+    async def _fetch_current_weather(
+        self, client: httpx.AsyncClient, city: str
+    ) -> Weather:
+        """Fetch current weather for a city using the given client."""
+        with tracer.span("weather_api.current", kind=CLIENT, city=city) as span:
             response = await client.get(
-                f"{self.base_url}/current.json", params={"q": city, "key": self.api_key}
+                f"{self.base_url}/current.json",
+                params={"q": city, "key": self.api_key},
             )
-            response.raise_for_status()
-            data = response.json()
-            return Weather(**data)
+            span.set_attribute("http.status_code", response.status_code)
+        # Raised outside the span: the error message has the URL with the API key.
+        response.raise_for_status()
+        data = response.json()
+        return Weather(**data)
+
+    @staticmethod
+    def _describe_error(error: Exception) -> str:
+        """
+        Describes a failed lookup without echoing the request URL,
+        which carries the API key.
+        """
+        if isinstance(error, httpx.HTTPStatusError):
+            try:
+                return error.response.json()["error"]["message"]
+            except Exception:
+                return f"Weather API returned HTTP {error.response.status_code}"
+        if isinstance(error, httpx.HTTPError):
+            return f"Weather API request failed: {type(error).__name__}"
+        return str(error)
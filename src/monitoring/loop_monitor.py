@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+from src.monitoring.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+event_loop_lag = metrics.histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop ran a timer, sampled every monitor interval.",
+)
+event_loop_stalls = metrics.counter(
+    "event_loop_stalls_total", "Times the event loop was blocked past the threshold."
+)
+
+
+class LoopMonitor:
+    """
+    Measures event loop lag with a timer that should fire every `interval`
+    seconds. A watchdog thread checks that the timer keeps firing; once the
+    loop has been blocked for `stall_threshold` seconds, it captures the
+    stack of the loop's thread, which shows the callback that blocks it.
+    The stall is logged with that stack when the loop is running again.
+    """
+
+    def __init__(
+        self,
+        interval_seconds: float = 0.1,
+        stall_threshold_seconds: float = 0.25,
+        history: int = 20,
+    ):
+        self.interval_seconds = interval_seconds
+        self.stall_threshold_seconds = stall_threshold_seconds
+        self.stalls: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._loop_thread_id = 0
+        self._heartbeat = 0.0
+        self._stack: Optional[List[str]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self):
+        """Starts monitoring the running event loop."""
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stack = None
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._measure())
+        self._thread = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._thread.start()
+        logger.info(
+            "Event loop monitor started (stall threshold %ss).",
+            self.stall_threshold_seconds,
+        )
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._stopped.set()
+        await asyncio.to_thread(self._thread.join)
+        self._thread = None
+        logger.info("Event loop monitor stopped.")
+
+    def status(self) -> Dict[str, Any]:
+        """Current settings, lag percentiles and the most recent stalls."""
+        return {
+            "enabled": self.running,
+            "interval_seconds": self.interval_seconds,
+            "stall_threshold_seconds": self.stall_threshold_seconds,
+            "lag_seconds": {
+                "p50": event_loop_lag.percentile(0.50),
+                "p95": event_loop_lag.percentile(0.95),
+                "p99": event_loop_lag.percentile(0.99),
+            },
+            "stalls": list(self.stalls),
+        }
+
+    async def _measure(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time() + self.interval_seconds
+            await asyncio.sleep(self.interval_seconds)
+            lag = max(loop.time() - scheduled, 0.0)
+            self._heartbeat = time.monotonic()
+            event_loop_lag.observe(lag)
+            if lag >= self.stall_threshold_seconds:
+                self._record_stall(lag)
+
+    def _record_stall(self, lag: float):
+        # Captured by the watchdog while the loop was blocked, if it got to run.
+        stack, self._stack = self._stack, None
+        event_loop_stalls.inc()
+        self.stalls.append(
+            {
+                "at": datetime.now(timezone.utc).isoformat(),
+                "lag_seconds": round(lag, 4),
+                "stack": stack,
+            }
+        )
+        logger.warning(
+            "Event loop was blocked for %.3fs.%s",
+            lag,
+            "\n" + "".join(stack) if stack else " No stack was captured.",
+        )
+
+    def _watch(self):
+        captured_for = None
+        while not self._stopped.wait(self.interval_seconds):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self.interval_seconds
+            if blocked < self.stall_threshold_seconds or captured_for == heartbeat:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is not None:
+                stack = traceback.format_stack(frame)
+                # Dropped if the loop recorded the stall meanwhile.
+                if self._heartbeat == heartbeat:
+                    self._stack = stack
+            captured_for = heartbeat
@@ -0,0 +1,143 @@
+import math
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+class Counter:
+    """A monotonically increasing value per label set."""
+
+    type = "counter"
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any):
+        key = _label_key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def series(self) -> List[Dict[str, Any]]:
+        return [
+            {"labels": dict(key), "value": value}
+            for key, value in list(self._values.items())
+        ]
+
+
+class Gauge(Counter):
+    """A value per label set that can go up and down."""
+
+    type = "gauge"
+
+    def set(self, value: float, **labels: Any):
+        self._values[_label_key(labels)] = value
+
+    def dec(self, amount: float = 1.0, **labels: Any):
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    """
+    Count, sum and percentiles of observed values per label set. Percentiles
+    are computed from a bounded window of the most recent observations.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name: str, description: str, window: int = 2048):
+        self.name = name
+        self.description = description
+        self.window = window
+        self._series: Dict[LabelKey, Dict[str, Any]] = {}
+
+    def observe(self, value: float, **labels: Any):
+        key = _label_key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = {"count": 0, "sum": 0.0, "recent": deque(maxlen=self.window)}
+            self._series[key] = series
+        series["count"] += 1
+        series["sum"] += value
+        series["recent"].append(value)
+
+    def percentile(self, quantile: float, **labels: Any) -> float:
+        series = self._series.get(_label_key(labels))
+        return _percentile(series["recent"], quantile) if series else 0.0
+
+    def series(self) -> List[Dict[str, Any]]:
+        result = []
+        for key, series in list(self._series.items()):
+            recent: Deque[float] = series["recent"]
+            result.append(
+                {
+                    "labels": dict(key),
+                    "count": series["count"],
+                    "sum": series["sum"],
+                    "p50": _percentile(recent, 0.50),
+                    "p95": _percentile(recent, 0.95),
+                    "p99": _percentile(recent, 0.99),
+                    "max": max(recent) if recent else 0.0,
+                }
+            )
+        return result
+
+
+def _percentile(values: Deque[float], quantile: float) -> float:
+    if not values:
+        return 0.0
+    # Nearest-rank: the smallest value with at least `quantile` of values at or
+    # below it.
+    ordered = sorted(values)
+    rank = math.ceil(quantile * len(ordered))
+    return ordered[min(len(ordered) - 1, max(rank - 1, 0))]
+
+
+class MetricsRegistry:
+    """In-process registry of named metrics, exposed by the API's /metrics route."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, description: str = "") -> Counter:
+        return self._get_or_create(Counter, name, description)
+
+    def gauge(self, name: str, description: str = "") -> Gauge:
+        return self._get_or_create(Gauge, name, description)
+
+    def histogram(self, name: str, description: str = "") -> Histogram:
+        return self._get_or_create(Histogram, name, description)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns all metrics and their current series as plain data."""
+        return {
+            name: {
+                "type": metric.type,
+                "description": metric.description,
+                "series": metric.series(),
+            }
+            for name, metric in sorted(self._metrics.items())
+        }
+
+    def _get_or_create(self, metric_type, name: str, description: str):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = metric_type(name, description)
+                self._metrics[name] = metric
+            elif type(metric) is not metric_type:
+                raise ValueError(f"Metric '{name}' is already a {metric.type}.")
+            return metric
+
+
+metrics = MetricsRegistry()
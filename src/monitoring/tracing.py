@@ -0,0 +1,404 @@
+import atexit
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+import orjson
+
+from src.config.settings import settings
+from src.monitoring.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+dropped_spans = metrics.counter(
+    "trace_spans_dropped_total", "Spans dropped because the export queue was full."
+)
+
+TRACEPARENT_HEADER = "traceparent"
+_TRACEPARENT = re.compile(r"00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})")
+
+# OTLP span kinds.
+INTERNAL = 1
+SERVER = 2
+CLIENT = 3
+PRODUCER = 4
+CONSUMER = 5
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+@dataclass(frozen=True)
+class SpanContext:
+    """Identifies a span across process boundaries (W3C trace context)."""
+
+    trace_id: str
+    span_id: str
+    sampled: bool = True
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+def extract(traceparent: Optional[str]) -> Optional[SpanContext]:
+    """Parses a traceparent header value, or returns None if it is missing or invalid."""
+    match = _TRACEPARENT.fullmatch(traceparent.strip().lower()) if traceparent else None
+    if not match:
+        return None
+    trace_id, span_id, flags = match.groups()
+    return SpanContext(trace_id, span_id, sampled=bool(int(flags, 16) & 1))
+
+
+def current_traceparent() -> Optional[str]:
+    """The traceparent header value continuing the current span, if any."""
+    span = _current_span.get()
+    return span.context.traceparent if span else None
+
+
+async def inject_traceparent(request: httpx.Request):
+    """httpx request hook that continues the current trace in the called service."""
+    traceparent = current_traceparent()
+    if traceparent:
+        request.headers[TRACEPARENT_HEADER] = traceparent
+
+
+class Span:
+    """A timed operation within a trace. Only sampled spans are exported."""
+
+    def __init__(
+        self,
+        name: str,
+        context: SpanContext,
+        parent_id: Optional[str],
+        kind: int,
+        attributes: Dict[str, Any],
+    ):
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        if value is not None:
+            self.attributes[key] = value
+
+    def record_exception(self, error: BaseException):
+        self.error = f"{type(error).__name__}: {error}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NonRecordingSpan(Span):
+    """Stands in for spans while tracing is off, so callers need no checks."""
+
+    def __init__(self):
+        super().__init__("", SpanContext("0" * 32, "0" * 16, False), None, 0, {})
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def record_exception(self, error: BaseException):
+        pass
+
+
+_NON_RECORDING_SPAN = _NonRecordingSpan()
+
+
+class SpanExporter(ABC):
+    """Sends finished spans somewhere. Runs on the export thread."""
+
+    @abstractmethod
+    def export(self, spans: List[Span]):
+        pass
+
+    def shutdown(self):
+        pass
+
+
+class JSONLinesExporter(SpanExporter):
+    """Appends spans to a file, one JSON object per line, for offline analysis."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Span]):
+        with open(self.path, "ab") as file:
+            file.write(b"".join(orjson.dumps(span.to_dict()) + b"\n" for span in spans))
+
+
+class OTLPExporter(SpanExporter):
+    """Posts spans to an OpenTelemetry collector over OTLP/HTTP with JSON encoding."""
+
+    def __init__(self, endpoint: str, service_name: str, timeout: float = 5.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.client = httpx.Client(timeout=timeout)
+
+    def export(self, spans: List[Span]):
+        body = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            _otlp_attribute("service.name", self.service_name)
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "py-ai"},
+                            "spans": [_otlp_span(span) for span in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+        response = self.client.post(
+            self.endpoint,
+            content=orjson.dumps(body),
+            headers={"Content-Type": "application/json"},
+        )
+        response.raise_for_status()
+
+    def shutdown(self):
+        self.client.close()
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def _otlp_span(span: Span) -> Dict[str, Any]:
+    otlp_span = {
+        "traceId": span.context.trace_id,
+        "spanId": span.context.span_id,
+        "name": span.name,
+        "kind": span.kind,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": [
+            _otlp_attribute(key, value) for key, value in span.attributes.items()
+        ],
+        "status": ({"code": 2, "message": span.error} if span.error else {"code": 1}),
+    }
+    if span.parent_id:
+        otlp_span["parentSpanId"] = span.parent_id
+    return otlp_span
+
+
+class BatchSpanProcessor:
+    """
+    Queues finished spans and exports them in batches from a background
+    thread, so exporting never blocks the event loop. Spans are dropped
+    and counted if the queue is full.
+    """
+
+    def __init__(
+        self,
+        exporter: SpanExporter,
+        queue_size: int = 2048,
+        batch_size: int = 256,
+        flush_interval_seconds: float = 2.0,
+    ):
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(queue_size)
+        self._thread = threading.Thread(
+            target=self._run, name="span-exporter", daemon=True
+        )
+        self._thread.start()
+
+    def on_end(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            dropped_spans.inc()
+
+    def shutdown(self):
+        """Exports the queued spans and stops the export thread."""
+        self._queue.put(None)
+        self._thread.join()
+        self.exporter.shutdown()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch: List[Span] = []
+            deadline = time.monotonic() + self.flush_interval_seconds
+            while len(batch) < self.batch_size:
+                try:
+                    span = self._queue.get(
+                        timeout=max(deadline - time.monotonic(), 0.0)
+                    )
+                except queue.Empty:
+                    break
+                if span is None:
+                    stopping = True
+                    break
+                batch.append(span)
+            if batch:
+                try:
+                    self.exporter.export(batch)
+                except Exception as e:
+                    logger.warning("Failed to export %s spans: %r", len(batch), e)
+
+
+class Tracer:
+    """
+    Creates spans around operations and tracks the current span per task.
+    Until a processor is set, spans are not created at all, so the calls
+    cost next to nothing.
+    """
+
+    def __init__(self):
+        self.processor: Optional[BatchSpanProcessor] = None
+        self.sample_rate = 1.0
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        kind: int = INTERNAL,
+        parent: Optional[SpanContext] = None,
+        **attributes: Any,
+    ) -> Iterator[Span]:
+        """
+        Runs the block in a new span, a child of `parent` or else of the
+        current span. Exceptions leaving the block mark the span as failed.
+        """
+        if self.processor is None:
+            yield _NON_RECORDING_SPAN
+            return
+
+        if parent is None:
+            current = _current_span.get()
+            parent = current.context if current else None
+        if parent is None:
+            context = SpanContext(
+                os.urandom(16).hex(),
+                os.urandom(8).hex(),
+                sampled=random.random() < self.sample_rate,
+            )
+        else:
+            context = SpanContext(
+                parent.trace_id, os.urandom(8).hex(), sampled=parent.sampled
+            )
+        span = Span(
+            name,
+            context,
+            parent.span_id if parent else None,
+            kind,
+            {key: value for key, value in attributes.items() if value is not None},
+        )
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            if context.sampled and self.processor is not None:
+                self.processor.on_end(span)
+
+
+tracer = Tracer()
+
+
+class TracingMiddleware:
+    """
+    Runs every HTTP request in a server span named after its route,
+    continuing the caller's trace if the request has a traceparent header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or tracer.processor is None:
+            await self.app(scope, receive, send)
+            return
+
+        parent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                parent = extract(value.decode("latin-1"))
+                break
+
+        status = {}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        with tracer.span(
+            f"{scope['method']} {scope['path']}",
+            kind=SERVER,
+            parent=parent,
+            **{"http.method": scope["method"], "http.target": scope["path"]},
+        ) as span:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = scope.get("route")
+                if route is not None and hasattr(route, "path"):
+                    span.name = f"{scope['method']} {route.path}"
+                    span.set_attribute("http.route", route.path)
+                span.set_attribute("http.status_code", status.get("code"))
+                if status.get("code", 500) >= 500:
+                    span.error = span.error or f"HTTP {status.get('code', 500)}"
+
+
+def setup_tracing(service_name: str):
+    """Starts exporting spans as configured by TRACING_EXPORTER. Safe to call more than once."""
+    if tracer.processor is not None or settings.tracing_exporter == "none":
+        return
+    if settings.tracing_exporter == "otlp":
+        exporter = OTLPExporter(settings.tracing_otlp_endpoint, service_name)
+    else:
+        exporter = JSONLinesExporter(settings.tracing_file)
+    tracer.sample_rate = settings.tracing_sample_rate
+    tracer.processor = BatchSpanProcessor(exporter, settings.tracing_queue_size)
+    atexit.register(shutdown_tracing)
+    logger.info("Tracing '%s' to %s exporter.", service_name, settings.tracing_exporter)
+
+
+def shutdown_tracing():
+    """Exports the remaining spans and stops tracing."""
+    processor, tracer.processor = tracer.processor, None
+    if processor is not None:
+        processor.shutdown()
@@ -1,3 +1,4 @@
+import copy
 import os
 import uuid
 import requests
@@ -25,17 +26,35 @@ if "current_conversation_id" not in st.session_state:
     st.session_state.current_conversation_id = None
 if "messages" not in st.session_state:
     st.session_state.messages = []
+if "http_cache" not in st.session_state:
+    st.session_state.http_cache = {}
 
 
 # --- Helper Functions ---
+def fetch_json(url: str):
+    """GETs a JSON resource, revalidating any cached copy with its ETag."""
+    cached = st.session_state.http_cache.get(url)
+    headers = {"If-None-Match": cached["etag"]} if cached else {}
+    response = requests.get(url, headers=headers)
+    if response.status_code == 304 and cached:
+        return copy.deepcopy(cached["data"])
+
+    response.raise_for_status()
+    data = response.json()
+    etag = response.headers.get("ETag")
+    if etag:
+        st.session_state.http_cache[url] = {"etag": etag, "data": data}
+    return copy.deepcopy(data)
+
+
 def login(username):
     """Logs the user in and fetches their conversation history."""
     if username:
         st.session_state.username = username
         try:
-            response = requests.get(f"{USER_CHATS_API_URL}/{username}")
-            response.raise_for_status()
-            st.session_state.user_conversations = response.json()
+            st.session_state.user_conversations = fetch_json(
+                f"{USER_CHATS_API_URL}/{username}"
+            )
         except requests.RequestException as e:
             st.error(f"Could not load chat history: {e}")
             st.session_state.user_conversations = []
@@ -48,6 +67,7 @@ def logout():
     st.session_state.user_conversations = []
     st.session_state.current_conversation_id = None
     st.session_state.messages = []
+    st.session_state.http_cache = {}
     st.rerun()
 
 
@@ -65,9 +85,7 @@ def start_new_chat():
 def select_chat(conversation_id: str):
     """Fetches a chat's history and makes it active."""
     try:
-        response = requests.get(f"{HISTORY_API_URL}/{conversation_id}")
-        response.raise_for_status()
-        messages_data = response.json()
+        messages_data = fetch_json(f"{HISTORY_API_URL}/{conversation_id}")
 
         reloaded_history = []
         for msg_data in messages_data: